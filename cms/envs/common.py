@@ -510,6 +510,7 @@ MIDDLEWARE_CLASSES = [
     'django.middleware.locale.LocaleMiddleware',
 
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -610,6 +611,15 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandbox processes, which have already imported the modules
+    # available to problem code, kept ready by each server process.
+    'pool': {
+        # How many processes to keep ready?  0 means don't bother.
+        'size': 0,
+        # After how many seconds of waiting are processes replaced?
+        'max_idle_seconds': 600,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
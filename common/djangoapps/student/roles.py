@@ -8,13 +8,21 @@ from abc import ABCMeta, abstractmethod
 from collections import defaultdict
 
 from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from opaque_keys.edx.django.models import CourseKeyField
 
-from openedx.core.djangoapps.request_cache import get_cache
+from openedx.core.djangoapps.request_cache import clear_cache, get_cache
+from openedx.core.djangoapps.waffle_utils import WaffleSwitch
+from student import STUDENT_WAFFLE_NAMESPACE
 from student.models import CourseAccessRole
 
 log = logging.getLogger(__name__)
 
+# Shares the CourseAccessRoles loaded for a user with all of the objects
+# representing the same user during a request.
+REQUEST_ROLE_CACHE_SWITCH = WaffleSwitch(STUDENT_WAFFLE_NAMESPACE, 'request_role_cache')
+
 # A list of registered access roles.
 REGISTERED_ACCESS_ROLES = {}
 
@@ -58,26 +66,54 @@ class BulkRoleCache(object):
 
 class RoleCache(object):
     """
-    A cache of the CourseAccessRoles held by a particular user
+    A cache of the CourseAccessRoles held by a particular user, indexed so
+    that each role check is a set lookup.
+
+    While the student.request_role_cache switch is enabled, the roles of a
+    user are only loaded once per request, rather than once per user object.
     """
+    CACHE_NAMESPACE = u"student.roles.RoleCache"
+
     def __init__(self, user):
         try:
             self._roles = BulkRoleCache.get_user_roles(user)
         except KeyError:
-            self._roles = set(
-                CourseAccessRole.objects.filter(user=user).all()
-            )
+            self._roles = self._load_roles(user)
+        self._role_keys = frozenset(
+            (access_role.role, access_role.course_id, access_role.org)
+            for access_role in self._roles
+        )
+
+    @classmethod
+    def _load_roles(cls, user):
+        """
+        Returns the set of the CourseAccessRoles of the given user, from the
+        request cache if they are shared.
+        """
+        if not REQUEST_ROLE_CACHE_SWITCH.is_enabled():
+            return set(CourseAccessRole.objects.filter(user=user).all())
+
+        request_cache = get_cache(cls.CACHE_NAMESPACE)
+        if user.id not in request_cache:
+            request_cache[user.id] = set(CourseAccessRole.objects.filter(user=user).all())
+        return request_cache[user.id]
 
     def has_role(self, role, course_id, org):
         """
         Return whether this RoleCache contains a role with the specified role, course_id, and org
         """
-        return any(
-            access_role.role == role and
-            access_role.course_id == course_id and
-            access_role.org == org
-            for access_role in self._roles
-        )
+        return (role, course_id, org) in self._role_keys
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+@receiver(post_save, sender=User)
+def clear_request_role_cache(**kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the roles shared by the RoleCaches of the request when roles
+    change, or when users are saved, as when they are created.
+    """
+    clear_cache(RoleCache.CACHE_NAMESPACE)
 
 
 class AccessRole(object):
@@ -2,6 +2,7 @@
 Tests of student.roles
 """
 import ddt
+from django.contrib.auth.models import User
 from django.test import TestCase
 from opaque_keys.edx.keys import CourseKey
 
@@ -14,6 +15,7 @@ from student.roles import (
     GlobalStaff,
     OrgInstructorRole,
     OrgStaffRole,
+    REQUEST_ROLE_CACHE_SWITCH,
     RoleCache
 )
 from student.tests.factories import AnonymousUserFactory
@@ -198,3 +200,36 @@ class RoleCacheTestCase(TestCase):
     def test_empty_cache(self, role, target):
         cache = RoleCache(self.user)
         self.assertFalse(cache.has_role(*target))
+
+
+class RequestRoleCacheTestCase(TestCase):
+    """
+    Tests of the roles shared by the RoleCaches of a request.
+    """
+    COURSE_KEY = CourseKey.from_string('edX/toy/2012_Fall')
+
+    def setUp(self):
+        super(RequestRoleCacheTestCase, self).setUp()
+        self.user = UserFactory()
+
+    def _has_staff_role(self, user):
+        """
+        Returns whether a new RoleCache of the given user has the staff role.
+        """
+        return RoleCache(user).has_role('staff', self.COURSE_KEY, self.COURSE_KEY.org)
+
+    def test_shared_roles(self):
+        CourseStaffRole(self.COURSE_KEY).add_users(self.user)
+        other_user = User.objects.get(id=self.user.id)
+        with REQUEST_ROLE_CACHE_SWITCH.override(active=True):
+            self.assertTrue(self._has_staff_role(self.user))
+            with self.assertNumQueries(0):
+                self.assertTrue(self._has_staff_role(other_user))
+
+    def test_invalidated_by_role_change(self):
+        with REQUEST_ROLE_CACHE_SWITCH.override(active=True):
+            self.assertFalse(self._has_staff_role(self.user))
+            CourseStaffRole(self.COURSE_KEY).add_users(self.user)
+            self.assertTrue(self._has_staff_role(User.objects.get(id=self.user.id)))
+            CourseStaffRole(self.COURSE_KEY).remove_users(self.user)
+            self.assertFalse(self._has_staff_role(User.objects.get(id=self.user.id)))
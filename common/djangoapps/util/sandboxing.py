@@ -1,6 +1,8 @@
 import re
 
+from capa.safe_exec import SANDBOX_POOL
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from lms.djangoapps.dashboard.git_import import DEFAULT_PYTHON_LIB_FILENAME
 
 
@@ -38,3 +40,16 @@ def get_python_lib_zip(contentstore, course_id):
         return zip_lib.data
     else:
         return None
+
+
+class ConfigureSandboxPoolMiddleware(object):
+    """
+    Configure the pool of warm sandbox processes from the CODE_JAIL setting.
+
+    Like codejail's own middleware, this only runs once, when the middleware
+    is loaded, and is then removed.
+    """
+    def __init__(self):
+        pool = getattr(settings, 'CODE_JAIL', {}).get('pool', {})
+        SANDBOX_POOL.configure(**pool)
+        raise MiddlewareNotUsed
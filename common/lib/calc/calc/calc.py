@@ -29,6 +29,7 @@ from pyparsing import (
 )
 
 import functions
+from lru import LRUCache
 
 # Functions available by default
 # We use scimath variants which give complex results when needed. For example:
@@ -81,6 +82,9 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# The number of parsed expressions kept for reuse by `evaluator`.
+PARSE_CACHE_SIZE = 1024
+
 
 class UndefinedVariable(Exception):
     """
@@ -96,6 +100,13 @@ class UnmatchedParenthesis(Exception):
     pass
 
 
+class VectorizationError(Exception):
+    """
+    Indicate when a formula cannot be evaluated for arrays of values at once.
+    """
+    pass
+
+
 def lower_dict(input_dict):
     """
     Convert all keys in a dictionary to lowercase; keep their original values.
@@ -244,10 +255,8 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    # Parse the tree, or reuse the parse of an earlier call.
+    math_interpreter = PARSE_CACHE.parse(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -255,24 +264,68 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     # ...and check them
     math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+    return math_interpreter.evaluate(all_variables, all_functions)
+
+
+def vectorized_evaluator(variables, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for arrays of values of its variables at once.
+
+    Like `evaluator`, except that the values of the variables may be numpy
+    arrays of the same shape, in which case the value of the expression is
+    returned as an array of that shape, elementwise.
+
+    Rather than return values that could differ from those of `evaluator`,
+    raise VectorizationError when a function cannot be applied to arrays,
+    or when any element of the evaluation divides by zero, overflows or
+    is otherwise not finite. Invalid expressions raise the same exceptions
+    as with `evaluator`.
+    """
+    if math_expr.strip() == "":
+        raise VectorizationError("Empty expression")
+
+    math_interpreter = PARSE_CACHE.parse(math_expr, case_sensitive)
+    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+    math_interpreter.check_variables(all_variables, all_functions)
+
+    try:
+        with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+            result = math_interpreter.evaluate(all_variables, all_functions, vectorized=True)
+            finite = numpy.all(numpy.isfinite(result))
+    except (ArithmeticError, TypeError, ValueError) as err:
+        raise VectorizationError(err)
+    if not finite:
+        raise VectorizationError("Non-finite value")
+    return result
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+
+class ParseCache(LRUCache):
+    """
+    Least recently used cache of parsed expressions.
+
+    FormulaResponse and NumericalResponse evaluate the same expressions
+    for many samples and comparisons, so the parsed `ParseAugmenter` of
+    each `(math_expr, case_sensitive)` is kept, along with its compiled
+    evaluation function. Expressions that fail to parse are not kept.
+    """
+    def parse(self, math_expr, case_sensitive=False):
+        """
+        Return the parsed `ParseAugmenter` of the given expression.
+
+        Raise UnmatchedParenthesis or a pyparsing exception if the
+        expression is not valid.
+        """
+        key = (math_expr, case_sensitive)
+        math_interpreter = self.get(key)
+        if math_interpreter is None:
+            check_parens(math_expr)
+            math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+            math_interpreter.parse_algebra()
+            self.set(key, math_interpreter)
+        return math_interpreter
+
+
+PARSE_CACHE = ParseCache(PARSE_CACHE_SIZE)
 
 
 def check_parens(formula):
@@ -316,6 +369,7 @@ class ParseAugmenter(object):
         self.case_sensitive = case_sensitive
         self.math_expr = math_expr
         self.tree = None
+        self._compiled_trees = {}
         self.variables_used = set()
         self.functions_used = set()
 
@@ -447,6 +501,120 @@ class ParseAugmenter(object):
         # Find the value of the entire tree.
         return handle_node(self.tree)
 
+    def evaluate(self, all_variables, all_functions, vectorized=False):
+        """
+        Return the value of `self.tree` for the given variables and functions.
+
+        The dictionaries are those returned by `add_defaults`, with their
+        keys lowercased unless the parse is case sensitive. The tree is
+        compiled on first use, so that later evaluations with new variables
+        do not walk the tree again.
+        """
+        compiled_tree = self._compiled_trees.get(vectorized)
+        if compiled_tree is None:
+            compiled_tree = self._compiled_trees[vectorized] = self.compile_tree(vectorized)
+        return compiled_tree(all_variables, all_functions)
+
+    def compile_tree(self, vectorized=False):
+        """
+        Return a function of `(all_variables, all_functions)` computing the
+        value of `self.tree`.
+
+        The function is built from nested closures, one for each node of the
+        tree, which give the same results as reducing the tree with the
+        `eval_*` actions: numbers are converted and variable and function
+        names are casified once, here, rather than on every evaluation.
+
+        If `vectorized`, the values of the variables may be numpy arrays.
+        The parallel resistors operator then does not special case zero
+        inputs, which are instead left to raise or return non-finite values.
+        """
+        if self.case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        def compile_operators(node, operators, initial_value):
+            """
+            Return the closure of a sum or product node.
+
+            `operators` maps the operator tokens of the node to the
+            functions applied to the running value and each operand.
+            """
+            terms = []
+            current_op = operators[None]
+            for kid in node:
+                if isinstance(kid, ParseResults):
+                    terms.append((current_op, compile_node(kid)))
+                else:
+                    current_op = operators[kid]
+
+            def evaluate_terms(variables, functions):
+                """
+                Apply the operators of the node, left to right.
+                """
+                value = initial_value
+                for term_op, term in terms:
+                    value = term_op(value, term(variables, functions))
+                return value
+            return evaluate_terms
+
+        def compile_node(node):
+            """
+            Return the closure computing the value of the node.
+            """
+            node_name = node.getName()
+
+            if node_name == 'number':
+                number = eval_number(list(node))
+                return lambda variables, functions: number
+
+            if node_name == 'variable':
+                varname = casify(node[0])
+                return lambda variables, functions: variables[varname]
+
+            if node_name == 'function':
+                funcname = casify(node[0])
+                argument = compile_node(node[1])
+                return lambda variables, functions: functions[funcname](argument(variables, functions))
+
+            if node_name == 'sum':
+                return compile_operators(node, {None: operator.add, '+': operator.add, '-': operator.sub}, 0.0)
+
+            if node_name == 'product':
+                return compile_operators(node, {None: operator.mul, '*': operator.mul, '/': operator.truediv}, 1.0)
+
+            # The remaining nodes only combine the values of their child
+            # nodes, ignoring the parentheses and operator tokens.
+            operands = [compile_node(kid) for kid in node if isinstance(kid, ParseResults)]
+
+            if node_name == 'atom' or (node_name in ('power', 'parallel') and len(node) == 1):
+                return operands[0]
+
+            if node_name == 'power':
+                def evaluate_power(variables, functions):
+                    """
+                    Exponentiate the operands, right to left.
+                    """
+                    values = [operand(variables, functions) for operand in operands]
+                    return reduce(lambda a, b: b ** a, reversed(values))
+                return evaluate_power
+
+            if node_name == 'parallel':
+                def evaluate_parallel(variables, functions):
+                    """
+                    Combine the operands with the parallel resistors operator.
+                    """
+                    values = [operand(variables, functions) for operand in operands]
+                    if not vectorized and 0 in values:
+                        return float('nan')
+                    return 1. / sum(1. / value for value in values)
+                return evaluate_parallel
+
+            raise Exception(u"Unknown branch name '{}'".format(node_name))  # pragma: no cover
+
+        return compile_node(self.tree)
+
     def check_variables(self, valid_variables, valid_functions):
         """
         Confirm that all the variables used in the tree are valid/defined.
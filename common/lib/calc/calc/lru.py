@@ -0,0 +1,60 @@
+"""
+Least recently used cache shared by the parsers of calc, chem and symmath.
+
+This has the same interface as openedx.core.lib.cache_utils.LRUCache.  calc,
+chem and symmath are standalone packages, also installed in the codejail
+sandbox (see requirements/edx-sandbox), where openedx cannot be imported,
+so they keep their own copy.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A thread-safe dictionary-like cache of at most max_size entries,
+    evicting the least recently used entry when full.
+
+    Values are kept as given, so they must not be modified by callers.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for key, or default if there is none.
+        """
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Caches the given value for key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -8,7 +8,15 @@ Because intermediate values of the render contain more data than simply the
 string of latex, store it in a custom class `LatexRendered`.
 """
 
+import hashlib
+
+from pyparsing import ParseException
+
 from calc import DEFAULT_FUNCTIONS, DEFAULT_VARIABLES, SUFFIXES, ParseAugmenter
+from lru import LRUCache
+
+# The number of previews kept for reuse by `latex_preview` in each process.
+PREVIEW_CACHE_SIZE = 1024
 
 
 class LatexRendered(object):
@@ -353,16 +361,94 @@ def add_defaults(var, fun, case_sensitive=False):
     return var_items, fun_items
 
 
-def latex_preview(math_expr, variables=(), functions=(), case_sensitive=False):
+# The preview of a formula input is requested as the student types, so the
+# latex of each `(math_expr, variables, functions, case_sensitive)` is kept,
+# along with the ParseException of each expression that does not parse, as
+# most of the expressions typed so far do not.
+PREVIEW_CACHE = LRUCache(PREVIEW_CACHE_SIZE)
+
+
+def latex_preview(math_expr, variables=(), functions=(), case_sensitive=False, cache=None):
     """
     Convert `math_expr` into latex, guaranteeing its parse-ability.
 
     Analagous to `evaluator`.
+
+    Previews are kept in PREVIEW_CACHE, and also in `cache` if given, an
+    object with the get and set methods of a Django cache, to be shared with
+    other processes.
     """
     # No need to go further
     if math_expr.strip() == "":
         return ""
 
+    key = (math_expr, frozenset(variables), frozenset(functions), case_sensitive)
+    preview = PREVIEW_CACHE.get(key)
+    if preview is None:
+        if cache is not None:
+            preview = _get_shared_preview(cache, key)
+        if preview is None:
+            preview = _render_preview(*key)
+            if cache is not None:
+                _set_shared_preview(cache, key, preview)
+        PREVIEW_CACHE.set(key, preview)
+
+    if isinstance(preview, ParseException):
+        raise preview
+    return preview
+
+
+def _shared_preview_key(key):
+    """
+    Return the key of a preview in a shared cache, which limits the length
+    and characters of its keys.
+    """
+    math_expr, variables, functions, case_sensitive = key
+    md5er = hashlib.md5()
+    md5er.update(repr((math_expr, sorted(variables), sorted(functions), case_sensitive)))
+    return 'calc.preview.{}'.format(md5er.hexdigest())
+
+
+def _get_shared_preview(cache, key):
+    """
+    Return the latex or ParseException kept in the shared cache for the
+    given key, or None.
+    """
+    shared_preview = cache.get(_shared_preview_key(key))
+    if shared_preview is None:
+        return None
+    latex, error = shared_preview
+    if error is not None:
+        return ParseException(key[0], 0, error)
+    return latex
+
+
+def _set_shared_preview(cache, key, preview):
+    """
+    Keep the latex or the message of the ParseException of the given key in
+    the shared cache, as exceptions may not be picklable.
+    """
+    if isinstance(preview, ParseException):
+        cache.set(_shared_preview_key(key), (None, preview.msg))
+    else:
+        cache.set(_shared_preview_key(key), (preview, None))
+
+
+def _render_preview(math_expr, variables, functions, case_sensitive):
+    """
+    Return the latex of `math_expr`, or the ParseException raised when it
+    does not parse.
+    """
+    try:
+        return _render_latex(math_expr, variables, functions, case_sensitive)
+    except ParseException as err:
+        return err
+
+
+def _render_latex(math_expr, variables, functions, case_sensitive):
+    """
+    Parse `math_expr`, and render its latex.
+    """
     # Parse tree
     latex_interpreter = ParseAugmenter(math_expr, case_sensitive)
     latex_interpreter.parse_algebra()
@@ -552,3 +552,110 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+
+class ParseCacheTest(unittest.TestCase):
+    """
+    Test the reuse of parsed and compiled expressions by calc.evaluator
+    """
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        calc.PARSE_CACHE.clear()
+        self.addCleanup(calc.PARSE_CACHE.clear)
+
+    def test_parse_reused(self):
+        """
+        Check that an expression is parsed once for all its evaluations
+        """
+        self.assertEqual(calc.evaluator({'x': 2.0}, {}, '3*x'), 6.0)
+        parsed = calc.PARSE_CACHE.parse('3*x')
+        self.assertEqual(calc.evaluator({'x': 5.0}, {}, '3*x'), 15.0)
+        self.assertIs(calc.PARSE_CACHE.parse('3*x'), parsed)
+        self.assertIsNot(calc.PARSE_CACHE.parse('3*x', case_sensitive=True), parsed)
+
+    def test_least_recently_used_evicted(self):
+        """
+        Check that the cache keeps the most recently used expressions
+        """
+        parse_cache = calc.ParseCache(max_size=2)
+        parsed = parse_cache.parse('1+1')
+        parse_cache.parse('2+2')
+        self.assertIs(parse_cache.parse('1+1'), parsed)
+        parse_cache.parse('3+3')
+        self.assertEqual(len(parse_cache), 2)
+        self.assertIs(parse_cache.parse('1+1'), parsed)
+        self.assertIsNot(parse_cache.parse('2+2'), parsed)
+
+    def test_invalid_expressions_not_kept(self):
+        """
+        Check that invalid expressions raise on every evaluation
+        """
+        for _ in range(2):
+            with self.assertRaises(calc.UnmatchedParenthesis):
+                calc.evaluator({}, {}, "(1+2")
+            with self.assertRaises(ParseException):
+                calc.evaluator({}, {}, "1+*2")
+        self.assertEqual(len(calc.PARSE_CACHE), 0)
+
+    def test_compiled_tree_matches_reduced_tree(self):
+        """
+        Check that the compiled tree computes the same values as the
+        evaluation actions applied to the parse tree
+        """
+        variables, functions = calc.add_defaults({'x': 1.5, 'R_1': 4.0}, {'f': lambda x: x * 2}, False)
+        evaluate_actions = {
+            'number': calc.eval_number,
+            'variable': lambda x: variables[x[0].lower()],
+            'function': lambda x: functions[x[0].lower()](x[1]),
+            'atom': calc.eval_atom,
+            'power': calc.eval_power,
+            'parallel': calc.eval_parallel,
+            'product': calc.eval_product,
+            'sum': calc.eval_sum
+        }
+        for math_expr in ['-3', '1.5e2%', '2^3^2', '1||2||x', '0||2', '-x+2-3*4/5', 'f(sin(pi/x))^2',
+                          '(R_1*X)||(2*fact(3))', '+(1-(2-(3-x)))', '5%/(i^2)']:
+            math_interpreter = calc.ParseAugmenter(math_expr)
+            math_interpreter.parse_algebra()
+            reduced = math_interpreter.reduce_tree(evaluate_actions)
+            compiled = math_interpreter.evaluate(variables, functions)
+            if numpy.isnan(reduced):
+                self.assertTrue(numpy.isnan(compiled), math_expr)
+            else:
+                self.assertEqual(compiled, reduced, math_expr)
+                self.assertEqual(type(compiled), type(reduced), math_expr)
+
+
+class VectorizedEvaluatorTest(unittest.TestCase):
+    """
+    Test the evaluation of expressions for arrays of values
+    """
+    def test_matches_evaluator(self):
+        """
+        Check that the values of each element are those of calc.evaluator
+        """
+        values = {'x': numpy.array([-2.5, 0.5, 3.0]), 'T_{ij}': numpy.array([1.0, 2.0, 4.0])}
+        for math_expr in ['x+T_{ij}', 'sqrt(x)*i', '2^x^2', 'x||T_{ij}', '-sec(x)/T_{ij}', 'ln(x)+e', '3%']:
+            result = calc.vectorized_evaluator(values, {}, math_expr)
+            for index in range(3):
+                expected = calc.evaluator({var: value[index] for var, value in values.items()}, {}, math_expr)
+                self.assertAlmostEqual(numpy.resize(result, 3)[index], expected, msg=math_expr)
+
+    def test_not_vectorized(self):
+        """
+        Check that expressions which cannot be evaluated elementwise, or
+        whose evaluation is not finite, raise VectorizationError
+        """
+        values = {'x': numpy.array([-1.0, 0.0, 1.0])}
+        for math_expr in ['', 'fact(x)', 'arccot(x)', '1/x', 'x||1', '1||0', 'arccosh(x)', '10^(1000*x)']:
+            with self.assertRaises(calc.VectorizationError):
+                calc.vectorized_evaluator(values, {}, math_expr)
+
+    def test_invalid_expressions(self):
+        """
+        Check that invalid expressions raise the errors of calc.evaluator
+        """
+        with self.assertRaises(calc.UndefinedVariable):
+            calc.vectorized_evaluator({'x': numpy.array([1.0])}, {}, 'x+y')
+        with self.assertRaises(calc.UnmatchedParenthesis):
+            calc.vectorized_evaluator({}, {}, '(1+2')
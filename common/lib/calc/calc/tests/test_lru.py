@@ -0,0 +1,57 @@
+"""
+Unit tests for lru.py
+"""
+
+import unittest
+
+from calc.lru import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    """
+    Test the least recently used cache shared by calc, chem and symmath
+    """
+    def test_least_recently_used_evicted(self):
+        """
+        Check that the cache keeps the most recently used values
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('x', 'x')
+        cache.set('y', 'y')
+        self.assertEqual(cache.get('x'), 'x')
+        cache.set('z', 'z')
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('x'), 'x')
+        self.assertNotIn('y', cache)
+        self.assertIsNone(cache.get('y'))
+
+    def test_set_refreshes_key(self):
+        """
+        Check that setting a kept key makes it the most recently used
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('x', 1)
+        cache.set('y', 2)
+        cache.set('x', 3)
+        cache.set('z', 4)
+        self.assertEqual(cache.get('x'), 3)
+        self.assertEqual(cache.get('y', 'missing'), 'missing')
+
+    def test_falsy_values_kept(self):
+        """
+        Check that values such as None are kept, and told from missing keys
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('x', None)
+        self.assertIn('x', cache)
+        self.assertIsNone(cache.get('x', 'missing'))
+
+    def test_clear(self):
+        """
+        Check that clear discards all the values
+        """
+        cache = LRUCache(max_size=2)
+        cache.set('x', 'x')
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get('x'))
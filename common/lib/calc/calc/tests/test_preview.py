@@ -238,3 +238,80 @@ class LatexPreviewTest(unittest.TestCase):
                 bad_exceptions[math] = None
 
         self.assertEquals({}, bad_exceptions)
+
+
+class DictCache(object):
+    """
+    Stand-in for a Django cache shared by processes.
+    """
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+class PreviewCacheTest(unittest.TestCase):
+    """
+    Test the reuse of previews by latex_preview
+    """
+    def setUp(self):
+        super(PreviewCacheTest, self).setUp()
+        preview.PREVIEW_CACHE.clear()
+        self.addCleanup(preview.PREVIEW_CACHE.clear)
+
+    def _preview(self, math_expr, **kwargs):
+        """
+        Return the latex of `math_expr`, or the class of the exception raised.
+        """
+        try:
+            return preview.latex_preview(math_expr, **kwargs)
+        except pyparsing.ParseException as error:
+            return type(error)
+
+    def test_keystroke_replay(self):
+        """
+        Check that kept previews match those rendered for each keystroke
+        """
+        math_expr = ''
+        # Keystrokes of a student, where '\b' is a backspace.
+        for key in 'sqrt(x^2+y^2)/(2*pi\b\bR_1)||3.2e4%':
+            math_expr = math_expr[:-1] if key == '\b' else math_expr + key
+            preview.PREVIEW_CACHE.clear()
+            rendered = self._preview(math_expr)
+            self.assertEqual(self._preview(math_expr), rendered, math_expr)
+
+    def test_invalid_expressions_kept(self):
+        """
+        Check that invalid expressions raise on every preview
+        """
+        for _ in range(2):
+            with self.assertRaises(pyparsing.ParseException):
+                preview.latex_preview('11+')
+        self.assertEqual(len(preview.PREVIEW_CACHE), 1)
+        preview.latex_preview('x', variables=['x'])
+        preview.latex_preview('x', variables=['x'], case_sensitive=True)
+        self.assertEqual(len(preview.PREVIEW_CACHE), 3)
+
+    def test_shared_cache(self):
+        """
+        Check that previews are shared with other processes through `cache`
+        """
+        cache = DictCache()
+        self.assertEqual(preview.latex_preview('x^2', cache=cache), 'x^{2}')
+        with self.assertRaises(pyparsing.ParseException) as context:
+            preview.latex_preview('11+', cache=cache)
+        error = context.exception.msg
+        self.assertEqual(sorted(cache.values.values()), [(None, error), ('x^{2}', None)])
+
+        # As in another process, which has not rendered the previews.
+        preview.PREVIEW_CACHE.clear()
+        for key, (latex, error) in cache.values.items():
+            if latex is not None:
+                cache.values[key] = ('shared', None)
+        self.assertEqual(preview.latex_preview('x^2', cache=cache), 'shared')
+        with self.assertRaisesRegexp(pyparsing.ParseException, error):
+            preview.latex_preview('11+', cache=cache)
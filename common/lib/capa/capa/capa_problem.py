@@ -13,25 +13,30 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import ast
+import hashlib
 import logging
 import os.path
 import re
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+from string import Formatter
 from xml.sax.saxutils import unescape
 
 from lxml import etree
 from pytz import UTC
+from six import text_type
 
 import capa.customrender as customrender
 import capa.inputtypes as inputtypes
 import capa.responsetypes as responsetypes
 import capa.xqueue_interface as xqueue_interface
 from capa.correctmap import CorrectMap
-from capa.safe_exec import safe_exec
+from capa.safe_exec import SafeExecCache, safe_exec
 from capa.util import contextualize_text, convert_files_to_filenames
 from openedx.core.djangolib.markup import HTML
+from openedx.core.lib.cache_utils import LRUCache
 from xmodule.stringify import stringify_children
 
 # extra things displayed after "show answers" is pressed
@@ -69,8 +74,35 @@ html_problem_semantics = [
     "openendedrubric",
 ]
 
+# Scripts that use any of these identifiers, or any identifier starting with
+# '__', as a name, an attribute, an imported module or a word in a string may
+# read the anonymous student id, directly or by introspection, so their results
+# are cached per student.  See `LoncapaProblem._may_read_student_id`.
+STUDENT_ID_READING_IDENTIFIERS = frozenset([
+    'anonymous_student_id',
+    'globals', 'locals', 'vars', 'dir', 'eval', 'exec', 'execfile', 'compile',
+    'sys', 'inspect', 'gc', 'imp', 'importlib', 'ctypes', 'pickle', 'cPickle', 'marshal', 'modules',
+    'attrgetter', 'methodcaller', 'Formatter',
+    'f_back', 'f_globals', 'f_locals', 'tb_frame', 'gi_frame', 'func_globals',
+])
+
+# Number of parsed problem trees, and of rendered inputs, kept in the memory
+# of each process.
+PROBLEM_TREE_CACHE_SIZE = 500
+RENDERED_INPUT_CACHE_SIZE = 5000
+
 log = logging.getLogger(__name__)
 
+
+# A problem is instantiated on every render and every check, each time from
+# the same text.  The tree parsed from each text, and made compatible, is kept,
+# and each problem is given its own copy of it to preprocess in place.  Likewise
+# for the HTML rendered for inputs that have no student state, when the capa
+# system gives a rendered input cache scope.  Copying a tree is much cheaper
+# than parsing or rendering it.
+PROBLEM_TREE_CACHE = LRUCache(PROBLEM_TREE_CACHE_SIZE)
+RENDERED_INPUT_CACHE = LRUCache(RENDERED_INPUT_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -86,6 +118,10 @@ class LoncapaSystem(object):
     Attributes:
         i18n: an object implementing the `gettext.Translations` interface so
             that we can use `.ugettext` to localize strings.
+        rendered_input_cache_scope: a hashable value identifying how templates
+            are rendered, such as the site and theme, under which the inputs
+            without student state are kept in RENDERED_INPUT_CACHE, or None
+            to render them for each problem.
 
     See :class:`ModuleSystem` for documentation of other attributes.
 
@@ -105,7 +141,8 @@ class LoncapaSystem(object):
         seed,      # Why do we do this if we have self.seed?
         STATIC_URL,                                     # pylint: disable=invalid-name
         xqueue,
-        matlab_api_key=None
+        matlab_api_key=None,
+        rendered_input_cache_scope=None,
     ):
         self.ajax_url = ajax_url
         self.anonymous_student_id = anonymous_student_id
@@ -121,6 +158,7 @@ class LoncapaSystem(object):
         self.STATIC_URL = STATIC_URL                    # pylint: disable=invalid-name
         self.xqueue = xqueue
         self.matlab_api_key = matlab_api_key
+        self.rendered_input_cache_scope = rendered_input_cache_scope
 
 
 class LoncapaProblem(object):
@@ -178,13 +216,23 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        # parse problem XML file into an element tree, or copy the one parsed before
+        has_includes = False
+        cached_tree = PROBLEM_TREE_CACHE.get(problem_text)
+        if cached_tree is not None:
+            self.tree = deepcopy(cached_tree)
+        else:
+            self.tree = etree.XML(problem_text)
 
-        self.make_xml_compatible(self.tree)
+            self.make_xml_compatible(self.tree)
 
-        # handle any <include file="foo"> tags
-        self._process_includes()
+            # Trees with included files are not kept, as the files may change.
+            has_includes = self.tree.find('.//include') is not None
+            if not has_includes:
+                PROBLEM_TREE_CACHE.set(problem_text, deepcopy(self.tree))
+            else:
+                # handle any <include file="foo"> tags
+                self._process_includes()
 
         # construct script processor context (eg for customresponse problems)
         if minimal_init:
@@ -192,6 +240,14 @@ class LoncapaProblem(object):
         else:
             self.context = self._extract_context(self.tree)
 
+        # Inputs without student state render the same for every problem with this text and seed,
+        # unless included files or the script's results differ between students.
+        self.rendered_input_version = None
+        if not (minimal_init or has_includes) and 'anonymous_student_id' in self._uncached_script_globals(
+                self.context['script_code'], self.context['python_path']):
+            encoded_text = problem_text.encode('utf-8') if isinstance(problem_text, text_type) else problem_text
+            self.rendered_input_version = hashlib.sha1(encoded_text).hexdigest()
+
         # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
         # instances for each question in the problem. The dict has keys = xml subtree of
@@ -830,6 +886,92 @@ class LoncapaProblem(object):
 
         return path
 
+    @classmethod
+    def _uncached_script_globals(cls, code, python_path):
+        """
+        Return the names of the context variables that the given script
+        code does not read, so that its cached results can be shared by
+        all students with the same seed.  Modules imported from the given
+        python path could read anything.
+        """
+        if python_path or cls._may_read_student_id(code):
+            return ()
+        return ('anonymous_student_id',)
+
+    @staticmethod
+    def _may_read_student_id(code):
+        """
+        Return whether the given script code may read the anonymous student id.
+
+        The syntax tree of the code is checked for the identifiers of
+        STUDENT_ID_READING_IDENTIFIERS, and for the attribute lookups that
+        don't name their attribute in the code: getattr with a computed name,
+        and str.format with a computed format string or with fields that look
+        attributes or items up.  Code that can't be parsed may read anything.
+
+        Python offers more ways of introspection than can be listed, so this
+        is a best effort that catches scripts that read the id by accident or
+        through the usual means, not a guarantee against a determined author.
+        An author who defeats it only shares the results computed for one
+        student with the other students with the same seed, in that course.
+        """
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, TypeError, ValueError):
+            return True
+
+        def reads_student_id(identifier):
+            """
+            Return whether the given identifier may read the anonymous student id.
+            """
+            return identifier.startswith('__') or identifier in STUDENT_ID_READING_IDENTIFIERS
+
+        def formats_fields(node):
+            """
+            Return whether the given format attribute may look attributes or
+            items up in its arguments.
+            """
+            if not isinstance(node.value, ast.Str):
+                return True
+            try:
+                return any(
+                    field_name and re.search(r'[.\[]', field_name)
+                    for _, field_name, _, _ in Formatter().parse(node.value.s)
+                )
+            except ValueError:
+                return True
+
+        # The getattr calls that name their attribute, which is checked as a string.
+        literal_getattrs = set(
+            node.func for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'getattr'
+            if len(node.args) == 2 and isinstance(node.args[1], ast.Str)
+        )
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Exec):
+                return True
+            elif isinstance(node, ast.Name):
+                if node.id == 'getattr' and node not in literal_getattrs:
+                    return True
+                identifiers = [node.id]
+            elif isinstance(node, ast.Attribute):
+                if node.attr == 'format' and formats_fields(node):
+                    return True
+                identifiers = [node.attr]
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                identifiers = [getattr(node, 'module', None) or '']
+                for alias in node.names:
+                    identifiers.extend([alias.name, alias.asname or ''])
+                identifiers = [name for identifier in identifiers for name in identifier.split('.')]
+            elif isinstance(node, ast.Str):
+                identifiers = re.findall(r'\w+', node.s)
+            else:
+                continue
+            if any(reads_student_id(identifier) for identifier in identifiers):
+                return True
+        return False
+
     def _extract_context(self, tree):
         """
         Extract content of <script>...</script> from the problem.xml file, and exec it in the
@@ -871,6 +1013,13 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
+            # Results are only shared between students by a SafeExecCache, which is used when the
+            # courseware.safe_exec_result_cache switch is on.  Otherwise, the student id stays in the key.
+            if isinstance(self.capa_system.cache, SafeExecCache):
+                uncached_globals = self._uncached_script_globals(all_code, python_path)
+            else:
+                uncached_globals = ()
+
             try:
                 safe_exec(
                     all_code,
@@ -881,6 +1030,7 @@ class LoncapaProblem(object):
                     cache=self.capa_system.cache,
                     slug=self.problem_id,
                     unsafely=self.capa_system.can_execute_unsafe_code(),
+                    uncached_globals=uncached_globals,
                 )
             except Exception as err:
                 log.exception("Error while execing script code: " + all_code)
@@ -972,10 +1122,16 @@ class LoncapaProblem(object):
                 }
             }
 
+            has_student_state = bool(
+                problemid in self.correct_map or value or self.input_state[input_id] or self.has_saved_answers
+            )
+
             input_type_cls = inputtypes.registry.get_class_for_tag(problemtree.tag)
             # save the input type so that we can make ajax calls on it if we need to
             self.inputs[input_id] = input_type_cls(self.capa_system, problemtree, state)
-            return self.inputs[input_id].get_html()
+            if has_student_state:
+                return self.inputs[input_id].get_html()
+            return self._render_input_without_state(self.inputs[input_id])
 
         # let each Response render itself
         if problemtree in self.responders:
@@ -1009,6 +1165,32 @@ class LoncapaProblem(object):
 
         return tree
 
+    def _render_input_without_state(self, input_type):
+        """
+        Return the HTML of an input that has no student state, rendered
+        once for all the problems with the same text and seed, in the same
+        rendered input cache scope.
+        """
+        scope = self.capa_system.rendered_input_cache_scope
+        if self.rendered_input_version is None or scope is None:
+            return input_type.get_html()
+
+        key = (
+            self.rendered_input_version,
+            scope,
+            self.seed,
+            input_type.input_id,
+            getattr(self.capa_system.i18n, 'get_language', lambda: None)(),
+            self.capa_system.STATIC_URL,
+            self.capa_system.render_template,
+        )
+        html = RENDERED_INPUT_CACHE.get(key)
+        if html is None:
+            html = input_type.get_html()
+            RENDERED_INPUT_CACHE.set(key, deepcopy(html))
+            return html
+        return deepcopy(html)
+
     def _preprocess_problem(self, tree, minimal_init):  # private
         """
         Assign IDs to all the responses
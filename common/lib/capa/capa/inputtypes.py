@@ -1300,7 +1300,7 @@ class FormulaEquationInput(InputTypeBase):
             # TODO add references to valid variables and functions
             # At some point, we might want to mark invalid variables as red
             # or something, and this is where we would need to pass those in.
-            result['preview'] = latex_preview(formula)
+            result['preview'] = latex_preview(formula, cache=self._preview_cache())
         except pyparsing.ParseException:
             result['error'] = _("Sorry, couldn't parse formula")
             result['formula'] = formula
@@ -1313,6 +1313,17 @@ class FormulaEquationInput(InputTypeBase):
 
         return result
 
+    def _preview_cache(self):
+        """
+        Returns the cache in which previews are shared with other processes.
+
+        The cache of the problem may keep the results of its sandboxed code
+        within bounds, which previews must not take up, so previews go to the
+        cache it wraps, if any.
+        """
+        cache = self.capa_system.cache
+        return getattr(cache, 'shared_cache', cache)
+
 #-----------------------------------------------------------------------------
 
 
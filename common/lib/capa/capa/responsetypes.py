@@ -40,13 +40,14 @@ import capa.safe_exec as safe_exec
 import capa.xqueue_interface as xqueue_interface
 import dogstats_wrapper as dog_stats_api
 # specific library imports
-from calc import UndefinedVariable, UnmatchedParenthesis, evaluator
+from calc import UndefinedVariable, UnmatchedParenthesis, VectorizationError, evaluator, vectorized_evaluator
 from cmath import isnan
 from openedx.core.djangolib.markup import HTML, Text
 
 from . import correctmap
 from .registry import TagRegistry
 from .util import (
+    compare_arrays_with_tolerance,
     compare_with_tolerance,
     contextualize_text,
     convert_files_to_filenames,
@@ -3183,16 +3184,40 @@ class FormulaResponse(LoncapaResponse):
         "correct" or "incorrect".
         """
         var_dict_list = self.randomize_variables(samples)
-        student_result = self.tupleize_answers(given, var_dict_list)
-        instructor_result = self.tupleize_answers(expected, var_dict_list)
+        try:
+            correct = self.check_formula_vectorized(expected, given, var_dict_list)
+        except Exception:  # pylint: disable=broad-except
+            # Evaluating the formulas sample by sample handles what cannot
+            # be vectorized, and raises the appropriate StudentInputError.
+            student_result = self.tupleize_answers(given, var_dict_list)
+            instructor_result = self.tupleize_answers(expected, var_dict_list)
 
-        correct = all(compare_with_tolerance(student, instructor, self.tolerance)
-                      for student, instructor in zip(student_result, instructor_result))
+            correct = all(compare_with_tolerance(student, instructor, self.tolerance)
+                          for student, instructor in zip(student_result, instructor_result))
         if correct:
             return "correct"
         else:
             return "incorrect"
 
+    def check_formula_vectorized(self, expected, given, var_dict_list):
+        """
+        Return whether the given answer is equal to the expected one for all
+        the samples in var_dict_list, evaluating each formula only once, for
+        the arrays of the sampled values of the variables.
+
+        Raise VectorizationError, or the errors of the evaluator, when the
+        formulas have to be evaluated sample by sample instead.
+        """
+        if not var_dict_list:
+            raise VectorizationError("No samples")
+        variables = {
+            var: numpy.array([var_dict[var] for var_dict in var_dict_list])
+            for var in var_dict_list[0]
+        }
+        student_result = vectorized_evaluator(variables, dict(), given, case_sensitive=self.case_sensitive)
+        instructor_result = vectorized_evaluator(variables, dict(), expected, case_sensitive=self.case_sensitive)
+        return compare_arrays_with_tolerance(student_result, instructor_result, self.tolerance).all()
+
     def compare_answer(self, ans1, ans2):
         """
         An external interface for comparing whether a and b are equal.
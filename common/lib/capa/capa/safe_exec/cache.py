@@ -0,0 +1,114 @@
+"""
+Two-level cache of the results of safe_exec.
+
+Problems that are not randomized per student run the same sandboxed code
+for every student, so their results are kept both in the memory of each
+process, in a bounded LRU, and in a shared cache such as memcached.  The
+results are partitioned by namespace, typically a course, and the number
+of results stored for each namespace is bounded in both levels.
+"""
+import copy
+
+from dogapi import dog_stats_api
+
+from openedx.core.lib.cache_utils import LRUCache
+
+SAFE_EXEC_CACHE_METRIC_NAME = 'capa.safe_exec.cache'
+
+# Bounds of the results kept in the memory of each process.
+LOCAL_NAMESPACES = 50
+LOCAL_ENTRIES_PER_NAMESPACE = 200
+
+# Bounds of the results kept in the shared cache.  The count of the results
+# stored for a namespace is reset after SHARED_TIMEOUT_SECONDS, by when the
+# results it counted have expired.
+SHARED_ENTRIES_PER_NAMESPACE = 10000
+SHARED_TIMEOUT_SECONDS = 24 * 60 * 60
+
+
+# The least recently used results of each namespace, shared by all the
+# SafeExecCaches of a process, as an LRUCache of the LRUCaches of each namespace.
+LOCAL_RESULTS = LRUCache(LOCAL_NAMESPACES)
+
+
+class SafeExecCache(object):
+    """
+    Cache of the results of safe_exec in a namespace, with the get and set
+    methods it expects of its `cache`.
+
+    `shared_cache` is a Django cache, or any object with its get, set, add
+    and incr methods.  `local_results` is an LRUCache of the LRUCaches of
+    the local results of each namespace.  Results are deep copied in and out
+    of the local level, as they would be pickled by a shared cache, so that
+    changes made by the caller to the globals do not alter the cached results.
+    """
+    def __init__(self, shared_cache, namespace, local_results=LOCAL_RESULTS,
+                 max_local_entries=LOCAL_ENTRIES_PER_NAMESPACE,
+                 max_shared_entries=SHARED_ENTRIES_PER_NAMESPACE, timeout=SHARED_TIMEOUT_SECONDS):
+        self.shared_cache = shared_cache
+        self.namespace = namespace
+        self.local_results = local_results
+        self.max_local_entries = max_local_entries
+        self.max_shared_entries = max_shared_entries
+        self.timeout = timeout
+
+    def get(self, key):
+        """
+        Returns the result of the given key from the local level, or else
+        from the shared cache, or None.
+        """
+        namespace_results = self.local_results.get(self.namespace)
+        value = namespace_results.get(key) if namespace_results is not None else None
+        if value is not None:
+            self._increment_metric(u'local_hit')
+            return copy.deepcopy(value)
+
+        value = self.shared_cache.get(self._shared_key(key))
+        if value is not None:
+            self._increment_metric(u'shared_hit')
+            self._set_local(key, value)
+            return value
+
+        self._increment_metric(u'miss')
+        return None
+
+    def set(self, key, value):
+        """
+        Stores the result of the given key in both levels, unless the
+        namespace already has the maximum number of shared results.
+        """
+        self._set_local(key, value)
+        if self._reserve_shared_entry():
+            self.shared_cache.set(self._shared_key(key), value, self.timeout)
+        else:
+            self._increment_metric(u'shared_full')
+
+    def _set_local(self, key, value):
+        """
+        Stores a copy of the result of the given key in the local level.
+        """
+        namespace_results = self.local_results.get(self.namespace)
+        if namespace_results is None:
+            namespace_results = LRUCache(self.max_local_entries)
+            self.local_results.set(self.namespace, namespace_results)
+        namespace_results.set(key, copy.deepcopy(value))
+
+    def _reserve_shared_entry(self):
+        """
+        Counts a new result stored in the shared cache for the namespace,
+        and returns whether it is within the maximum.
+        """
+        count_key = u'safe_exec_cache.{}.count'.format(self.namespace)
+        self.shared_cache.add(count_key, 0, self.timeout)
+        try:
+            count = self.shared_cache.incr(count_key)
+        except ValueError:
+            # The count expired or was evicted since it was added.
+            return False
+        return count <= self.max_shared_entries
+
+    def _shared_key(self, key):
+        return u'safe_exec_cache.{}.{}'.format(self.namespace, key)
+
+    def _increment_metric(self, result):
+        dog_stats_api.increment(SAFE_EXEC_CACHE_METRIC_NAME, tags=[u'result:{}'.format(result)])
@@ -0,0 +1,303 @@
+"""
+Pool of warm sandboxed Python processes for safe_exec.
+
+Starting the sandboxed interpreter and importing the modules available to
+problem code takes much longer than running most problem scripts.  The
+pool keeps processes that have already done so waiting for a job.  Each
+worker runs a single job, in its own home directory and with the limits of
+codejail, as a process started by codejail would, and is then replaced.
+When no worker is ready, the code is run by codejail as usual.
+"""
+import json
+import logging
+import os
+import resource
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+SANDBOX_POOL_METRIC_NAME = 'capa.safe_exec.pool'
+
+# Workers idle for longer than this are replaced, so that changes to the
+# sandbox environment are eventually picked up.
+DEFAULT_MAX_IDLE_SECONDS = 10 * 60
+
+# CPU seconds allowed to a worker for importing modules, on top of the
+# CPU limit of its job.
+WARM_UP_CPU_SECONDS = 10
+
+# Run by the sandboxed interpreter of each worker.  Once the modules are
+# imported, the CPU limit is lowered to that of a job, "ready" is written,
+# and the job is read from stdin.  The job is then run and its globals are
+# written to stdout, as with codejail.
+WORKER_CODE = """\
+import json
+import math
+import os
+import resource
+import sys
+
+os.environ["OPENBLAS_NUM_THREADS"] = "1"    # See TNL-6456
+
+for name in %(warm_imports)r:
+    try:
+        __import__(name)
+    except Exception:
+        pass
+
+if %(cpu_limit)r:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_limit = int(math.ceil(usage.ru_utime + usage.ru_stime)) + %(cpu_limit)r
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+
+sys.__stdout__.write("ready\\n")
+sys.__stdout__.flush()
+
+class DevNull(object):
+    def write(self, *args, **kwargs):
+        pass
+sys.stdout = DevNull()
+
+code, g_dict, python_path = json.loads(sys.stdin.readline())
+sys.path.extend(python_path)
+exec code in g_dict
+
+ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+bad_keys = ("__builtins__",)
+def jsonable(v):
+    if not isinstance(v, ok_types):
+        return False
+    try:
+        json.dumps(v)
+    except Exception:
+        return False
+    return True
+g_dict = {k: v for k, v in g_dict.iteritems() if jsonable(v) and k not in bad_keys}
+json.dump(g_dict, sys.__stdout__)
+"""
+
+
+def sandbox_command():
+    """
+    Returns the command line of the sandboxed interpreter configured for
+    codejail, and the user to run it as.
+    """
+    command = jail_code.COMMANDS['python']
+    return command['cmdline_start'], command['user']
+
+
+def set_worker_limits():
+    """
+    Sets the limits of codejail in a new worker process, allowing it the
+    additional CPU time to import modules.
+    """
+    os.setsid()
+    cpu = jail_code.LIMITS['CPU']
+    if cpu:
+        cpu += WARM_UP_CPU_SECONDS
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    fsize = jail_code.LIMITS['FSIZE']
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+    vmem = jail_code.LIMITS['VMEM']
+    if vmem:
+        resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process that imports the given modules, then waits
+    to run a single job.
+    """
+    def __init__(self, warm_imports):
+        self.started = time.time()
+        self.home_dir = tempfile.mkdtemp(prefix='codejail-')
+        # The sandbox user needs to be able to read the home directory, and
+        # to write to its tmp directory.
+        os.chmod(self.home_dir, 0o775)
+        tmp_dir = os.path.join(self.home_dir, 'tmp')
+        os.mkdir(tmp_dir)
+        os.chmod(tmp_dir, 0o777)
+
+        cmdline_start, self.user = sandbox_command()
+        cmd = []
+        if self.user:
+            cmd.extend(['sudo', '-u', self.user])
+        cmd.extend(cmdline_start)
+        cmd.extend(['-c', WORKER_CODE % {'warm_imports': warm_imports, 'cpu_limit': jail_code.LIMITS['CPU']}])
+        self.process = subprocess.Popen(
+            cmd,
+            preexec_fn=set_worker_limits,
+            cwd=self.home_dir,
+            env={'TMPDIR': 'tmp'},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True,
+        )
+        self._ready = False
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def is_ready(self):
+        """
+        Returns whether the worker has imported its modules and is waiting
+        for a job, without blocking.
+        """
+        if not self._ready and self.is_alive():
+            readable, _, _ = select.select([self.process.stdout], [], [], 0)
+            if readable:
+                self._ready = self.process.stdout.readline() == 'ready\n'
+        return self._ready and self.is_alive()
+
+    def run(self, code, globals_dict, python_path=None, extra_files=None):
+        """
+        Runs the code as codejail's safe_exec would, updating globals_dict
+        with the resulting globals.
+        """
+        extra_files = extra_files or ()
+        extra_names = set(name for name, _ in extra_files)
+        sys_path = []
+        for pydir in python_path or ():
+            pybase = os.path.basename(pydir)
+            sys_path.append(pybase)
+            if pybase not in extra_names:
+                if os.path.isdir(pydir):
+                    shutil.copytree(pydir, os.path.join(self.home_dir, pybase))
+                else:
+                    shutil.copy(pydir, self.home_dir)
+        for name, contents in extra_files:
+            with open(os.path.join(self.home_dir, name), 'wb') as extra_file:
+                extra_file.write(contents)
+
+        job = json.dumps([code, json_safe(globals_dict), sys_path])
+        killer = None
+        if jail_code.LIMITS['REALTIME']:
+            killer = threading.Timer(jail_code.LIMITS['REALTIME'], self.kill)
+            killer.start()
+        try:
+            stdout, stderr = self.process.communicate(job + '\n')
+        finally:
+            if killer is not None:
+                killer.cancel()
+
+        if self.process.returncode != 0:
+            raise SafeExecException("Couldn't execute jailed code: %s" % stderr)
+        globals_dict.update(json.loads(stdout))
+
+    def kill(self):
+        """
+        Kills the worker process, and any process it started.
+        """
+        if self.is_alive():
+            if self.user:
+                # Like codejail, kill the process group with sudo, as it is
+                # owned by the sandbox user.
+                subprocess.call(['sudo', 'pkill', '-9', '-g', str(self.process.pid)])
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+
+    def close(self):
+        """
+        Stops the worker, and removes its home directory.
+        """
+        self.kill()
+        self.process.wait()
+        shutil.rmtree(self.home_dir, ignore_errors=True)
+
+
+class SandboxPool(object):
+    """
+    Pool of warm sandbox workers, used by safe_exec once configured with
+    a size.  Workers are started by each process when it first needs them,
+    and replaced after each job.
+    """
+    def __init__(self, warm_imports):
+        self.warm_imports = warm_imports
+        self.size = 0
+        self.max_idle_seconds = DEFAULT_MAX_IDLE_SECONDS
+        self._workers = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, size, max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS):
+        """
+        Sets the number of workers kept ready, and for how long.
+        """
+        with self._lock:
+            self.size = size
+            self.max_idle_seconds = max_idle_seconds
+            self._check_workers()
+            while len(self._workers) > size:
+                self._workers.pop().close()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Runs the code in a ready worker, or else with codejail's safe_exec,
+        which takes the same arguments.
+        """
+        worker = self._acquire()
+        if worker is None:
+            return codejail_safe_exec(
+                code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+        try:
+            worker.run(code, globals_dict, python_path=python_path, extra_files=extra_files)
+        finally:
+            worker.close()
+
+    def _acquire(self):
+        """
+        Returns a ready worker, replacing it and any unhealthy worker, or
+        None if there is none.
+        """
+        if not self.size or not jail_code.is_configured('python'):
+            return None
+
+        with self._lock:
+            self._check_workers()
+            acquired = next((worker for worker in self._workers if worker.is_ready()), None)
+            if acquired is not None:
+                self._workers.remove(acquired)
+            while len(self._workers) < self.size:
+                self._workers.append(SandboxWorker(self.warm_imports))
+
+        dog_stats_api.increment(
+            SANDBOX_POOL_METRIC_NAME,
+            tags=[u'result:{}'.format(u'miss' if acquired is None else u'hit')],
+        )
+        return acquired
+
+    def _check_workers(self):
+        """
+        Closes the workers that died or were idle for too long.
+        """
+        if self._pid != os.getpid():
+            # Any workers were started by the parent of this forked process.
+            self._workers = []
+            self._pid = os.getpid()
+
+        healthy = []
+        for worker in self._workers:
+            if worker.is_alive() and time.time() - worker.started < self.max_idle_seconds:
+                healthy.append(worker)
+            else:
+                log.info(
+                    'Replacing sandbox worker started at %s, with exit status %s',
+                    worker.started, worker.process.poll(),
+                )
+                worker.close()
+        self._workers = healthy
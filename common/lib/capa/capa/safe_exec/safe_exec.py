@@ -1,9 +1,9 @@
 """Capa's specialized use of codejail.safe_exec."""
 
-from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from .pool import SandboxPool
 from dogapi import dog_stats_api
 from six import text_type
 
@@ -50,6 +50,10 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# Warm sandbox workers, which run code with codejail's limits.  The pool
+# is empty, and codejail is used directly, until it is configured.
+SANDBOX_POOL = SandboxPool(warm_imports=[modname for _, modname in ASSUMED_IMPORTS])
+
 
 def update_hash(hasher, obj):
     """
@@ -74,6 +78,15 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def _without_uncached_globals(safe_globals, uncached_globals):
+    """
+    Return the `safe_globals` dict, without the names in `uncached_globals`.
+    """
+    for name in uncached_globals:
+        safe_globals.pop(name, None)
+    return safe_globals
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -84,6 +97,7 @@ def safe_exec(
     cache=None,
     slug=None,
     unsafely=False,
+    uncached_globals=(),
 ):
     """
     Execute python code safely.
@@ -105,6 +119,11 @@ def safe_exec(
     to cache the execution, taking into account the code, the values of the globals,
     and the random seed.
 
+    `uncached_globals` are the names of globals that the code does not read,
+    such as ones that differ for each user.  They are neither part of the
+    cache key nor restored from a cached result, so that the result can be
+    shared by callers that only differ in their values.
+
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
 
@@ -113,7 +132,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
+        safe_globals = _without_uncached_globals(json_safe(globals_dict), uncached_globals)
         md5er = hashlib.md5()
         md5er.update(repr(code))
         update_hash(md5er, safe_globals)
@@ -135,7 +154,7 @@ def safe_exec(
     if unsafely:
         exec_fn = codejail_not_safe_exec
     else:
-        exec_fn = codejail_safe_exec
+        exec_fn = SANDBOX_POOL.safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
     try:
@@ -151,7 +170,7 @@ def safe_exec(
     # Put the result back in the cache.  This is complicated by the fact that
     # the globals dict might not be entirely serializable.
     if cache:
-        cleaned_results = json_safe(globals_dict)
+        cleaned_results = _without_uncached_globals(json_safe(globals_dict), uncached_globals)
         cache.set(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
@@ -0,0 +1,85 @@
+"""Test cache.py"""
+
+import unittest
+
+from capa.safe_exec.cache import SafeExecCache
+from openedx.core.lib.cache_utils import LRUCache
+
+
+class DictSharedCache(object):
+    """A shared cache implementation over a simple dict, for testing."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.cache[key] = value
+
+    def add(self, key, value, timeout=None):
+        if key in self.cache:
+            return False
+        self.cache[key] = value
+        return True
+
+    def incr(self, key):
+        if key not in self.cache:
+            raise ValueError("Key '{}' not found".format(key))
+        self.cache[key] += 1
+        return self.cache[key]
+
+
+class TestSafeExecCache(unittest.TestCase):
+    """Test the two levels of SafeExecCache."""
+
+    def setUp(self):
+        super(TestSafeExecCache, self).setUp()
+        self.shared_cache = DictSharedCache()
+        self.local_results = LRUCache(max_size=2)
+
+    def make_cache(self, namespace, **kwargs):
+        return SafeExecCache(
+            self.shared_cache, namespace, local_results=self.local_results, max_local_entries=2, **kwargs
+        )
+
+    def test_local_then_shared(self):
+        cache = self.make_cache('course')
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', (None, {'a': [1]}))
+        self.assertEqual(cache.get('key'), (None, {'a': [1]}))
+
+        # Changes to a result do not alter the cached one.
+        cache.get('key')[1]['a'].append(2)
+        self.assertEqual(cache.get('key'), (None, {'a': [1]}))
+
+        # Results missing from the local level are read from the shared cache.
+        self.local_results.clear()
+        self.assertEqual(self.make_cache('course').get('key'), (None, {'a': [1]}))
+        self.shared_cache.cache.clear()
+        self.assertEqual(self.make_cache('course').get('key'), (None, {'a': [1]}))
+
+    def test_namespaces(self):
+        self.make_cache('course').set('key', (None, {'a': 1}))
+        self.assertIsNone(self.make_cache('other_course').get('key'))
+
+    def test_local_bounds(self):
+        cache = self.make_cache('course')
+        for key in ['first', 'second', 'third']:
+            cache.set(key, (None, {}))
+        self.assertIsNone(self.local_results.get('course').get('first'))
+        self.assertEqual(self.local_results.get('course').get('third'), (None, {}))
+
+        self.make_cache('second_course').set('key', (None, {}))
+        self.make_cache('third_course').set('key', (None, {}))
+        self.assertIsNone(self.local_results.get('course'))
+        self.assertEqual(self.local_results.get('third_course').get('key'), (None, {}))
+
+    def test_shared_bounds(self):
+        cache = self.make_cache('course', max_shared_entries=2)
+        for key in ['first', 'second', 'third']:
+            cache.set(key, (None, {}))
+        self.local_results.clear()
+        self.assertEqual(cache.get('second'), (None, {}))
+        self.assertIsNone(cache.get('third'))
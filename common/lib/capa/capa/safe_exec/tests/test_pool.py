@@ -0,0 +1,66 @@
+"""Test pool.py"""
+
+import sys
+import time
+import unittest
+
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec.pool import SandboxPool
+
+
+@patch('capa.safe_exec.pool.sandbox_command', return_value=([sys.executable, '-E', '-B'], None))
+@patch('capa.safe_exec.pool.jail_code.is_configured', return_value=True)
+class TestSandboxPool(unittest.TestCase):
+    """Test that the pool runs code in warm workers."""
+    # pylint: disable=protected-access
+
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(warm_imports=['math'])
+        self.pool.configure(size=1)
+        self.addCleanup(self.pool.configure, size=0)
+
+    def safe_exec_in_worker(self, code, globals_dict):
+        """Wait for the workers to be ready, then run the code in one of them."""
+        deadline = time.time() + 10
+        while not all(worker.is_ready() for worker in self.pool._workers):
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+        with patch('capa.safe_exec.pool.codejail_safe_exec') as mock_codejail_safe_exec:
+            self.pool.safe_exec(code, globals_dict)
+        self.assertFalse(mock_codejail_safe_exec.called)
+
+    def test_codejail_until_ready(self, *_mocks):
+        with patch('capa.safe_exec.pool.codejail_safe_exec') as mock_codejail_safe_exec:
+            self.pool.safe_exec("a = 17", {})
+        self.assertTrue(mock_codejail_safe_exec.called)
+        self.assertEqual(len(self.pool._workers), 1)
+
+    def test_run_in_worker(self, *_mocks):
+        self.pool._acquire()
+        g = {'b': 2}
+        self.safe_exec_in_worker("import math\na = int(math.sqrt(289)) + b", g)
+        self.assertEqual(g['a'], 19)
+
+        # The worker was replaced.
+        self.assertEqual(len(self.pool._workers), 1)
+        self.safe_exec_in_worker("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_raising_exceptions(self, *_mocks):
+        self.pool._acquire()
+        with self.assertRaises(SafeExecException) as context:
+            self.safe_exec_in_worker("1/0", {})
+        self.assertIn("ZeroDivisionError", context.exception.message)
+
+    def test_dead_worker_replaced(self, *_mocks):
+        self.pool._acquire()
+        dead_worker = self.pool._workers[0]
+        dead_worker.process.kill()
+        dead_worker.process.wait()
+
+        self.assertIsNone(self.pool._acquire())
+        self.assertNotIn(dead_worker, self.pool._workers)
+        self.assertEqual(len(self.pool._workers), 1)
@@ -167,6 +167,20 @@ class TestSafeExecCaching(unittest.TestCase):
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_uncached_globals(self):
+        code = "b = a + 1"
+        cache = {}
+        g = {'a': 1, 'student': 'alice'}
+        safe_exec(code, g, cache=DictCache(cache), uncached_globals=['student'])
+        self.assertEqual(cache.values()[0], (None, {'a': 1, 'b': 2}))
+
+        # The cached result is used whatever the value of the uncached global,
+        # which it does not overwrite.
+        cache[cache.keys()[0]] = (None, {'a': 1, 'b': 17})
+        g = {'a': 1, 'student': 'bob'}
+        safe_exec(code, g, cache=DictCache(cache), uncached_globals=['student'])
+        self.assertEqual(g, {'a': 1, 'b': 17, 'student': 'bob'})
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
@@ -4,10 +4,13 @@ Test capa problem.
 import ddt
 import textwrap
 from lxml import etree
-from mock import patch
+from mock import Mock, patch
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa.capa_problem import PROBLEM_TREE_CACHE, RENDERED_INPUT_CACHE, LoncapaProblem
+from capa.safe_exec import SafeExecCache
+from capa.safe_exec.tests.test_safe_exec import DictCache
+from capa.tests.helpers import mock_capa_module, new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -456,6 +459,137 @@ class CAPAProblemTest(unittest.TestCase):
         self.assert_question_tag(question1, question2, tag='label', label_attr=False)
         self.assert_question_tag(question1, question2, tag='p', label_attr=True)
 
+    @ddt.unpack
+    @ddt.data(
+        {'script': 'x = seed + 1', 'uncached_globals': ('anonymous_student_id',)},
+        {'script': 'x = hash(anonymous_student_id)', 'uncached_globals': ()},
+        {'script': 'x = globals()["anonymous_student_id"]', 'uncached_globals': ()},
+        {'script': 'import math\nx = math.sqrt(seed)', 'uncached_globals': ('anonymous_student_id',)},
+        {'script': 'x = getattr(math, "sqrt")(seed)', 'uncached_globals': ('anonymous_student_id',)},
+        {'script': 'x = "{:.2f}".format(seed)', 'uncached_globals': ('anonymous_student_id',)},
+        {'script': 'import sys\nx = sys._getframe()', 'uncached_globals': ()},
+        {'script': 'x = getattr(f, "f_glo" + "bals")', 'uncached_globals': ()},
+        {'script': 'g = getattr', 'uncached_globals': ()},
+        {'script': 'x = f.func_globals', 'uncached_globals': ()},
+        {'script': 'x = f.__globals__', 'uncached_globals': ()},
+        {'script': 'x = "{0.f_globals}".format(f)', 'uncached_globals': ()},
+        {'script': 'x = ("{0." + "x}").format(f)', 'uncached_globals': ()},
+        {'script': 'from operator import attrgetter', 'uncached_globals': ()},
+        {'script': 'exec "x = 1"', 'uncached_globals': ()},
+    )
+    def test_script_uncached_globals(self, script, uncached_globals):
+        """
+        Verify that the results of scripts that do not read the anonymous
+        student id are cached for all students.
+        """
+        xml = '<problem><script type="loncapa/python">{}</script></problem>'.format(script)
+        capa_system = test_capa_system()
+        capa_system.cache = SafeExecCache(DictCache({}), 'course')
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            new_loncapa_problem(xml, capa_system=capa_system)
+        self.assertEqual(mock_safe_exec.call_args[1]['uncached_globals'], uncached_globals)
+
+    def test_script_globals_cached_per_student_without_switch(self):
+        """
+        Verify that the results of scripts are cached per student unless
+        the cache is a SafeExecCache.
+        """
+        xml = '<problem><script type="loncapa/python">x = seed + 1</script></problem>'
+        capa_system = test_capa_system()
+        capa_system.cache = DictCache({})
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            new_loncapa_problem(xml, capa_system=capa_system)
+        self.assertEqual(mock_safe_exec.call_args[1]['uncached_globals'], ())
+
+    def test_problem_tree_cache(self):
+        """
+        Verify that each problem gets its own copy of the tree parsed for
+        the same text, and that the text is only parsed once.
+        """
+        PROBLEM_TREE_CACHE.clear()
+        xml = """
+        <problem>
+            <stringresponse answer="blue">
+                <additional_answer>azure</additional_answer>
+                <textline/>
+            </stringresponse>
+        </problem>
+        """
+        make_xml_compatible = LoncapaProblem.make_xml_compatible
+        with patch.object(
+            LoncapaProblem, 'make_xml_compatible', autospec=True, side_effect=make_xml_compatible
+        ) as mock_make_xml_compatible:
+            first = new_loncapa_problem(xml, problem_id='first')
+            second = new_loncapa_problem(xml, problem_id='second')
+        self.assertEqual(mock_make_xml_compatible.call_count, 1)
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(first.tree.xpath('//textline/@id'), ['first_2_1'])
+        self.assertEqual(second.tree.xpath('//textline/@id'), ['second_2_1'])
+        self.assertEqual(second.tree.xpath('//additional_answer/@answer'), ['azure'])
+
+    def test_problem_tree_cache_skips_includes(self):
+        """
+        Verify that trees with included files are parsed every time.
+        """
+        PROBLEM_TREE_CACHE.clear()
+        xml = '<problem><include file="test_include.xml"/></problem>'
+        with patch.object(LoncapaProblem, '_process_includes') as mock_process_includes:
+            new_loncapa_problem(xml)
+            new_loncapa_problem(xml)
+        self.assertEqual(mock_process_includes.call_count, 2)
+        self.assertEqual(len(PROBLEM_TREE_CACHE), 0)
+
+    @ddt.unpack
+    @ddt.data(
+        {'script': 'x = seed + 1', 'state': {}, 'num_renders': 1},
+        {'script': 'x = seed + 1', 'state': {'student_answers': {'1_2_1': 'blue'}}, 'num_renders': 2},
+        {'script': 'x = seed + 1', 'state': {'input_state': {'1_2_1': {'queued': True}}}, 'num_renders': 2},
+        {'script': 'x = hash(anonymous_student_id)', 'state': {}, 'num_renders': 2},
+    )
+    def test_rendered_input_cache(self, script, state, num_renders):
+        """
+        Verify that inputs without student state are rendered once for all
+        the problems with the same text and seed.
+        """
+        RENDERED_INPUT_CACHE.clear()
+        xml = """
+        <problem>
+            <script type="loncapa/python">{}</script>
+            <stringresponse answer="blue">
+                <textline/>
+            </stringresponse>
+        </problem>
+        """.format(script)
+        capa_system = test_capa_system(render_template=Mock(return_value='<div>rendered</div>'))
+        capa_system.rendered_input_cache_scope = ('site', 'theme')
+        for _ in range(2):
+            problem = LoncapaProblem(
+                xml, id='1', seed=723, capa_system=capa_system, capa_module=mock_capa_module(), state=state
+            )
+            self.assertIn('rendered', problem.get_html())
+        self.assertEqual(capa_system.render_template.call_count, num_renders)
+
+    @ddt.data(
+        ([None, None], 2),
+        ([('site', 'theme'), ('site', 'other_theme')], 2),
+        ([('site', 'theme'), ('other_site', 'theme')], 2),
+        ([('site', 'theme'), ('site', 'theme')], 1),
+    )
+    @ddt.unpack
+    def test_rendered_input_cache_scope(self, scopes, num_renders):
+        """
+        Verify that inputs are only rendered once for the same site and
+        theme, and for each problem when there is no scope.
+        """
+        RENDERED_INPUT_CACHE.clear()
+        xml = '<problem><stringresponse answer="blue"><textline/></stringresponse></problem>'
+        render_template = Mock(return_value='<div>rendered</div>')
+        for scope in scopes:
+            capa_system = test_capa_system(render_template=render_template)
+            capa_system.rendered_input_cache_scope = scope
+            LoncapaProblem(xml, id='1', seed=723, capa_system=capa_system, capa_module=mock_capa_module()).get_html()
+        self.assertEqual(render_template.call_count, num_renders)
+
 
 @ddt.ddt
 class CAPAMultiInputProblemTest(unittest.TestCase):
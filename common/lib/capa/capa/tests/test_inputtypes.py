@@ -28,7 +28,7 @@ from capa.tests.helpers import test_capa_system
 from capa.xqueue_interface import XQUEUE_TIMEOUT
 from lxml import etree
 from lxml.html import fromstring
-from mock import ANY, patch
+from mock import ANY, Mock, patch
 from openedx.core.djangolib.markup import HTML
 from pyparsing import ParseException
 
@@ -1364,6 +1364,21 @@ class FormulaEquationTest(unittest.TestCase):
         self.assertIn('error', response)
         self.assertEqual(response['error'], "Error while rendering preview")
 
+    def test_ajax_preview_cache(self):
+        """
+        Test that previews are shared through the cache of the problem, or
+        the cache it wraps
+        """
+        shared_cache = Mock(spec=['get', 'set'])
+        for cache in (shared_cache, Mock(shared_cache=shared_cache)):
+            self.the_input.capa_system.cache = cache
+            with patch('capa.inputtypes.latex_preview') as mock_preview:
+                self.the_input.handle_ajax(
+                    "preview_formcalc",
+                    {'formula': 'x^2+1/2', 'request_start': 1, }
+                )
+            mock_preview.assert_called_once_with('x^2+1/2', cache=shared_cache)
+
 
 class DragAndDropTest(unittest.TestCase):
     """
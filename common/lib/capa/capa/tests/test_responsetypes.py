@@ -575,6 +575,40 @@ class FormulaResponseTest(ResponseTest):
         self.assertTrue(problem.responders.values()[0].validate_answer('14*x'))
         self.assertFalse(problem.responders.values()[0].validate_answer('3*y+2*x'))
 
+    def test_grade_vectorized(self):
+        """
+        Test that formulas are evaluated once for all samples when possible.
+        """
+        sample_dict = {'x': (-10, 10), 'y': (1, 2)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="sqrt(x)*y + i")
+        responder = problem.responders.values()[0]
+        with mock.patch.object(responder, 'tupleize_answers') as mock_tupleize:
+            self.assert_grade(problem, "y*sqrt(x) + j", "correct")
+            self.assert_grade(problem, "y*sqrt(-x) + j", "incorrect")
+        self.assertFalse(mock_tupleize.called)
+
+    def test_grade_not_vectorized(self):
+        """
+        Test that formulas that cannot be evaluated for arrays of samples
+        are evaluated sample by sample.
+        """
+        sample_dict = {'x': (1, 2)}
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="x||0")
+        self.assert_grade(problem, "fact(3)*x||0", "incorrect")
+
+        problem = self.build_problem(sample_dict=sample_dict,
+                                     num_samples=10,
+                                     tolerance=0.01,
+                                     answer="arccot(x)")
+        self.assert_grade(problem, "arccot(x)", "correct")
+        self.assert_grade(problem, "arccot(-x)", "incorrect")
+
 
 class StringResponseTest(ResponseTest):  # pylint: disable=missing-docstring
     xml_factory_class = StringResponseXMLFactory
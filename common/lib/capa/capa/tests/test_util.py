@@ -2,10 +2,17 @@
 Tests capa util
 """
 import unittest
+import numpy
 from lxml import etree
 
 from capa.tests.helpers import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html, get_inner_html_from_xpath, remove_markup
+from capa.util import (
+    compare_arrays_with_tolerance,
+    compare_with_tolerance,
+    sanitize_html,
+    get_inner_html_from_xpath,
+    remove_markup
+)
 
 
 class UtilTest(unittest.TestCase):
@@ -106,6 +113,20 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(111.0, complex(100.0, 0), '10%', True)
         self.assertTrue(result)
 
+    def test_compare_arrays_with_tolerance(self):
+        infinity = float('Inf')
+        student = numpy.array([100.0, 100.001, 101.0, 109.9, 110.1, 111.0, 112.0, 110.0, infinity, 100.0, 1 + 1j])
+        instructor = numpy.array([100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0, 100.0, infinity, infinity, 1j])
+        for tolerance, relative_tolerance in [('0.001%', False), ('10%', False), ('10%', True), ('10.0', False),
+                                              ('0.1', True), (10.0, False), (0.1, True), (1.0, False)]:
+            result = compare_arrays_with_tolerance(student, instructor, tolerance, relative_tolerance)
+            self.assertEqual(
+                result.tolist(),
+                [compare_with_tolerance(s, i, tolerance, relative_tolerance) for s, i in zip(student, instructor)],
+            )
+        # Either result may be a single value
+        self.assertEqual(compare_arrays_with_tolerance(student[:3], 100.0).tolist(), [True, True, False])
+
     def test_sanitize_html(self):
         """
         Test for html sanitization with bleach.
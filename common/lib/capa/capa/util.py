@@ -1,10 +1,12 @@
 """
 Utility functions for capa.
 """
+import numbers
 import re
 from decimal import Decimal
 
 import bleach
+import numpy
 from lxml import etree
 
 from calc import evaluator
@@ -17,6 +19,11 @@ from openedx.core.djangolib.markup import HTML
 # Utility functions used in CAPA responsetypes
 default_tolerance = '0.001%'
 
+# Elements of compared arrays whose difference is this close, relative to
+# their magnitude, to the tolerance are compared one by one, as a floating
+# point comparison may then not agree with that of compare_with_tolerance.
+ARRAY_COMPARISON_MARGIN = 1e-9
+
 
 def compare_with_tolerance(student_complex, instructor_complex, tolerance=default_tolerance, relative_tolerance=False):
     """
@@ -94,6 +101,62 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_arrays_with_tolerance(student_array, instructor_array, tolerance=default_tolerance,
+                                  relative_tolerance=False):
+    """
+    Compare arrays of student and instructor results elementwise, with the
+    same tolerance as compare_with_tolerance, and return the boolean array
+    of the comparisons.
+
+    The arrays are broadcast against each other, so either one may also be
+    a single result. The comparisons are made with numpy, except for those
+    of non-finite results and of differences that are too close to the
+    tolerance for a floating point comparison to be relied on, which are
+    left to compare_with_tolerance.
+    """
+    student_array, instructor_array = numpy.broadcast_arrays(
+        numpy.atleast_1d(student_array),
+        numpy.atleast_1d(instructor_array),
+    )
+
+    if isinstance(tolerance, (str, numbers.Number)):
+        bound = tolerance
+        relative = relative_tolerance
+        if isinstance(tolerance, str):
+            if tolerance == default_tolerance:
+                relative = True
+            if tolerance.endswith('%'):
+                bound = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+                if not relative:
+                    bound = bound * abs(instructor_array)
+            else:
+                bound = evaluator(dict(), dict(), tolerance)
+
+        magnitude = numpy.maximum(abs(student_array), abs(instructor_array))
+        if relative:
+            bound = bound * magnitude
+
+        with numpy.errstate(invalid='ignore', over='ignore'):
+            difference = abs(student_array - instructor_array)
+            within = numpy.array(difference <= bound)
+            uncertain = numpy.array(
+                ~(numpy.isfinite(difference) & numpy.isfinite(bound)) |
+                (abs(difference - bound) <= ARRAY_COMPARISON_MARGIN * numpy.maximum(magnitude, abs(bound)))
+            )
+    else:
+        within = numpy.zeros(student_array.shape, dtype=bool)
+        uncertain = numpy.ones(student_array.shape, dtype=bool)
+
+    for index in zip(*numpy.nonzero(uncertain)):
+        within[index] = compare_with_tolerance(
+            student_array[index].item(),
+            instructor_array[index].item(),
+            tolerance,
+            relative_tolerance,
+        )
+    return within
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -70,11 +70,14 @@ class XQueueInterface(object):
     Interface to the external grading system
     """
 
-    def __init__(self, url, django_auth, requests_auth=None):
+    def __init__(self, url, django_auth, requests_auth=None, defer_submission=None):
         self.url = unicode(url)
         self.auth = django_auth
         self.session = requests.Session()
         self.session.auth = requests_auth
+        # Called with the header and body of each submission without files, returns
+        # whether the submission will be delivered later, rather than now.
+        self.defer_submission = defer_submission
 
     def send_to_queue(self, header, body, files_to_upload=None):
         """
@@ -98,6 +101,17 @@ class XQueueInterface(object):
             u'queue:{}'.format(queue_name)
         ])
 
+        if files_to_upload is None and self.defer_submission is not None and self.defer_submission(header, body):
+            return (0, 'queued for delivery')
+
+        return self.deliver(header, body, files_to_upload)
+
+    def deliver(self, header, body, files_to_upload=None):
+        """
+        Submit a request to xqueue now, logging in if needed.
+
+        Takes the same arguments, and returns the same values, as send_to_queue.
+        """
         # Attempt to send to queue
         (error, msg) = self._send_to_queue(header, body, files_to_upload)
 
@@ -4,8 +4,9 @@ from fractions import Fraction
 
 import markupsafe
 import nltk
+from calc.lru import LRUCache
 from nltk.tree import Tree
-from pyparsing import Literal, OneOrMore, ParseException, StringEnd
+from pyparsing import OneOrMore, ParseException, StringEnd, oneOf
 
 
 ARROWS = ('<->', '->')
@@ -25,9 +26,14 @@ elements = ['Ac', 'Ag', 'Al', 'Am', 'Ar', 'As', 'At', 'Au', 'B', 'Ba', 'Be',
 digits = map(str, range(10))
 symbols = list("[](){}^+-/")
 phases = ["(s)", "(l)", "(g)", "(aq)"]
-tokens = reduce(lambda a, b: a ^ b, map(Literal, elements + digits + symbols + phases))
+# oneOf matches the longest of the tokens with a single regular expression,
+# rather than trying each of them in turn.
+tokens = oneOf(elements + digits + symbols + phases)
 tokenizer = OneOrMore(tokens) + StringEnd()
 
+# The number of parsed chemical expressions kept for reuse by _get_final_tree.
+TREE_CACHE_SIZE = 1024
+
 # HTML, Text are temporarily copied from openedx.core.djangolib.markup
 # These libraries need to be moved out of edx-platform to be used by
 # other applications.
@@ -254,9 +260,53 @@ def render_to_html(eq):
     return spanify(render_expression(left) + render_arrow(arrow) + render_expression(right))
 
 
+class TreeCache(LRUCache):
+    """
+    Least recently used cache of the final trees of chemical expressions.
+
+    The preview of a chemical equation input is rendered on every keystroke,
+    and grading compares the same expressions again, so the final tree of
+    each expression is kept.  So is the ParseException of each invalid
+    expression, as most of the expressions typed so far are.
+    """
+    def get_final_tree(self, s):
+        """
+        Return the final tree of the given expression, which must not be
+        modified.
+
+        Raises pyparsing.ParseException if s is invalid.
+        """
+        # str and unicode expressions are parsed into trees of their own type.
+        key = (type(s), s)
+        tree = self.get(key)
+        if tree is None:
+            try:
+                tree = _parse_final_tree(s)
+            except ParseException as err:
+                tree = err
+            self.set(key, tree)
+
+        if isinstance(tree, ParseException):
+            raise tree
+        return tree
+
+
+TREE_CACHE = TreeCache(TREE_CACHE_SIZE)
+
+
 def _get_final_tree(s):
     """
-    Return final tree after merge and clean.
+    Return final tree after merge and clean, reusing the tree of an earlier
+    call.  The tree must not be modified.
+
+    Raises pyparsing.ParseException if s is invalid.
+    """
+    return TREE_CACHE.get_final_tree(s)
+
+
+def _parse_final_tree(s):
+    """
+    Parse s into its final tree, after merge and clean.
 
     Raises pyparsing.ParseException if s is invalid.
     """
@@ -1,13 +1,37 @@
 import codecs
+import sys
 import unittest
 from fractions import Fraction
+from timeit import default_timer
+
+from pyparsing import ParseException
 
 import chem.miller
 
-from .chemcalc import chemical_equations_equal, compare_chemical_expression, divide_chemical_expression, render_to_html
+from .chemcalc import (
+    TREE_CACHE,
+    TreeCache,
+    chemical_equations_equal,
+    compare_chemical_expression,
+    divide_chemical_expression,
+    render_to_html
+)
 
 LOCAL_DEBUG = None
 
+# Equations as typed into a chemical equation input, where '\b' is a backspace.
+# The preview of the input is rendered after every keystroke.
+KEYSTROKE_STREAMS = [
+    '2H2 + O2 -> 2H2O',
+    'CH4 + 2O2 -> CO2 + 2H2O(g)',
+    'Fe2O3 + 3CO -> 2Fe + 3CO3\b2',
+    'NaCl(aq) + AgNO3(aq) -> AgCl(s) + NaNO3(aq)',
+    'H^+ + OH^- <-> H2O(l)',
+    'Cu + 2Ag^+ -> Cu^2+ + 2Ag',
+    '2KMnO3\b4 -> K2MnO4 + MnO2 + O2',
+    '1/2N2 + 3/2H2 -> NH2\b3',
+]
+
 
 def log(msg, output_type=None):
     """Logging function for tests"""
@@ -485,18 +509,87 @@ class Test_Crystallography_Miller(unittest.TestCase):
         self.assertFalse(chem.miller.grade(user_input, {'miller': '(3,3,3)', 'lattice': 'fcc'}))
 
 
+def keystroke_inputs(keystrokes):
+    """
+    Yield the text of the input after each of the keystrokes.
+    """
+    text = ''
+    for key in keystrokes:
+        text = text[:-1] if key == '\b' else text + key
+        yield text
+
+
+class Test_Tree_Cache(unittest.TestCase):
+    """Tests the reuse of the trees of parsed expressions."""
+    def setUp(self):
+        super(Test_Tree_Cache, self).setUp()
+        TREE_CACHE.clear()
+        self.addCleanup(TREE_CACHE.clear)
+
+    def test_keystroke_replay(self):
+        for keystrokes in KEYSTROKE_STREAMS:
+            for text in keystroke_inputs(keystrokes):
+                TREE_CACHE.clear()
+                parsed = render_to_html(text)
+                self.assertEqual(render_to_html(text), parsed)
+
+    def test_invalid_expressions_kept(self):
+        for _ in range(2):
+            with self.assertRaises(ParseException):
+                divide_chemical_expression('H2O(', 'H2O')
+        self.assertEqual(len(TREE_CACHE), 1)
+
+    def test_least_recently_used_evicted(self):
+        tree_cache = TreeCache(max_size=2)
+        tree = tree_cache.get_final_tree('H2O')
+        tree_cache.get_final_tree('O2')
+        self.assertIs(tree_cache.get_final_tree('H2O'), tree)
+        tree_cache.get_final_tree('CO2')
+        self.assertEqual(len(tree_cache), 2)
+        self.assertIs(tree_cache.get_final_tree('H2O'), tree)
+        self.assertIsNot(tree_cache.get_final_tree('O2'), tree)
+
+
+def benchmark(repeat=10):
+    """
+    Print the time taken to render the previews of KEYSTROKE_STREAMS, parsing
+    every expression, and keeping the trees from one keystroke to the next.
+    """
+    timings = {'Uncached': 0.0, 'Cached': 0.0}
+    num_renders = 0
+    for _ in range(repeat):
+        for keystrokes in KEYSTROKE_STREAMS:
+            for name in timings:
+                TREE_CACHE.clear()
+                for text in keystroke_inputs(keystrokes):
+                    if name == 'Uncached':
+                        TREE_CACHE.clear()
+                    start = default_timer()
+                    render_to_html(text)
+                    timings[name] += default_timer() - start
+            num_renders += len(keystrokes)
+    TREE_CACHE.clear()
+
+    print 'Rendered {} keystroke previews.'.format(num_renders)
+    for name, total in sorted(timings.items(), reverse=True):
+        print '{:<8}  {:.3f} ms/keystroke'.format(name, total * 1e3 / num_renders)
+
+
 def suite():
 
     testcases = [Test_Compare_Expressions,
                  Test_Divide_Expressions,
                  Test_Render_Equations,
+                 Test_Tree_Cache,
                  Test_Crystallography_Miller]
     suites = []
     for testcase in testcases:
         suites.append(unittest.TestLoader().loadTestsFromTestCase(testcase))
     return unittest.TestSuite(suites)
 
-if __name__ == "__main__":
+if __name__ == "__main__" and sys.argv[1:] == ['benchmark']:
+    benchmark()
+elif __name__ == "__main__":
     LOCAL_DEBUG = True
     with codecs.open('render.html', 'w', encoding='utf-8') as f:
         unittest.TextTestRunner(verbosity=2).run(suite())
@@ -5,6 +5,7 @@ setup(
     version="0.2.0",
     packages=["chem"],
     install_requires=[
+        "calc",
         "pyparsing==2.2.0",
         "numpy==1.6.2",
         "scipy==0.14.0",
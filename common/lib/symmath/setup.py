@@ -5,6 +5,7 @@ setup(
     version="0.2",
     packages=["symmath"],
     install_requires=[
+        "calc",
         "sympy==0.7.1",
     ],
 )
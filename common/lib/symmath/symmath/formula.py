@@ -22,6 +22,7 @@ from copy import deepcopy
 from xml.sax.saxutils import unescape
 
 import sympy
+from calc.lru import LRUCache
 from lxml import etree
 from sympy import latex, sympify
 from sympy.physics.quantum.qubit import Qubit
@@ -35,6 +36,9 @@ log.warning("Dark code. Needs review before enabling in prod.")
 
 os.environ['PYTHONIOENCODING'] = 'utf-8'
 
+# The number of sympy expressions kept for reuse by my_sympify, and by formula.
+SYMPY_CACHE_SIZE = 1024
+
 #-----------------------------------------------------------------------------
 
 
@@ -107,10 +111,42 @@ def my_evalf(expr, chop=False):
         return expr
 
 
+class SympyCache(LRUCache):
+    """
+    Least recently used cache of the sympy expressions parsed from strings
+    or MathML.
+
+    Answers are checked again on every submission, and the expected answer
+    of a problem for every student, so the parsed expressions are kept.
+    Only sympy Basic expressions are kept, as they are immutable; lists and
+    matrices are parsed again.
+    """
+    def set(self, key, sexpr):
+        """
+        Keep the given expression, if it is immutable.
+        """
+        if isinstance(sexpr, sympy.Basic):
+            super(SympyCache, self).set(key, sexpr)
+
+
+SYMPIFY_CACHE = SympyCache(SYMPY_CACHE_SIZE)
+FORMULA_CACHE = SympyCache(SYMPY_CACHE_SIZE)
+
+
 def my_sympify(expr, normphase=False, matrix=False, abcsym=False, do_qubit=False, symtab=None):
     """
     Version of sympify to import expression into sympy
+
+    Expressions given as strings with the default symbol table are kept in
+    SYMPIFY_CACHE.
     """
+    cache_key = None
+    if isinstance(expr, basestring) and not symtab:
+        cache_key = (type(expr), expr, normphase, matrix, abcsym, do_qubit)
+        sexpr = SYMPIFY_CACHE.get(cache_key)
+        if sexpr is not None:
+            return sexpr
+
     # make all lowercase real?
     if symtab:
         varset = symtab
@@ -165,6 +201,8 @@ def my_sympify(expr, normphase=False, matrix=False, abcsym=False, do_qubit=False
 
     if matrix:
         sexpr = to_matrix(sexpr)
+    if cache_key is not None:
+        SYMPIFY_CACHE.set(cache_key, sexpr)
     return sexpr
 
 #-----------------------------------------------------------------------------
@@ -446,6 +484,13 @@ class formula(object):
         if xml is None:	 # root
             if not self.is_mathml():
                 return my_sympify(self.expr)
+            # Formulas with unhashable options, such as lists, are parsed every time.
+            cache_key = None
+            if self.options is None or isinstance(self.options, basestring):
+                cache_key = (self.expr, self.options)
+                self.the_sympy = FORMULA_CACHE.get(cache_key)
+                if self.the_sympy is not None:
+                    return self.the_sympy
             if self.is_presentation_mathml():
                 cmml = None
                 try:
@@ -463,6 +508,8 @@ class formula(object):
                 xml = etree.fromstring(self.expr)
                 xml = self.fix_greek_in_mathml(xml)
                 self.the_sympy = self.make_sympy(xml[0])
+            if cache_key is not None:
+                FORMULA_CACHE.set(cache_key, self.the_sympy)
             return self.the_sympy
 
         def gettag(expr):
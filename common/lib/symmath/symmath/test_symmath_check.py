@@ -1,7 +1,47 @@
+import sys
+from timeit import default_timer
 from unittest import TestCase
 
+from .formula import FORMULA_CACHE, SYMPIFY_CACHE, formula, my_sympify
 from .symmath_check import symmath_check
 
+# Expected answers, and the keystrokes typing the answers of students, where
+# '\b' is a backspace.  Each answer typed so far is checked as a submission.
+KEYSTROKE_STREAMS = [
+    ('x^2+2*x*y+y^2', 'x^2+2*x*y+y^2'),
+    ('(a+b)*(a-b)', 'a^2-b^3\b2'),
+    ('sin(theta)^2+cos(theta)^2', '1'),
+    ('m*v^2/2', 'm*v^2/2'),
+    ('sqrt(2)*hbar', 'sqrt(2)*h\bhbar'),
+    ('[1, 0]', '[1,0]'),
+]
+
+DYNAMATH = '''
+<math xmlns="http://www.w3.org/1998/Math/MathML">
+  <mstyle displaystyle="true">
+  <mrow>
+    <mi>x</mi>
+    <mo>+</mo>
+    <mi>y</mi>
+  </mrow>
+</mstyle>
+</math>'''.strip()
+
+
+def keystroke_inputs(keystrokes):
+    """
+    Yield the answer typed after each of the keystrokes.
+    """
+    text = ''
+    for key in keystrokes:
+        text = text[:-1] if key == '\b' else text + key
+        yield text
+
+
+def clear_caches():
+    SYMPIFY_CACHE.clear()
+    FORMULA_CACHE.clear()
+
 
 class SymmathCheckTest(TestCase):
     def test_symmath_check_integers(self):
@@ -86,3 +126,63 @@ class SymmathCheckTest(TestCase):
             result = symmath_check(str(expect), str(ans))
             self.assertTrue('ok' in result and not result['ok'],
                             "%f should != %f" % (expect, ans))
+
+
+class SympyCacheTest(TestCase):
+    """
+    Tests the reuse of the sympy expressions parsed from answers.
+    """
+    def setUp(self):
+        super(SympyCacheTest, self).setUp()
+        clear_caches()
+        self.addCleanup(clear_caches)
+
+    def test_keystroke_replay(self):
+        for expect, keystrokes in KEYSTROKE_STREAMS:
+            for ans in keystroke_inputs(keystrokes):
+                clear_caches()
+                result = symmath_check(expect, ans, dynamath=[DYNAMATH])
+                self.assertEqual(symmath_check(expect, ans, dynamath=[DYNAMATH]), result)
+
+    def test_formula_kept(self):
+        cmathml = '<math xmlns="http://www.w3.org/1998/Math/MathML"><apply><plus/><ci>x</ci><ci>i</ci></apply></math>'
+        fsym = formula(cmathml).sympy
+        self.assertIs(formula(cmathml).sympy, fsym)
+        self.assertNotEqual(formula(cmathml, options='imaginary').sympy, fsym)
+        self.assertEqual(len(FORMULA_CACHE), 2)
+
+    def test_mutable_expressions_not_kept(self):
+        self.assertIs(my_sympify('x+y'), my_sympify('x+y'))
+        self.assertIsNot(my_sympify('[x, y]'), my_sympify('[x, y]'))
+        my_sympify('x+y', symtab={'x': 1})
+        self.assertEqual(len(SYMPIFY_CACHE), 1)
+
+
+def benchmark(repeat=10):
+    """
+    Print the time taken to check the answers of KEYSTROKE_STREAMS, parsing
+    every expression, and keeping the parsed expressions from one check to
+    the next.
+    """
+    timings = {'Uncached': 0.0, 'Cached': 0.0}
+    num_checks = 0
+    for _ in range(repeat):
+        for expect, keystrokes in KEYSTROKE_STREAMS:
+            for name in timings:
+                clear_caches()
+                for ans in keystroke_inputs(keystrokes):
+                    if name == 'Uncached':
+                        clear_caches()
+                    start = default_timer()
+                    symmath_check(expect, ans, dynamath=[DYNAMATH])
+                    timings[name] += default_timer() - start
+            num_checks += len(keystrokes)
+    clear_caches()
+
+    print 'Checked {} answers.'.format(num_checks)
+    for name, total in sorted(timings.items(), reverse=True):
+        print '{:<8}  {:.3f} ms/check'.format(name, total * 1e3 / num_checks)
+
+
+if __name__ == '__main__' and sys.argv[1:] == ['benchmark']:
+    benchmark()
@@ -332,6 +332,7 @@ class CapaMixin(ScorableXBlockMixin, CapaFields):
             cache=self.runtime.cache,
             can_execute_unsafe_code=self.runtime.can_execute_unsafe_code,
             get_python_lib_zip=self.runtime.get_python_lib_zip,
+            rendered_input_cache_scope=self.runtime.get_rendered_input_cache_scope(),
             DEBUG=self.runtime.DEBUG,
             filestore=self.runtime.filestore,
             i18n=self.runtime.service(self, "i18n"),
@@ -12,6 +12,7 @@ import sys
 from collections import OrderedDict
 from datetime import datetime
 
+import numpy
 from contracts import contract
 from pytz import UTC
 from django.utils.translation import ugettext_lazy as _
@@ -143,6 +144,33 @@ def aggregate_scores(scores):
     return all_total, graded_total
 
 
+def aggregate_score_arrays(earned, possible, graded):
+    """
+    Vectorized counterpart of aggregate_scores, for the scores of many
+    users at once.
+
+    earned, possible: 2D arrays of weighted earned and possible values,
+        with a row per user and a column per problem, containing 0 where
+        a user has no score for a problem.
+    graded: 2D boolean array of the same shape, True where the problem
+        is graded.
+    returns: A tuple of 1D arrays, with a value per user,
+        (all_earned, all_possible, graded_earned, graded_possible).
+
+    Columns are added one at a time, in problem order, so the totals are
+    identical to those summed by aggregate_scores.
+    """
+    num_users = earned.shape[0]
+    all_earned, all_possible = numpy.zeros(num_users), numpy.zeros(num_users)
+    graded_earned, graded_possible = numpy.zeros(num_users), numpy.zeros(num_users)
+    for column in range(earned.shape[1]):
+        all_earned += earned[:, column]
+        all_possible += possible[:, column]
+        graded_earned += numpy.where(graded[:, column], earned[:, column], 0.0)
+        graded_possible += numpy.where(graded[:, column], possible[:, column], 0.0)
+    return all_earned, all_possible, graded_earned, graded_possible
+
+
 def invalid_args(func, argdict):
     """
     Given a function and a dictionary of arguments, returns a set of arguments
@@ -242,6 +270,20 @@ class CourseGrader(object):
         '''Given a grade sheet, return a dict containing grading information'''
         raise NotImplementedError
 
+    def grade_percents(self, percents_by_format, num_users):
+        """
+        Vectorized counterpart of grade, for many users at once.
+
+        percents_by_format is a dict keyed by section format.  Each value
+        is a 2D array with a row per user and a column per section of that
+        format, in course order, containing the section's percent_graded,
+        or NaN where the section is not in the user's grade sheet.
+
+        Returns a 1D array with the final percentage of each user, equal to
+        the 'percent' value that grade would return for the user.
+        """
+        raise NotImplementedError
+
 
 class WeightedSubsectionsGrader(CourseGrader):
     """
@@ -297,6 +339,12 @@ class WeightedSubsectionsGrader(CourseGrader):
             'grade_breakdown': grade_breakdown
         }
 
+    def grade_percents(self, percents_by_format, num_users):
+        total_percents = numpy.zeros(num_users)
+        for subgrader, _, weight in self.subgraders:
+            total_percents += subgrader.grade_percents(percents_by_format, num_users) * weight
+        return total_percents
+
 
 class AssignmentFormatGrader(CourseGrader):
     """
@@ -457,6 +505,39 @@ class AssignmentFormatGrader(CourseGrader):
             # No grade_breakdown here
         }
 
+    def grade_percents(self, percents_by_format, num_users):
+        percents = percents_by_format.get(self.type)
+        if percents is None:
+            percents = numpy.zeros((num_users, 0))
+        rows = numpy.arange(num_users)[:, numpy.newaxis]
+
+        # As in each user's grade sheet, move the user's scores to the front,
+        # in course order, followed by placeholder scores of 0 up to min_count.
+        present = ~numpy.isnan(percents)
+        num_scores = present.sum(axis=1)
+        breakdown_length = numpy.maximum(self.min_count, num_scores)
+        width = max(self.min_count, percents.shape[1])
+        breakdown = numpy.zeros((num_users, width))
+        present_first = numpy.argsort((~present).astype(numpy.int8), axis=1, kind='mergesort')
+        breakdown[:, :percents.shape[1]] = numpy.where(present, percents, 0.0)[rows, present_first]
+        in_breakdown = numpy.arange(width) < breakdown_length[:, numpy.newaxis]
+
+        # As in total_with_drops, drop the lowest scores, breaking ties by
+        # dropping the later entries.
+        sorted_indices = numpy.lexsort(
+            (numpy.tile(numpy.arange(width), (num_users, 1)), -breakdown, ~in_breakdown), axis=1,
+        )
+        ranks = numpy.empty((num_users, width), dtype=int)
+        ranks[rows, sorted_indices] = numpy.arange(width)
+        dropped = ranks >= (breakdown_length - self.drop_count)[:, numpy.newaxis]
+        kept = in_breakdown & ~dropped
+
+        total_percents = numpy.zeros(num_users)
+        for column in range(width):
+            total_percents += numpy.where(kept[:, column], breakdown[:, column], 0.0)
+        num_kept = breakdown_length - self.drop_count
+        return numpy.where(num_kept > 0, total_percents / numpy.maximum(num_kept, 1), total_percents)
+
 
 def _iter_graded(scores):
     """
@@ -1687,7 +1687,7 @@ class ModuleSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):
             cache=None, can_execute_unsafe_code=None, replace_course_urls=None,
             replace_jump_to_id_urls=None, error_descriptor_class=None, get_real_user=None,
             field_data=None, get_user_role=None, rebind_noauth_module_to_user=None,
-            user_location=None, get_python_lib_zip=None, **kwargs):
+            user_location=None, get_python_lib_zip=None, get_rendered_input_cache_scope=None, **kwargs):
         """
         Create a closure around the system environment.
 
@@ -1740,6 +1740,12 @@ class ModuleSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):
             bytestring is the contents of a zip file that should be importable
             by other Python code running in the module.
 
+        get_rendered_input_cache_scope - A function returning a hashable value
+            that identifies how templates are rendered for the current request,
+            such as its site and theme, under which capa inputs without student
+            state can be rendered once for all students, or None to render them
+            for each student.
+
         error_descriptor_class - The class to use to render XModules with errors
 
         get_real_user - function that takes `anonymous_student_id` and returns real user_id,
@@ -1781,6 +1787,7 @@ class ModuleSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):
         self.cache = cache or DoNothingCache()
         self.can_execute_unsafe_code = can_execute_unsafe_code or (lambda: False)
         self.get_python_lib_zip = get_python_lib_zip or (lambda: None)
+        self.get_rendered_input_cache_scope = get_rendered_input_cache_scope or (lambda: None)
         self.replace_course_urls = replace_course_urls
         self.replace_jump_to_id_urls = replace_jump_to_id_urls
         self.error_descriptor_class = error_descriptor_class
@@ -10,7 +10,7 @@ from django.db import transaction
 from opaque_keys.edx.keys import CourseKey, UsageKey
 
 from openedx.core.djangoapps.request_cache import get_cache
-from courseware.field_overrides import FieldOverrideProvider
+from courseware.field_overrides import FieldOverrideProvider, clear_override_indexes
 from lms.djangoapps.ccx.models import CcxFieldOverride, CustomCourseForEdX
 
 log = logging.getLogger(__name__)
@@ -46,6 +46,22 @@ class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
             return get_override_for_ccx(ccx, block, name, default)
         return default
 
+    def get_overrides(self, course_key):
+        """
+        Publishes all of the overrides of the ccx that is active for the course.
+        """
+        ccx = get_current_ccx(course_key)
+        if not ccx:
+            return {}
+
+        overrides = dict(_get_overrides_for_ccx(ccx))
+        # As in get_override_for_ccx, the LMS never links back to Studio.
+        overrides[None] = {'course_edit_method': None}
+        return overrides
+
+    def override_key(self, block):
+        return _clean_ccx_key(block.location)
+
     @classmethod
     def enabled_for(cls, block):
         """
@@ -174,6 +190,7 @@ def override_field_for_ccx(ccx, block, name, value):
 
     _get_overrides_for_ccx(ccx).setdefault(clean_ccx_key, {})[name] = value_json
     _get_overrides_for_ccx(ccx).setdefault(clean_ccx_key, {})[name + "_instance"] = override
+    clear_override_indexes()
 
 
 def clear_override_for_ccx(ccx, block, name):
@@ -207,6 +224,7 @@ def clear_ccx_field_info_from_ccx_map(ccx, block, name):  # pylint: disable=inva
         ccx_override_map.pop(name + "_instance")
     except KeyError:
         pass
+    clear_override_indexes()
 
 
 def bulk_delete_ccx_override_fields(ccx, ids):
@@ -217,3 +235,4 @@ def bulk_delete_ccx_override_fields(ccx, ids):
     ids = list(set(ids))
     if ids:
         CcxFieldOverride.objects.filter(ccx=ccx, id__in=ids).delete()
+        clear_override_indexes()
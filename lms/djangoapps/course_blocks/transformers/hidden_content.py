@@ -99,15 +99,43 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
             ),
         ]
 
+    def transform_signature(self, usage_info, block_structure):
+        """
+        Blocks are hidden based on the due dates that have already
+        passed, so the signature is the number of distinct dates, after
+        which blocks are hidden, that are not later than now.
+        """
+        if usage_info.has_staff_access:
+            return u'staff'
+
+        hidden_dates = set(
+            self._get_hidden_date(block_structure, block_key)
+            for block_key in block_structure
+            if self._get_merged_hide_after_due(block_structure, block_key)
+        )
+        # Use the same check as _is_block_hidden, so that the signature
+        # changes exactly when the blocks hidden by a date do.
+        return sum(
+            1 for hidden_date in hidden_dates
+            if not SequenceModule.verify_current_content_visibility(hidden_date, True)
+        )
+
     def _is_block_hidden(self, block_structure, block_key):
         """
         Returns whether the block with the given block_key should
         be hidden, given the current time.
         """
         hide_after_due = self._get_merged_hide_after_due(block_structure, block_key)
+        hidden_date = self._get_hidden_date(block_structure, block_key)
+        return not SequenceModule.verify_current_content_visibility(hidden_date, hide_after_due)
+
+    def _get_hidden_date(self, block_structure, block_key):
+        """
+        Returns the date after which the block with the given block_key
+        is hidden, if its hide_after_due field is set.
+        """
         self_paced = block_structure[block_structure.root_block_usage_key].self_paced
         if self_paced:
-            hidden_date = block_structure[block_structure.root_block_usage_key].end
+            return block_structure[block_structure.root_block_usage_key].end
         else:
-            hidden_date = self._get_merged_due_date(block_structure, block_key)
-        return not SequenceModule.verify_current_content_visibility(hidden_date, hide_after_due)
+            return self._get_merged_due_date(block_structure, block_key)
@@ -133,6 +133,16 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
 
         return [block_structure.create_removal_filter(check_child_removal)]
 
+    def transform_signature(self, usage_info, block_structure):
+        """
+        Library content selections are specific to each user and may be
+        updated while filtering, so only structures without any
+        library_content modules can share the outcome.
+        """
+        if any(block_key.block_type == 'library_content' for block_key in block_structure):
+            return None
+        return ()
+
     def _publish_events(self, block_structure, location, previous_count, max_count, block_keys, user_id):
         """
         Helper method to publish events for analytics purposes
@@ -85,3 +85,9 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
                 keep_descendants=True,
             )
         ]
+
+    def transform_signature(self, usage_info, block_structure):
+        """
+        The same split_test modules are removed for all users.
+        """
+        return ()
@@ -1,14 +1,28 @@
 """
 Start Date Transformer implementation.
 """
-from lms.djangoapps.courseware.access_utils import check_start_date
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pytz import UTC
+
+from lms.djangoapps.courseware.access_utils import check_start_date, in_preview_mode
+from lms.djangoapps.courseware.masquerade import is_masquerading_as_student
 from openedx.core.djangoapps.content.block_structure.transformer import (
     BlockStructureTransformer,
     FilteringTransformerMixin
 )
+from student.roles import CourseBetaTesterRole
 from xmodule.course_metadata_utils import DEFAULT_START_DATE
 
-from .utils import collect_merged_date_field
+from ..config import VECTORIZED_FILTERS, waffle
+from .utils import (
+    collect_block_array,
+    collect_merged_date_field,
+    create_array_removal_filter,
+    datetime_to_timestamp,
+    get_block_array
+)
 
 
 class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer):
@@ -27,9 +41,11 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
 
     Staff users are exempted from visibility rules.
     """
-    WRITE_VERSION = 1
+    WRITE_VERSION = 2
     READ_VERSION = 1
     MERGED_START_DATE = 'merged_start_date'
+    START_TIMESTAMPS = 'start_timestamps'
+    BETA_OFFSETS = 'beta_offsets'
 
     @classmethod
     def name(cls):
@@ -67,11 +83,37 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+        # Also collect the merged start dates and beta offsets as
+        # arrays, for the vectorized transform.
+        collect_block_array(
+            block_structure,
+            transformer=cls,
+            array_name=cls.START_TIMESTAMPS,
+            get_value=lambda block_key: datetime_to_timestamp(cls._get_merged_start_date(block_structure, block_key)),
+            dtype='float64',
+        )
+        collect_block_array(
+            block_structure,
+            transformer=cls,
+            array_name=cls.BETA_OFFSETS,
+            get_value=lambda block_key: timedelta(
+                getattr(block_structure.get_xblock(block_key), 'days_early_for_beta', None) or 0
+            ).total_seconds(),
+            dtype='float64',
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access:
             return [block_structure.create_universal_filter()]
 
+        if waffle().is_enabled(VECTORIZED_FILTERS):
+            block_keys, start_timestamps = get_block_array(block_structure, self, self.START_TIMESTAMPS)
+            if block_keys is not None:
+                return [
+                    self._create_vectorized_removal_filter(usage_info, block_structure, block_keys, start_timestamps)
+                ]
+
         removal_condition = lambda block_key: not check_start_date(
             usage_info.user,
             block_structure.get_xblock_field(block_key, 'days_early_for_beta'),
@@ -79,3 +121,50 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             usage_info.course_key,
         )
         return [block_structure.create_removal_filter(removal_condition)]
+
+    def _create_vectorized_removal_filter(self, usage_info, block_structure, block_keys, start_timestamps):
+        """
+        Returns a removal filter equivalent to the one that calls
+        check_start_date for each block, but which compares the
+        collected start dates of all blocks with the current time in a
+        single vectorized operation.
+        """
+        start_dates_disabled = settings.FEATURES['DISABLE_START_DATES']
+        if start_dates_disabled and not is_masquerading_as_student(usage_info.user, usage_info.course_key):
+            return block_structure.create_universal_filter()
+        if in_preview_mode():
+            return block_structure.create_universal_filter()
+
+        _, beta_offsets = get_block_array(block_structure, self, self.BETA_OFFSETS)
+        if beta_offsets.any() and CourseBetaTesterRole(usage_info.course_key).has_user(usage_info.user):
+            start_timestamps = start_timestamps - beta_offsets
+
+        now = datetime_to_timestamp(datetime.now(UTC))
+        return create_array_removal_filter(block_structure, block_keys, start_timestamps >= now)
+
+    def transform_signature(self, usage_info, block_structure):
+        """
+        Blocks are removed based on the start dates that have already
+        passed, so the signature is the number of distinct effective
+        start dates in the structure that are earlier than now.
+        """
+        if usage_info.has_staff_access:
+            return u'staff'
+
+        if settings.FEATURES['DISABLE_START_DATES'] or in_preview_mode():
+            # Access then depends on masquerading and the request's host.
+            return None
+
+        is_beta_tester = CourseBetaTesterRole(usage_info.course_key).has_user(usage_info.user)
+        effective_start_dates = set()
+        for block_key in block_structure:
+            start = self._get_merged_start_date(block_structure, block_key)
+            if not start:
+                continue
+            days_early_for_beta = block_structure.get_xblock_field(block_key, 'days_early_for_beta')
+            if is_beta_tester and days_early_for_beta is not None:
+                start -= timedelta(days_early_for_beta)
+            effective_start_dates.add(start)
+
+        now = datetime.now(UTC)
+        return (is_beta_tester, sum(1 for start in effective_start_dates if now > start))
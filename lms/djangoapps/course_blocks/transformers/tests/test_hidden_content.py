@@ -5,9 +5,13 @@ from datetime import timedelta
 
 import ddt
 from django.utils.timezone import now
+from mock import patch
 from nose.plugins.attrib import attr
 
+from openedx.core.djangoapps.content.block_structure.api import clear_course_from_cache, get_course_in_cache
+
 from ..hidden_content import HiddenContentTransformer
+from ..usage_info import CourseUsageInfo
 from .helpers import BlockParentsMapTestCase, update_block
 
 
@@ -82,3 +86,23 @@ class HiddenContentTransformerTestCase(BlockParentsMapTestCase):
             blocks_with_differing_access=None,
             transformers=self.transformers,
         )
+
+    def test_transform_signature_at_due_date(self):
+        due = self.DueDateType.FUTURE_DATE
+        block = self.get_block(1)
+        block.due = due
+        block.hide_after_due = True
+        update_block(block)
+
+        clear_course_from_cache(self.course.id)
+        block_structure = get_course_in_cache(self.course.id)
+        usage_info = CourseUsageInfo(self.course.id, self.student)
+        transformer = HiddenContentTransformer()
+        # The signature counts the due date as passed exactly when the block is hidden.
+        with patch('xmodule.seq_module.datetime') as mock_datetime:
+            one_second = timedelta(seconds=1)
+            for current_time, is_hidden in ((due - one_second, False), (due, True), (due + one_second, True)):
+                mock_datetime.now.return_value = current_time
+                self.assertEqual(transformer.transform_signature(usage_info, block_structure), int(is_hidden))
+                # pylint: disable=protected-access
+                self.assertEqual(transformer._is_block_hidden(block_structure, self.xblock_keys[1]), is_hidden)
@@ -10,6 +10,7 @@ from nose.plugins.attrib import attr
 
 from courseware.tests.factories import BetaTesterFactory
 
+from ...config import VECTORIZED_FILTERS, waffle
 from ..start_date import DEFAULT_START_DATE, StartDateTransformer
 from .helpers import BlockParentsMapTestCase, update_block
 
@@ -115,9 +116,12 @@ class StartDateTransformerTestCase(BlockParentsMapTestCase):
             block.start = self.StartDateType.start(start_date_type)
             update_block(block)
 
-        self.assert_transform_results(
-            self.beta_user if user_type == self.BETA_USER else self.student,
-            expected_student_visible_blocks,
-            blocks_with_differing_student_access,
-            self.transformers,
-        )
+        # The vectorized filter must yield the same results.
+        for vectorized in (False, True):
+            with waffle().override(VECTORIZED_FILTERS, active=vectorized):
+                self.assert_transform_results(
+                    self.beta_user if user_type == self.BETA_USER else self.student,
+                    expected_student_visible_blocks,
+                    blocks_with_differing_student_access,
+                    self.transformers,
+                )
@@ -4,6 +4,7 @@ Tests for VisibilityTransformer.
 import ddt
 from nose.plugins.attrib import attr
 
+from ...config import VECTORIZED_FILTERS, waffle
 from ..visibility import VisibilityTransformer
 from .helpers import BlockParentsMapTestCase, update_block
 
@@ -39,9 +40,12 @@ class VisibilityTransformerTestCase(BlockParentsMapTestCase):
             block.visible_to_staff_only = (idx in staff_only_blocks)
             update_block(block)
 
-        self.assert_transform_results(
-            self.student,
-            expected_visible_blocks,
-            blocks_with_differing_access,
-            self.transformers,
-        )
+        # The vectorized filter must yield the same results.
+        for vectorized in (False, True):
+            with waffle().override(VECTORIZED_FILTERS, active=vectorized):
+                self.assert_transform_results(
+                    self.student,
+                    expected_visible_blocks,
+                    blocks_with_differing_access,
+                    self.transformers,
+                )
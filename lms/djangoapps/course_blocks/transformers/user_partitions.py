@@ -92,6 +92,22 @@ class UserPartitionTransformer(FilteringTransformerMixin, BlockStructureTransfor
         result_list.append(group_access_filter)
         return result_list
 
+    def transform_signature(self, usage_info, block_structure):
+        """
+        Users in the same group for each partition have access to the
+        same blocks.
+        """
+        user_partitions = block_structure.get_transformer_data(self, 'user_partitions')
+        if not user_partitions:
+            return ()
+
+        if usage_info.has_staff_access:
+            # Staff access is checked for each block individually.
+            return None
+
+        user_groups = _get_user_partition_groups(usage_info.course_key, user_partitions, usage_info.user)
+        return tuple(sorted((partition_id, group.id) for partition_id, group in user_groups.iteritems()))
+
 
 class _MergedGroupAccess(object):
     """
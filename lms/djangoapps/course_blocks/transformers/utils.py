@@ -1,6 +1,9 @@
 """
 Common Helper utilities for transformers
 """
+from calendar import timegm
+
+import numpy
 
 
 def get_field_on_block(block, field_name, default_value=None):
@@ -147,3 +150,60 @@ def collect_merged_date_field(
             merged_field_name,
             merged_date_value
         )
+
+
+def collect_block_array(block_structure, transformer, array_name, get_value, dtype):
+    """
+    Collects a NumPy array of the values returned by get_value for
+    each block in the given block_structure and stores it, along with
+    the list of block keys in the same order, as a value of array_name
+    in the transformer's data.
+
+    This allows a transform to evaluate a condition for all blocks in a
+    single vectorized operation rather than with a callback per block.
+
+    Parameters:
+        block_structure: BlockStructure to traverse
+        transformer: transformer that will be used for
+            set_transformer_data
+        array_name: name of the transformer data to store
+        get_value: a unary lambda that returns the value for a given
+            block_key
+        dtype: NumPy data type of the array
+    """
+    block_keys = list(block_structure.topological_traversal())
+    block_values = numpy.array([get_value(block_key) for block_key in block_keys], dtype=dtype)
+    block_structure.set_transformer_data(transformer, array_name, (block_keys, block_values))
+
+
+def get_block_array(block_structure, transformer, array_name):
+    """
+    Returns the (block_keys, block_values) pair collected by
+    collect_block_array, or (None, None) if it was not collected.
+    """
+    return block_structure.get_transformer_data(transformer, array_name, (None, None))
+
+
+def create_array_removal_filter(block_structure, block_keys, removal_mask):
+    """
+    Returns a removal filter for the given block_structure that removes
+    the blocks for which the corresponding value in the given boolean
+    removal_mask array is True.
+
+    Parameters:
+        block_structure: BlockStructure to filter
+        block_keys: list of block keys, as collected by
+            collect_block_array
+        removal_mask: NumPy boolean array of the same length as
+            block_keys
+    """
+    removed_block_keys = {block_keys[index] for index in numpy.flatnonzero(removal_mask)}
+    return block_structure.create_removal_filter(lambda block_key: block_key in removed_block_keys)
+
+
+def datetime_to_timestamp(date):
+    """
+    Returns the given timezone-aware datetime as a number of seconds
+    since the epoch, for use in collected NumPy arrays.
+    """
+    return timegm(date.utctimetuple()) + date.microsecond / 1e6
@@ -6,7 +6,8 @@ from openedx.core.djangoapps.content.block_structure.transformer import (
     FilteringTransformerMixin
 )
 
-from .utils import collect_merged_boolean_field
+from ..config import VECTORIZED_FILTERS, waffle
+from .utils import collect_block_array, collect_merged_boolean_field, create_array_removal_filter, get_block_array
 
 
 class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer):
@@ -22,10 +23,11 @@ class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer
 
     Staff users are exempted from visibility rules.
     """
-    WRITE_VERSION = 1
+    WRITE_VERSION = 2
     READ_VERSION = 1
 
     MERGED_VISIBLE_TO_STAFF_ONLY = 'merged_visible_to_staff_only'
+    VISIBLE_TO_STAFF_ONLY_FLAGS = 'visible_to_staff_only_flags'
 
     @classmethod
     def name(cls):
@@ -59,13 +61,33 @@ class VisibilityTransformer(FilteringTransformerMixin, BlockStructureTransformer
             merged_field_name=cls.MERGED_VISIBLE_TO_STAFF_ONLY,
         )
 
+        # Also collect the merged values as an array, for the
+        # vectorized transform.
+        collect_block_array(
+            block_structure,
+            transformer=cls,
+            array_name=cls.VISIBLE_TO_STAFF_ONLY_FLAGS,
+            get_value=lambda block_key: cls._get_visible_to_staff_only(block_structure, block_key),
+            dtype='bool',
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Visibility check.
         if usage_info.has_staff_access:
             return [block_structure.create_universal_filter()]
 
+        if waffle().is_enabled(VECTORIZED_FILTERS):
+            block_keys, visible_to_staff_only_flags = get_block_array(
+                block_structure, self, self.VISIBLE_TO_STAFF_ONLY_FLAGS
+            )
+            if block_keys is not None:
+                return [create_array_removal_filter(block_structure, block_keys, visible_to_staff_only_flags)]
+
         return [
             block_structure.create_removal_filter(
                 lambda block_key: self._get_visible_to_staff_only(block_structure, block_key),
             )
         ]
+
+    def transform_signature(self, usage_info, block_structure):
+        return usage_info.has_staff_access
@@ -14,7 +14,9 @@ import logging
 from datetime import datetime
 
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import AnonymousUser, User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from pytz import UTC
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from six import text_type
@@ -35,13 +37,16 @@ from courseware.access_utils import (
     check_course_open_for_learner,
 )
 from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.waffle import CACHE_ACCESS_DECISIONS, waffle
 from lms.djangoapps.ccx.custom_exception import CCXLocatorValidationException
 from lms.djangoapps.ccx.models import CustomCourseForEdX
 from mobile_api.models import IgnoreMobileAvailableFlagConfig
+from openedx.core.djangoapps import monitoring_utils
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.external_auth.models import ExternalAuthMap
+from openedx.core.djangoapps.request_cache import clear_cache, get_cache
 from student import auth
-from student.models import CourseEnrollmentAllowed
+from student.models import CourseAccessRole, CourseEnrollmentAllowed
 from student.roles import (
     CourseBetaTesterRole,
     CourseCcxCoachRole,
@@ -65,6 +70,8 @@ from xmodule.x_module import XModule
 
 log = logging.getLogger(__name__)
 
+ACCESS_DECISIONS_CACHE_NAMESPACE = u'courseware.access.decisions'
+
 
 def has_ccx_coach_role(user, course_key):
     """
@@ -124,11 +131,33 @@ def has_access(user, action, obj, course_key=None):
 
     Returns an AccessResponse object.  It is up to the caller to actually
     deny access in a way that makes sense in context.
+
+    While the courseware.cache_access_decisions switch is enabled, decisions
+    are cached for the rest of the request, unless roles change.  The number
+    of checks made, and of those answered from the cache, are reported as
+    custom metrics.
     """
     # Just in case user is passed in as None, make them anonymous
     if not user:
         user = AnonymousUser()
 
+    monitoring_utils.accumulate('has_access.checks', 1)
+    cache_key = _access_decision_cache_key(user, action, obj, course_key)
+    if cache_key is None:
+        return _has_access(user, action, obj, course_key)
+
+    decisions = get_cache(ACCESS_DECISIONS_CACHE_NAMESPACE)
+    if cache_key in decisions:
+        monitoring_utils.accumulate('has_access.cache_hits', 1)
+    else:
+        decisions[cache_key] = _has_access(user, action, obj, course_key)
+    return decisions[cache_key]
+
+
+def _has_access(user, action, obj, course_key):
+    """
+    Computes the decision of `has_access`, without caching it.
+    """
     # Preview mode is only accessible by staff.
     if in_preview_mode() and course_key:
         if not has_staff_access_to_preview_mode(user, course_key):
@@ -167,6 +196,48 @@ def has_access(user, action, obj, course_key=None):
                     .format(type(obj)))
 
 
+def _access_decision_cache_key(user, action, obj, course_key):
+    """
+    Returns the key of the access decision for the given arguments of
+    `has_access` in the request cache, or None if it isn't to be cached.
+
+    Besides the user, the key includes the real user and the masquerade
+    settings, so that decisions made while masquerading are kept apart.
+    """
+    if not waffle().is_enabled(CACHE_ACCESS_DECISIONS):
+        return None
+
+    if isinstance(obj, (CourseDescriptor, CourseOverview)):
+        obj_key = obj.id
+    elif isinstance(obj, ErrorDescriptor):
+        return None
+    elif isinstance(obj, (XModule, XBlock)):
+        obj_key = obj.location
+    elif isinstance(obj, (CourseKey, UsageKey, basestring)):
+        obj_key = obj
+    else:
+        return None
+
+    masquerade_settings = tuple(sorted(
+        (unicode(masquerade_course_key), masquerade.role, masquerade.user_partition_id,
+         masquerade.group_id, masquerade.user_name)
+        for masquerade_course_key, masquerade in getattr(user, 'masquerade_settings', {}).iteritems()
+    ))
+    real_user = getattr(user, 'real_user', user)
+    return (user.id, real_user.id, masquerade_settings, action, obj.__class__, obj_key, course_key)
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+@receiver(post_save, sender=User)
+def clear_access_decisions(**kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the access decisions cached by `has_access` during the request,
+    once the roles of a user, or the user's global staff status, change.
+    """
+    clear_cache(ACCESS_DECISIONS_CACHE_NAMESPACE)
+
+
 def has_staff_access_to_preview_mode(user, course_key):
     """
     Checks if given user can access course in preview mode.
@@ -21,12 +21,14 @@ from contextlib import contextmanager
 from django.conf import settings
 from xblock.field_data import FieldData
 
+from openedx.core.djangoapps.request_cache import clear_cache, get_cache
 from openedx.core.djangoapps.request_cache.middleware import RequestCache
 from xmodule.modulestore.inheritance import InheritanceMixin
 
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = u'courseware.field_overrides.enabled_providers.{course_id}'
 ENABLED_MODULESTORE_OVERRIDE_PROVIDERS_KEY = u'courseware.modulestore_field_overrides.enabled_providers.{course_id}'
+OVERRIDE_INDEXES_CACHE_NAMESPACE = u'courseware.field_overrides.indexes'
 
 
 def resolve_dotted(name):
@@ -89,6 +91,15 @@ def overrides_disabled():
     return bool(_OVERRIDES_DISABLED.disabled)
 
 
+def clear_override_indexes():
+    """
+    Discards the overrides published by providers during the current request.
+    Must be called whenever the overrides of a provider that publishes its
+    overrides are changed.  See `FieldOverrideProvider.get_overrides`.
+    """
+    clear_cache(OVERRIDE_INDEXES_CACHE_NAMESPACE)
+
+
 class FieldOverrideProvider(object):
     """
     Abstract class which defines the interface that a `FieldOverrideProvider`
@@ -102,6 +113,12 @@ class FieldOverrideProvider(object):
     """
     __metaclass__ = ABCMeta
 
+    # The names of the fields this provider may override, or None if it may
+    # override any field.  Providers that don't publish their overrides can
+    # declare them, so that `OverrideFieldData` doesn't search the ancestors of
+    # blocks for the overrides of other inheritable fields.
+    overridable_fields = None
+
     def __init__(self, user):
         self.user = user
 
@@ -129,6 +146,61 @@ class FieldOverrideProvider(object):
         """
         return False
 
+    def get_overrides(self, course_key):
+        """
+        Optionally publishes all of the overrides of this provider in the
+        course identified by `course_key` up front, so that they are looked up
+        by `OverrideFieldData` without calling `get`.
+
+        Returns None if the provider doesn't publish its overrides.  Otherwise
+        returns a dict mapping the keys returned by `override_key` to dicts of
+        field names to JSON values.  The dict mapped by the None key holds the
+        overrides of every block in the course.  Published overrides are used
+        for the rest of the request, unless `clear_override_indexes` is called.
+        """
+        return None
+
+    def override_key(self, block):
+        """
+        Returns the key of the overrides of `block` in the dict returned by
+        `get_overrides`.
+        """
+        return block.location
+
+
+class _OverrideIndex(object):
+    """
+    The overrides published by a `FieldOverrideProvider` for a course.
+    """
+    def __init__(self, provider, overrides):
+        self.provider = provider
+        self.overrides = overrides
+        self.all_blocks_overrides = overrides.get(None, {})
+        self.field_names = frozenset(
+            name for block_overrides in overrides.itervalues() for name in block_overrides
+        )
+
+    def get(self, block, name, default):
+        """
+        Returns the value of the override of the field named `name` in
+        `block`, or `default` if the field isn't overridden.
+        """
+        if name not in self.field_names:
+            return default
+
+        block_overrides = self.overrides.get(self.provider.override_key(block), {})
+        if name in block_overrides:
+            value = block_overrides[name]
+        elif name in self.all_blocks_overrides:
+            value = self.all_blocks_overrides[name]
+        else:
+            return default
+
+        try:
+            return block.fields[name].from_json(value)
+        except KeyError:
+            return value
+
 
 class OverrideFieldData(FieldData):
     """
@@ -142,6 +214,13 @@ class OverrideFieldData(FieldData):
     is important for this setting.  Override providers will tried in the order
     configured in the setting.  The first provider to find an override 'wins'
     for a particular field lookup.
+
+    The overrides of providers that publish them up front, with
+    `FieldOverrideProvider.get_overrides`, are indexed once per request and
+    course, so that looking them up is a dict probe.  Ancestors are only
+    searched for the overrides of inheritable fields when some provider may
+    override the field, as found from its index or its
+    `FieldOverrideProvider.overridable_fields`.
     """
     provider_classes = None
 
@@ -198,6 +277,37 @@ class OverrideFieldData(FieldData):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
 
+    def _get_index(self, provider, block):
+        """
+        Returns the `_OverrideIndex` of the overrides that `provider` publishes
+        for the course of `block`, or None if it doesn't publish them.
+        """
+        location = getattr(block, 'location', None)
+        if location is None:
+            return None
+
+        index_cache = get_cache(OVERRIDE_INDEXES_CACHE_NAMESPACE)
+        cache_key = (provider.__class__, getattr(provider.user, 'id', None), location.course_key)
+        if cache_key not in index_cache:
+            overrides = provider.get_overrides(location.course_key)
+            index_cache[cache_key] = None if overrides is None else _OverrideIndex(provider, overrides)
+        return index_cache[cache_key]
+
+    def _may_override(self, block, name):
+        """
+        Returns False if no provider overrides the field identified by `name`
+        in any block of the course of `block`, as is known when each of the
+        providers publishes its overrides or declares its overridable fields.
+        """
+        for provider in self.providers:
+            index = self._get_index(provider, block)
+            if index is None:
+                if provider.overridable_fields is None or name in provider.overridable_fields:
+                    return True
+            elif name in index.field_names:
+                return True
+        return False
+
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
@@ -205,7 +315,11 @@ class OverrideFieldData(FieldData):
         """
         if not overrides_disabled():
             for provider in self.providers:
-                value = provider.get(block, name, NOTSET)
+                index = self._get_index(provider, block)
+                if index is None:
+                    value = provider.get(block, name, NOTSET)
+                else:
+                    value = index.get(block, name, NOTSET)
                 if value is not NOTSET:
                     return value
         return NOTSET
@@ -232,7 +346,7 @@ class OverrideFieldData(FieldData):
             # then we want to return False here, so the field_data uses the
             # override and not the original value for this block.
             inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
+            if name in inheritable and self._may_override(block, name):
                 for ancestor in _lineage(block):
                     if self.get_override(ancestor, name) is not NOTSET:
                         return False
@@ -247,7 +361,7 @@ class OverrideFieldData(FieldData):
         # also handle inheritance.
         if self.providers and not overrides_disabled():
             inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
+            if name in inheritable and self._may_override(block, name):
                 for ancestor in _lineage(block):
                     value = self.get_override(ancestor, name)
                     if value is not NOTSET:
@@ -0,0 +1,64 @@
+"""
+Custom fields for use in the courseware django app.
+"""
+import zlib
+from base64 import b64decode, b64encode
+
+from django.db import models
+
+from courseware.waffle import COMPRESS_STUDENT_MODULE_STATE, waffle
+
+# Marks compressed states, and the version of their format.
+COMPRESSED_STATE_PREFIX = u'zlib:1:'
+
+# Shorter states are always stored uncompressed, as they gain little from compression.
+MIN_COMPRESSED_STATE_LENGTH = 512
+
+
+def is_compressed_state(value):
+    """
+    Returns whether the given stored state is compressed.
+    """
+    return value is not None and value.startswith(COMPRESSED_STATE_PREFIX)
+
+
+def compress_state(state):
+    """
+    Returns the compressed form of the given serialized state, or the state
+    itself if it is already compressed or isn't made shorter by compression.
+    """
+    if state is None or len(state) < MIN_COMPRESSED_STATE_LENGTH or is_compressed_state(state):
+        return state
+
+    compressed = COMPRESSED_STATE_PREFIX + b64encode(zlib.compress(state.encode('utf-8'))).decode('ascii')
+    return compressed if len(compressed) < len(state) else state
+
+
+def decompress_state(value):
+    """
+    Returns the serialized state stored as the given value, compressed or not.
+    """
+    if not is_compressed_state(value):
+        return value
+    return zlib.decompress(b64decode(value[len(COMPRESSED_STATE_PREFIX):])).decode('utf-8')
+
+
+class StudentModuleStateField(models.TextField):
+    """
+    The serialized state of a StudentModule.
+
+    States are saved compressed while the courseware.compress_student_module_state
+    switch is enabled, and both compressed and uncompressed states are read as the
+    serialized state itself. This allows existing rows to be converted in the
+    background, with the compress_student_module_state management command.
+
+    Lookups on the field only match uncompressed states.
+    """
+    def from_db_value(self, value, expression, connection, context):  # pylint: disable=unused-argument
+        return decompress_state(value)
+
+    def get_db_prep_save(self, value, connection):
+        value = super(StudentModuleStateField, self).get_db_prep_save(value, connection)
+        if waffle().is_enabled(COMPRESS_STUDENT_MODULE_STATE):
+            value = compress_state(value)
+        return value
@@ -0,0 +1,103 @@
+"""
+Command to measure the time taken to render the problems of a course, with
+and without the inputs rendered before for the same problem text and seed.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+from timeit import default_timer
+
+from capa.capa_problem import RENDERED_INPUT_CACHE
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from xblock.runtime import DictKeyValueStore, KvsFieldData
+from xmodule.modulestore.django import modulestore
+
+from courseware.module_render import get_module_for_descriptor_internal
+from openedx.core.djangoapps.util.user_utils import SystemUser
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_problem_rendering course-v1:edX+DemoX+Demo_Course --repeat 20 --settings=devstack
+
+    Each problem is rendered without student state, as on its first view, once after discarding the
+    rendered inputs, and once with the inputs rendered by the previous render.
+    """
+    help = 'Measures the time taken to render the problems of a course.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            'course_id',
+            help='The course whose problems are rendered.',
+        )
+        parser.add_argument(
+            '--repeat',
+            dest='repeat',
+            type=int,
+            default=10,
+            help='Number of times each problem is rendered.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError('Invalid course_id: {}'.format(options['course_id']))
+
+        store = modulestore()
+        course = store.get_course(course_key, depth=0)
+        if course is None:
+            raise CommandError('Course not found: {}'.format(course_key))
+
+        uncached = cached = 0.0
+        num_renders = 0
+        for descriptor in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            problem = self._get_problem(descriptor, course)
+            if not hasattr(problem, 'lcp'):
+                # The problem failed to load, and was replaced by an error module.
+                log.error('Error loading problem %s', descriptor.location)
+                continue
+            for _ in range(options['repeat']):
+                RENDERED_INPUT_CACHE.clear()
+                start = default_timer()
+                problem.lcp.get_html()
+                uncached += default_timer() - start
+
+                start = default_timer()
+                problem.lcp.get_html()
+                cached += default_timer() - start
+                num_renders += 1
+
+        if not num_renders:
+            self.stdout.write('No problems to render.')
+            return
+
+        self.stdout.write('Rendered problems {} times.'.format(num_renders))
+        for name, total in (('Uncached', uncached), ('Cached', cached)):
+            self.stdout.write('{:<8}  {:.2f} ms/render'.format(name, total * 1e3 / num_renders))
+        self.stdout.write('Speedup: {:.2f}'.format(uncached / max(cached, 1e-9)))
+
+    def _get_problem(self, descriptor, course):
+        """
+        Returns the problem module of the given descriptor, with student
+        data that is only kept in memory.
+        """
+        return get_module_for_descriptor_internal(
+            user=SystemUser(),
+            descriptor=descriptor,
+            student_data=KvsFieldData(DictKeyValueStore()),
+            course_id=course.id,
+            track_function=lambda event_type, event: None,
+            xqueue_callback_url_prefix='',
+            request_token=None,
+            course=course,
+        )
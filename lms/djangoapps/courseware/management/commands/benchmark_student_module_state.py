@@ -0,0 +1,96 @@
+"""
+Command to measure the effect of compressing the stored states of StudentModules,
+on a sample of the existing states.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import json
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.fields import compress_state, decompress_state
+from courseware.models import StudentModule
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_student_module_state --sample_size 10000 --module_type problem --settings=devstack
+
+    For each sampled state, reports its stored size with and without compression, and the time
+    taken to serialize and save it, and to read and deserialize it, excluding database queries.
+    """
+    help = 'Measures the size and latency of compressed StudentModule states.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            '--sample_size',
+            dest='sample_size',
+            type=int,
+            default=1000,
+            help='Number of the most recently created StudentModules to sample.',
+        )
+        parser.add_argument(
+            '--course_id',
+            dest='course_id',
+            help='Only sample StudentModules of the given course.',
+        )
+        parser.add_argument(
+            '--module_type',
+            dest='module_type',
+            help='Only sample StudentModules of the given type of block.',
+        )
+
+    def handle(self, *args, **options):
+        student_modules = StudentModule.objects.filter(state__isnull=False)
+        if options['course_id']:
+            student_modules = student_modules.filter(course_id=CourseKey.from_string(options['course_id']))
+        if options['module_type']:
+            student_modules = student_modules.filter(module_type=options['module_type'])
+        states = student_modules.order_by('-id').values_list('state', flat=True)[:options['sample_size']]
+
+        plain = {'size': 0, 'write': 0.0, 'read': 0.0}
+        compressed = {'size': 0, 'write': 0.0, 'read': 0.0}
+        num_states = 0
+        for state in states.iterator():
+            num_states += 1
+            value = json.loads(state)
+
+            start = default_timer()
+            stored_state = json.dumps(value)
+            plain['write'] += default_timer() - start
+            plain['size'] += len(stored_state)
+            start = default_timer()
+            json.loads(stored_state)
+            plain['read'] += default_timer() - start
+
+            start = default_timer()
+            stored_state = compress_state(json.dumps(value))
+            compressed['write'] += default_timer() - start
+            compressed['size'] += len(stored_state)
+            start = default_timer()
+            json.loads(decompress_state(stored_state))
+            compressed['read'] += default_timer() - start
+
+        if not num_states:
+            self.stdout.write('No StudentModule states to sample.')
+            return
+
+        self.stdout.write('Sampled {} StudentModule states.'.format(num_states))
+        for name, totals in (('Uncompressed', plain), ('Compressed', compressed)):
+            self.stdout.write(
+                '{:<12}  size: {:>12} bytes ({:.1f} per state)  write: {:.1f} us/state  read: {:.1f} us/state'.format(
+                    name,
+                    totals['size'],
+                    totals['size'] / num_states,
+                    totals['write'] * 1e6 / num_states,
+                    totals['read'] * 1e6 / num_states,
+                )
+            )
+        self.stdout.write('Compression ratio: {:.2f}'.format(plain['size'] / max(compressed['size'], 1)))
@@ -0,0 +1,130 @@
+"""
+Command to convert the stored states of StudentModules to, or from, their
+compressed form.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import ExpressionWrapper, F, Max, TextField
+
+from courseware.fields import compress_state, decompress_state
+from courseware.models import StudentModule
+from courseware.waffle import COMPRESS_STUDENT_MODULE_STATE, waffle
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms compress_student_module_state --batch_size 1000 --sleep_between 0.5 --settings=devstack
+
+    Rows are converted in batches of consecutive ids, so that the conversion can be run in
+    the background, and resumed from the last id that it logged.  A row is only converted
+    if it isn't modified while its batch is processed.
+    """
+    help = 'Compresses, or decompresses, the stored states of StudentModules.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            '--start_id',
+            dest='start_id',
+            type=int,
+            default=1,
+            help='Id of the first StudentModule to convert.',
+        )
+        parser.add_argument(
+            '--end_id',
+            dest='end_id',
+            type=int,
+            help='Id of the last StudentModule to convert. Defaults to the last existing one.',
+        )
+        parser.add_argument(
+            '--batch_size',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='Number of ids to convert in each batch.',
+        )
+        parser.add_argument(
+            '--sleep_between',
+            dest='sleep_between',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches, to limit the load on the database.',
+        )
+        parser.add_argument(
+            '--decompress',
+            action='store_true',
+            dest='decompress',
+            default=False,
+            help='Decompress the stored states, rather than compressing them.',
+        )
+
+    def handle(self, *args, **options):
+        decompress = options['decompress']
+        if decompress and waffle().is_enabled(COMPRESS_STUDENT_MODULE_STATE):
+            raise CommandError('States are compressed when saved, while the {} switch is enabled.'.format(
+                COMPRESS_STUDENT_MODULE_STATE
+            ))
+
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('batch_size must be positive.')
+
+        end_id = options['end_id']
+        if end_id is None:
+            end_id = StudentModule.objects.aggregate(Max('id'))['id__max'] or 0
+
+        total_converted = total_bytes_before = total_bytes_after = 0
+        for batch_start_id in range(options['start_id'], end_id + 1, batch_size):
+            batch_end_id = min(batch_start_id + batch_size - 1, end_id)
+            converted, bytes_before, bytes_after = self._convert_batch(batch_start_id, batch_end_id, decompress)
+            total_converted += converted
+            total_bytes_before += bytes_before
+            total_bytes_after += bytes_after
+            log.info(
+                'Converted %d StudentModule states with ids up to %d, from %d to %d bytes.',
+                converted, batch_end_id, bytes_before, bytes_after,
+            )
+            if options['sleep_between']:
+                time.sleep(options['sleep_between'])
+
+        log.info(
+            'Converted a total of %d StudentModule states, from %d to %d bytes.',
+            total_converted, total_bytes_before, total_bytes_after,
+        )
+
+    def _convert_batch(self, start_id, end_id, decompress):
+        """
+        Converts the states of the StudentModules with ids in the given inclusive range.
+        Returns the number of converted states, and their total length before and after.
+        """
+        rows = StudentModule.objects.filter(
+            id__gte=start_id,
+            id__lte=end_id,
+            state__isnull=False,
+        ).annotate(
+            # Read as a plain TextField, the state isn't decompressed.
+            stored_state=ExpressionWrapper(F('state'), output_field=TextField()),
+        ).values_list('id', 'modified', 'stored_state')
+
+        converted = bytes_before = bytes_after = 0
+        for row_id, modified, stored_state in rows:
+            new_state = decompress_state(stored_state) if decompress else compress_state(stored_state)
+            if new_state == stored_state:
+                continue
+
+            # Updates don't change the modified time, which guards against overwriting concurrent saves.
+            if StudentModule.objects.filter(id=row_id, modified=modified).update(state=new_state):
+                converted += 1
+                bytes_before += len(stored_state)
+                bytes_after += len(new_state)
+        return converted, bytes_before, bytes_after
@@ -0,0 +1,71 @@
+"""
+Tests for the management commands that compress StudentModule states.
+"""
+
+import json
+from StringIO import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from courseware.fields import COMPRESSED_STATE_PREFIX
+from courseware.models import StudentModule
+from courseware.tests.factories import StudentModuleFactory
+from courseware.waffle import COMPRESS_STUDENT_MODULE_STATE, waffle
+
+
+class CompressStudentModuleStateTest(TestCase):
+    """
+    Tests the compress_student_module_state and benchmark_student_module_state commands.
+    """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(CompressStudentModuleStateTest, self).setUp()
+        self.state = json.dumps({'student_answers': {'answer_{}'.format(index): 'choice_1' for index in range(100)}})
+        self.student_modules = [
+            StudentModuleFactory.create(state=self.state),
+            StudentModuleFactory.create(state=json.dumps({'attempts': 1})),
+            StudentModuleFactory.create(state=None),
+        ]
+
+    def _assert_states(self, expected_num_compressed):
+        """
+        Asserts the number of compressed stored states, and that all states, and
+        their modified times, are unchanged.
+        """
+        self.assertEqual(
+            StudentModule.objects.filter(state__startswith=COMPRESSED_STATE_PREFIX).count(),
+            expected_num_compressed,
+        )
+        self.assertEqual(
+            list(StudentModule.objects.order_by('id').values_list('state', 'modified')),
+            [(student_module.state, student_module.modified) for student_module in self.student_modules],
+        )
+
+    def test_compress_and_decompress(self):
+        call_command('compress_student_module_state', batch_size=2)
+        self._assert_states(expected_num_compressed=1)
+
+        call_command('compress_student_module_state', decompress=True)
+        self._assert_states(expected_num_compressed=0)
+
+    def test_id_range(self):
+        first_id = self.student_modules[0].id
+        call_command('compress_student_module_state', start_id=first_id + 1)
+        self._assert_states(expected_num_compressed=0)
+
+        call_command('compress_student_module_state', start_id=first_id, end_id=first_id)
+        self._assert_states(expected_num_compressed=1)
+
+    def test_decompress_with_switch_enabled(self):
+        with waffle().override(COMPRESS_STUDENT_MODULE_STATE, active=True):
+            with self.assertRaises(CommandError):
+                call_command('compress_student_module_state', decompress=True)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_student_module_state', stdout=out)
+        self.assertIn('Sampled 2 StudentModule states.', out.getvalue())
+        self.assertIn('Compression ratio:', out.getvalue())
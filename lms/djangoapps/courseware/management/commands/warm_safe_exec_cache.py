@@ -0,0 +1,115 @@
+"""
+Command to precompute the cached results of the sandboxed code of the problems
+of a course, for each of the seeds that its students can be given.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from xblock.runtime import DictKeyValueStore, KvsFieldData
+from xmodule.capa_base import MAX_RANDOMIZATION_BINS, NUM_RANDOMIZATION_BINS
+from xmodule.capa_base_constants import RANDOMIZATION
+from xmodule.modulestore.django import modulestore
+
+from courseware.module_render import get_module_for_descriptor_internal
+from openedx.core.djangoapps.util.user_utils import SystemUser
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms warm_safe_exec_cache course-v1:edX+DemoX+Demo_Course --settings=devstack
+
+    Problems that are never randomized are run with their only seed, and those randomized per
+    student with each of their NUM_RANDOMIZATION_BINS seeds.  Problems that are randomized on
+    reset are only run, with each of their MAX_RANDOMIZATION_BINS seeds, if --include_rerandomized
+    is given.  The results of scripts that read the anonymous student id are cached per student,
+    so are not precomputed by this command.
+    """
+    help = 'Precomputes the cached results of the sandboxed code of the problems of a course.'
+
+    def add_arguments(self, parser):
+        """
+        Entry point for subclassed commands to add custom arguments.
+        """
+        parser.add_argument(
+            'course_id',
+            help='The course whose problems are run.',
+        )
+        parser.add_argument(
+            '--include_rerandomized',
+            dest='include_rerandomized',
+            action='store_true',
+            help='Also run the problems that are randomized whenever they are reset.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course_key = CourseKey.from_string(options['course_id'])
+        except InvalidKeyError:
+            raise CommandError('Invalid course_id: {}'.format(options['course_id']))
+
+        store = modulestore()
+        course = store.get_course(course_key, depth=0)
+        if course is None:
+            raise CommandError('Course not found: {}'.format(course_key))
+
+        num_problems = num_runs = num_errors = 0
+        for descriptor in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            seeds = self._seeds(descriptor, options['include_rerandomized'])
+            if not seeds:
+                continue
+            num_problems += 1
+            problem = self._get_problem(descriptor, course)
+            if not hasattr(problem, 'new_lcp'):
+                # The problem failed to load, and was replaced by an error module.
+                num_errors += 1
+                log.error('Error loading problem %s', descriptor.location)
+                continue
+            for seed in seeds:
+                num_runs += 1
+                problem.seed = seed
+                try:
+                    problem.new_lcp(problem.get_state_for_lcp())
+                except Exception:  # pylint: disable=broad-except
+                    num_errors += 1
+                    log.exception('Error running problem %s with seed %s', descriptor.location, seed)
+
+        log.info(
+            'Ran %d problems of %s with %d seeds in total, with %d errors.',
+            num_problems, course_key, num_runs, num_errors,
+        )
+
+    def _seeds(self, descriptor, include_rerandomized):
+        """
+        Returns the seeds with which the given problem can be run.
+        """
+        if descriptor.rerandomize == RANDOMIZATION.NEVER:
+            return [1]
+        if descriptor.rerandomize == RANDOMIZATION.PER_STUDENT:
+            return range(NUM_RANDOMIZATION_BINS)
+        if include_rerandomized:
+            return range(MAX_RANDOMIZATION_BINS)
+        return []
+
+    def _get_problem(self, descriptor, course):
+        """
+        Returns the problem module of the given descriptor, with student
+        data that is only kept in memory.
+        """
+        return get_module_for_descriptor_internal(
+            user=SystemUser(),
+            descriptor=descriptor,
+            student_data=KvsFieldData(DictKeyValueStore()),
+            course_id=course.id,
+            track_function=lambda event_type, event: None,
+            xqueue_callback_url_prefix='',
+            request_token=None,
+            course=course,
+        )
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+import courseware.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseware', '0007_remove_done_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentmodule',
+            name='state',
+            field=courseware.fields.StudentModuleStateField(blank=True, null=True),
+        ),
+    ]
@@ -19,12 +19,16 @@ UserStateSummaryCache: A cache for Scope.user_state_summary
 PreferencesCache: A cache for Scope.preferences
 UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
+
+:class:`UserStateWriteBuffer`: A buffer of the Scope.user_state writes of a request,
+    enabled with :func:`buffered_user_state_writes`.
 """
 
 import json
 import logging
 from abc import ABCMeta, abstractmethod
-from collections import defaultdict, namedtuple
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager
 
 from contracts import contract, new_contract
 from django.db import DatabaseError, IntegrityError, transaction
@@ -37,12 +41,24 @@ from xblock.fields import Scope, UserScope
 from xblock.runtime import KeyValueStore
 
 from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.waffle import BUFFER_USER_STATE_WRITES, waffle
+from openedx.core.djangoapps import monitoring_utils
+from openedx.core.djangoapps.request_cache import get_cache
 from xmodule.modulestore.django import modulestore
 
-from .models import StudentModule, XModuleStudentInfoField, XModuleStudentPrefsField, XModuleUserStateSummaryField
+from .models import (
+    StudentModule,
+    XModuleStudentInfoField,
+    XModuleStudentPrefsField,
+    XModuleUserStateSummaryField,
+    num_chunks
+)
 
 log = logging.getLogger(__name__)
 
+_WRITE_BUFFER_CACHE_NAMESPACE = u'courseware.model_data.user_state_writes'
+_WRITE_BUFFER_CACHE_KEY = u'write_buffer'
+
 
 class InvalidWriteError(Exception):
     """
@@ -161,19 +177,32 @@ class DjangoOrmFieldCache(object):
 
     def __init__(self):
         self._cache = {}
+        # The cache keys of the fields that have already been loaded
+        # from the database, whether or not they were found there.
+        self._loaded_keys = set()
 
     def cache_fields(self, fields, xblocks, aside_types):
         """
         Load all fields specified by ``fields`` for the supplied ``xblocks``
-        and ``aside_types`` into this cache.
+        and ``aside_types`` into this cache. Fields that were loaded by an
+        earlier call are not queried again.
 
         Arguments:
             fields (list of str): Field names to cache.
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
+
+        Returns: The number of queries made.
         """
-        for field_object in self._read_objects(fields, xblocks, aside_types):
-            self._cache[self._cache_key_for_field_object(field_object)] = field_object
+        cache_keys = self._cache_keys_for_fields(fields, xblocks, aside_types) - self._loaded_keys
+        if not cache_keys:
+            return 0
+
+        self._loaded_keys.update(cache_keys)
+        for field_object in self._read_objects(cache_keys):
+            # A field set before it was loaded is already cached, with the value that was saved.
+            self._cache.setdefault(self._cache_key_for_field_object(field_object), field_object)
+        return self._num_queries(cache_keys)
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def get(self, kvs_key):
@@ -306,20 +335,41 @@ class DjangoOrmFieldCache(object):
         raise NotImplementedError()
 
     @abstractmethod
-    def _read_objects(self, fields, xblocks, aside_types):
+    def _cache_keys_for_fields(self, fields, xblocks, aside_types):
         """
-        Return an iterator for all objects stored in the underlying datastore
-        for the ``fields`` on the ``xblocks`` and the ``aside_types`` associated
-        with them.
+        Return the set of keys used in this DjangoOrmFieldCache for the ``fields``
+        on the ``xblocks`` and the ``aside_types`` associated with them.
 
         Arguments:
-            fields (list of str): Field names to return values for
-            xblocks (list of :class:`~XBlock`): XBlocks to load fields for
-            aside_types (list of str): Asides to load field for (which annotate the supplied
+            fields (list of :class:`~Field`): Fields to return keys for
+            xblocks (list of :class:`~XBlock`): XBlocks to return keys for
+            aside_types (list of str): Asides to return keys for (which annotate the supplied
                 xblocks).
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def _read_objects(self, cache_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the fields identified by ``cache_keys``. Objects for other fields
+        may be returned as well.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _num_queries(self, cache_keys):
+        """
+        Return the number of queries made by :meth:`_read_objects` for ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def _cache_key_for_field_object(self, field_object):
         """
@@ -341,6 +391,107 @@ class DjangoOrmFieldCache(object):
         raise NotImplementedError()
 
 
+class UserStateWriteBuffer(object):
+    """
+    Buffers the Scope.user_state writes of the UserStateCaches of a request,
+    merging the updates of each StudentModule so that it is written once, when
+    the buffer is flushed.
+    """
+    def __init__(self):
+        self._clients = OrderedDict()
+        self._updates = defaultdict(lambda: defaultdict(dict))
+        self._flush_callbacks = []
+
+    def add(self, client, username, block_updates):
+        """
+        Buffer the supplied updates of the state of the user with the supplied username.
+
+        Arguments:
+            client (:class:`~DjangoXBlockUserStateClient`): The client to write the updates with
+            username (str): The name of the user whose state is updated
+            block_updates (dict): A dict mapping usage keys to dicts of field names to values
+        """
+        self._clients.setdefault(username, client)
+        for block_key, field_updates in block_updates.iteritems():
+            self._updates[username][block_key].update(field_updates)
+
+    def discard(self, username, block_key, field_name):
+        """
+        Discard the buffered update of the supplied field, which is being deleted.
+        """
+        if username in self._updates and block_key in self._updates[username]:
+            self._updates[username][block_key].pop(field_name, None)
+
+    def on_flush(self, callback):
+        """
+        Call the supplied callback once the buffered updates have been written.
+        """
+        self._flush_callbacks.append(callback)
+
+    def flush(self):
+        """
+        Write all of the buffered updates, with a single call to the client of each user,
+        then call the callbacks registered with :meth:`on_flush`.
+        """
+        while self._clients:
+            username, client = self._clients.popitem(last=False)
+            block_updates = {
+                block_key: field_updates
+                for block_key, field_updates in self._updates.pop(username).iteritems()
+                if field_updates
+            }
+            try:
+                client.set_many(username, block_updates)
+            except DatabaseError:
+                log.exception("Saving buffered user state failed for %s", username)
+                raise
+
+        callbacks, self._flush_callbacks = self._flush_callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+@contextmanager
+def buffered_user_state_writes():
+    """
+    Buffer the Scope.user_state writes made within the context in a
+    :class:`UserStateWriteBuffer`, which is flushed on exit.
+
+    Writes are only buffered while the courseware.buffer_user_state_writes switch
+    is enabled. Nested contexts share the buffer of the outermost one.
+    """
+    request_cache = get_cache(_WRITE_BUFFER_CACHE_NAMESPACE)
+    if _WRITE_BUFFER_CACHE_KEY in request_cache or not waffle().is_enabled(BUFFER_USER_STATE_WRITES):
+        yield
+        return
+
+    write_buffer = request_cache[_WRITE_BUFFER_CACHE_KEY] = UserStateWriteBuffer()
+    try:
+        yield
+    finally:
+        del request_cache[_WRITE_BUFFER_CACHE_KEY]
+        write_buffer.flush()
+
+
+def on_user_state_writes_flushed(callback):
+    """
+    Call the supplied callback once the buffered Scope.user_state writes have been
+    written, or right away if writes aren't buffered.
+    """
+    write_buffer = _get_user_state_write_buffer()
+    if write_buffer is None:
+        callback()
+    else:
+        write_buffer.on_flush(callback)
+
+
+def _get_user_state_write_buffer():
+    """
+    Return the active :class:`UserStateWriteBuffer`, or None if writes aren't buffered.
+    """
+    return get_cache(_WRITE_BUFFER_CACHE_NAMESPACE).get(_WRITE_BUFFER_CACHE_KEY)
+
+
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
@@ -350,24 +501,39 @@ class UserStateCache(object):
         self.course_id = course_id
         self.user = user
         self._client = DjangoXBlockUserStateClient(self.user)
+        # The usage keys whose state has already been loaded from the
+        # database, whether or not it was found there.
+        self._loaded_keys = set()
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
         Load all fields specified by ``fields`` for the supplied ``xblocks``
-        and ``aside_types`` into this cache.
+        and ``aside_types`` into this cache. The state of blocks that was
+        loaded by an earlier call is not queried again.
 
         Arguments:
             fields (list of str): Field names to cache.
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
+
+        Returns: The number of queries made.
         """
+        usage_keys = _all_usage_keys(xblocks, aside_types) - self._loaded_keys
+        if not usage_keys:
+            return 0
+
+        self._loaded_keys.update(usage_keys)
         block_field_state = self._client.get_many(
             self.user.username,
-            _all_usage_keys(xblocks, aside_types),
+            usage_keys,
         )
         for user_state in block_field_state:
             self._cache[user_state.block_key] = user_state.state
 
+        # The client queries the state of each course separately.
+        num_keys_by_course = Counter(usage_key.course_key for usage_key in usage_keys)
+        return sum(num_chunks(num_keys) for num_keys in num_keys_by_course.itervalues())
+
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
         """
@@ -413,6 +579,12 @@ class UserStateCache(object):
 
             pending_updates[cache_key][kvs_key.field_name] = value
 
+        write_buffer = _get_user_state_write_buffer()
+        if write_buffer is not None:
+            write_buffer.add(self._client, self.user.username, pending_updates)
+            self._cache.update(pending_updates)
+            return
+
         try:
             self._client.set_many(
                 self.user.username,
@@ -460,6 +632,10 @@ class UserStateCache(object):
         if kvs_key.field_name not in field_state:
             raise KeyError(kvs_key.field_name)
 
+        write_buffer = _get_user_state_write_buffer()
+        if write_buffer is not None:
+            write_buffer.discard(self.user.username, cache_key, kvs_key.field_name)
+
         self._client.delete(self.user.username, cache_key, fields=[kvs_key.field_name])
         del field_state[kvs_key.field_name]
 
@@ -517,24 +693,46 @@ class UserStateSummaryCache(DjangoOrmFieldCache):
             value=value,
         )
 
-    def _read_objects(self, fields, xblocks, aside_types):
+    def _cache_keys_for_fields(self, fields, xblocks, aside_types):
         """
-        Return an iterator for all objects stored in the underlying datastore
-        for the ``fields`` on the ``xblocks`` and the ``aside_types`` associated
-        with them.
+        Return the set of keys used in this DjangoOrmFieldCache for the ``fields``
+        on the ``xblocks`` and the ``aside_types`` associated with them.
 
         Arguments:
-            fields (list of :class:`~Field`): Fields to return values for
-            xblocks (list of :class:`~XBlock`): XBlocks to load fields for
-            aside_types (list of str): Asides to load field for (which annotate the supplied
+            fields (list of :class:`~Field`): Fields to return keys for
+            xblocks (list of :class:`~XBlock`): XBlocks to return keys for
+            aside_types (list of str): Asides to return keys for (which annotate the supplied
                 xblocks).
         """
+        return set(
+            (usage_id, field.name)
+            for usage_id in _all_usage_keys(xblocks, aside_types)
+            for field in fields
+        )
+
+    def _read_objects(self, cache_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the fields identified by ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
         return XModuleUserStateSummaryField.objects.chunked_filter(
             'usage_id__in',
-            _all_usage_keys(xblocks, aside_types),
-            field_name__in=set(field.name for field in fields),
+            set(usage_id for usage_id, _ in cache_keys),
+            field_name__in=set(field_name for _, field_name in cache_keys),
         )
 
+    def _num_queries(self, cache_keys):
+        """
+        Return the number of queries made by :meth:`_read_objects` for ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
+        return num_chunks(len(set(usage_id for usage_id, _ in cache_keys)))
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -579,25 +777,47 @@ class PreferencesCache(DjangoOrmFieldCache):
             value=value,
         )
 
-    def _read_objects(self, fields, xblocks, aside_types):
+    def _cache_keys_for_fields(self, fields, xblocks, aside_types):
         """
-        Return an iterator for all objects stored in the underlying datastore
-        for the ``fields`` on the ``xblocks`` and the ``aside_types`` associated
-        with them.
+        Return the set of keys used in this DjangoOrmFieldCache for the ``fields``
+        on the ``xblocks`` and the ``aside_types`` associated with them.
 
         Arguments:
-            fields (list of str): Field names to return values for
-            xblocks (list of :class:`~XBlock`): XBlocks to load fields for
-            aside_types (list of str): Asides to load field for (which annotate the supplied
+            fields (list of :class:`~Field`): Fields to return keys for
+            xblocks (list of :class:`~XBlock`): XBlocks to return keys for
+            aside_types (list of str): Asides to return keys for (which annotate the supplied
                 xblocks).
         """
+        return set(
+            (block_type, field.name)
+            for block_type in _all_block_types(xblocks, aside_types)
+            for field in fields
+        )
+
+    def _read_objects(self, cache_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the fields identified by ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
         return XModuleStudentPrefsField.objects.chunked_filter(
             'module_type__in',
-            _all_block_types(xblocks, aside_types),
+            set(block_type for block_type, _ in cache_keys),
             student=self.user.pk,
-            field_name__in=set(field.name for field in fields),
+            field_name__in=set(field_name for _, field_name in cache_keys),
         )
 
+    def _num_queries(self, cache_keys):
+        """
+        Return the number of queries made by :meth:`_read_objects` for ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
+        return num_chunks(len(set(block_type for block_type, _ in cache_keys)))
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -641,23 +861,41 @@ class UserInfoCache(DjangoOrmFieldCache):
             value=value,
         )
 
-    def _read_objects(self, fields, xblocks, aside_types):
+    def _cache_keys_for_fields(self, fields, xblocks, aside_types):
         """
-        Return an iterator for all objects stored in the underlying datastore
-        for the ``fields`` on the ``xblocks`` and the ``aside_types`` associated
-        with them.
+        Return the set of keys used in this DjangoOrmFieldCache for the ``fields``
+        on the ``xblocks`` and the ``aside_types`` associated with them.
 
         Arguments:
-            fields (list of str): Field names to return values for
-            xblocks (list of :class:`~XBlock`): XBlocks to load fields for
-            aside_types (list of str): Asides to load field for (which annotate the supplied
+            fields (list of :class:`~Field`): Fields to return keys for
+            xblocks (list of :class:`~XBlock`): XBlocks to return keys for
+            aside_types (list of str): Asides to return keys for (which annotate the supplied
                 xblocks).
         """
+        return set(field.name for field in fields)
+
+    def _read_objects(self, cache_keys):
+        """
+        Return an iterator for all objects stored in the underlying datastore
+        for the fields identified by ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
         return XModuleStudentInfoField.objects.filter(
             student=self.user.pk,
-            field_name__in=set(field.name for field in fields),
+            field_name__in=cache_keys,
         )
 
+    def _num_queries(self, cache_keys):
+        """
+        Return the number of queries made by :meth:`_read_objects` for ``cache_keys``.
+
+        Arguments:
+            cache_keys (set): The keys of the fields to return objects for
+        """
+        return 1
+
     def _cache_key_for_field_object(self, field_object):
         """
         Return the key used in this DjangoOrmFieldCache to store the specified field_object.
@@ -727,14 +965,22 @@ class FieldDataCache(object):
     def add_descriptors_to_cache(self, descriptors):
         """
         Add all `descriptors` to this FieldDataCache.
+
+        Each scope is queried once (per chunk of keys) for the data of all of
+        the `descriptors` with fields in that scope, except for the data
+        that was already loaded when other descriptors were added. The number
+        of queries made is reported as custom metrics of the request.
         """
         if self.user.is_authenticated:
             self.scorable_locations.update(desc.location for desc in descriptors if desc.has_score)
-            for scope, fields in self._fields_to_cache(descriptors).items():
-                if scope not in self.cache:
-                    continue
+            num_queries = 0
+            for scope, (fields, scope_descriptors) in self._plan_prefetch(descriptors).items():
+                scope_queries = self.cache[scope].cache_fields(fields, scope_descriptors, self.asides)
+                monitoring_utils.accumulate('field_data_cache.{}.queries'.format(scope.name), scope_queries)
+                num_queries += scope_queries
 
-                self.cache[scope].cache_fields(fields, descriptors, self.asides)
+            monitoring_utils.accumulate('field_data_cache.queries', num_queries)
+            log.debug(u'FieldDataCache: loaded data for %d blocks with %d queries', len(descriptors), num_queries)
 
     def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
         """
@@ -793,15 +1039,29 @@ class FieldDataCache(object):
         cache.add_descriptor_descendents(descriptor, depth, descriptor_filter)
         return cache
 
-    def _fields_to_cache(self, descriptors):
+    def _plan_prefetch(self, descriptors):
         """
-        Returns a map of scopes to fields in that scope that should be cached
+        Returns a map of the cached scopes to the fields in that scope that
+        should be cached, and the descriptors to cache them for.
+
+        Only the descriptors with fields in a scope are queried for it, unless
+        asides, whose fields may be in any scope, are also cached.
         """
-        scope_map = defaultdict(set)
+        scope_fields = defaultdict(set)
+        scope_descriptors = defaultdict(list)
         for descriptor in descriptors:
+            descriptor_scopes = set()
             for field in descriptor.fields.values():
-                scope_map[field.scope].add(field)
-        return scope_map
+                if field.scope in self.cache:
+                    scope_fields[field.scope].add(field)
+                    descriptor_scopes.add(field.scope)
+            for scope in descriptor_scopes:
+                scope_descriptors[scope].append(descriptor)
+
+        return {
+            scope: (fields, descriptors if self.asides else scope_descriptors[scope])
+            for scope, fields in scope_fields.iteritems()
+        }
 
     @contract(key=DjangoKeyValueStore.Key)
     def get(self, key):
@@ -988,6 +1248,29 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_id, user_ids, scorable_locations):
+        """
+        Create a ScoresClient for each of the given users, with pre-fetched
+        data for the given locations, using a single query.
+
+        Returns a dict mapping each user id to its ScoresClient.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            location = location.map_into_course(course_id)
+            clients[user_id]._locations_to_scores[location] = cls.Score(correct, total, created)
+        for client in clients.itervalues():
+            client._has_fetched = True
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
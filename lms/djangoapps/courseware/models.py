@@ -25,10 +25,14 @@ from model_utils.models import TimeStampedModel
 from six import text_type
 
 import coursewarehistoryextended
+from courseware.fields import StudentModuleStateField
 from opaque_keys.edx.django.models import BlockTypeKeyField, CourseKeyField, UsageKeyField
 
 log = logging.getLogger("edx.courseware")
 
+# The default number of values per query made by ChunkingManager.chunked_filter.
+DEFAULT_CHUNK_SIZE = 500
+
 
 def chunks(items, chunk_size):
     """
@@ -38,6 +42,13 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+def num_chunks(num_items, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the number of chunks of size chunk_size that num_items values are split into
+    """
+    return (num_items + chunk_size - 1) // chunk_size
+
+
 class ChunkingManager(models.Manager):
     """
     :class:`~Manager` that adds an additional method :meth:`chunked_filter` to provide
@@ -63,7 +74,7 @@ class ChunkingManager(models.Manager):
                 ``__in`` key.
             chunk_size (int): The size of chunks to pass. Defaults to 500.
         """
-        chunk_size = kwargs.pop('chunk_size', 500)
+        chunk_size = kwargs.pop('chunk_size', DEFAULT_CHUNK_SIZE)
         res = itertools.chain.from_iterable(
             self.filter(**dict([(chunk_field, chunk)] + kwargs.items()))
             for chunk in chunks(items, chunk_size)
@@ -100,8 +111,8 @@ class StudentModule(models.Model):
         app_label = "courseware"
         unique_together = (('student', 'module_state_key', 'course_id'),)
 
-    # Internal state of the object
-    state = models.TextField(null=True, blank=True)
+    # Internal state of the object, which may be stored compressed
+    state = StudentModuleStateField(null=True, blank=True)
 
     # Grade, and are we done?
     grade = models.FloatField(null=True, blank=True, db_index=True)
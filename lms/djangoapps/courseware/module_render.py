@@ -15,6 +15,7 @@ from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.template.context_processors import csrf
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.urls import reverse
 from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
@@ -30,6 +31,7 @@ from xblock.reference.plugins import FSService
 from xblock.runtime import KvsFieldData
 
 import static_replace
+from capa.safe_exec import SafeExecCache
 from capa.xqueue_interface import XQueueInterface
 from courseware.access import get_user_role, has_access
 from courseware.entrance_exams import user_can_skip_entrance_exam, user_has_passed_entrance_exam
@@ -39,7 +41,21 @@ from courseware.masquerade import (
     is_masquerading_as_specific_student,
     setup_masquerade
 )
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from courseware.model_data import (
+    DjangoKeyValueStore,
+    FieldDataCache,
+    buffered_user_state_writes,
+    on_user_state_writes_flushed
+)
+from courseware.tasks import send_to_xqueue
+from courseware.waffle import (
+    DEFER_XQUEUE_SUBMISSIONS,
+    RATE_LIMIT_VIDEO_POSITION_SAVES,
+    RENDERED_INPUT_CACHE,
+    SAFE_EXEC_RESULT_CACHE
+)
+from courseware.waffle import waffle as courseware_waffle
+from coursewarehistoryextended.batching import batched_history
 from edxmako.shortcuts import render_to_string
 from eventtracking import tracker
 from lms.djangoapps.grades.signals.signals import SCORE_PUBLISHED
@@ -51,6 +67,7 @@ from openedx.core.djangoapps.bookmarks.services import BookmarksService
 from openedx.core.djangoapps.crawlers.models import CrawlersConfig
 from openedx.core.djangoapps.credit.services import CreditService
 from openedx.core.djangoapps.monitoring_utils import set_custom_metrics_for_course_key, set_monitoring_transaction_name
+from openedx.core.djangoapps.theming.helpers import get_current_site, get_current_theme
 from openedx.core.djangoapps.util.user_utils import SystemUser
 from openedx.core.lib.gating.services import GatingService
 from openedx.core.lib.license import wrap_with_license
@@ -88,12 +105,36 @@ if settings.XQUEUE_INTERFACE.get('basic_auth') is not None:
 else:
     REQUESTS_AUTH = None
 
+
+def defer_xqueue_submission(header, body):
+    """
+    Hands the given xqueue submission to a task that delivers it once the
+    current transaction commits, and returns True, when the switch is enabled.
+    The learner sees the submission as queued without waiting for xqueue.
+
+    When user state writes are buffered, the task is only handed the submission
+    after the queued state of the learner has been written, so that a grade
+    returned by xqueue can't find the learner's state without it.
+    """
+    if not courseware_waffle().is_enabled(DEFER_XQUEUE_SUBMISSIONS):
+        return False
+    on_user_state_writes_flushed(
+        lambda: transaction.on_commit(lambda: send_to_xqueue.delay(header, body))
+    )
+    return True
+
+
 XQUEUE_INTERFACE = XQueueInterface(
     settings.XQUEUE_INTERFACE['url'],
     settings.XQUEUE_INTERFACE['django_auth'],
     REQUESTS_AUTH,
+    defer_submission=defer_xqueue_submission,
 )
 
+# The minimum interval between the saves of a video position by a user, while
+# the courseware.rate_limit_video_position_saves switch is enabled.
+VIDEO_POSITION_SAVE_INTERVAL_SECONDS = 10
+
 # TODO: course_id and course_key are used interchangeably in this file, which is wrong.
 # Some brave person should make the variable names consistently someday, but the code's
 # coupled enough that it's kind of tricky--you've been warned!
@@ -388,6 +429,35 @@ def get_module_for_descriptor(user, request, descriptor, field_data_cache, cours
     )
 
 
+def get_safe_exec_cache(course_id):
+    """
+    Returns the cache of the results of the sandboxed code of the given
+    course's problems, which is kept in the memory of each process, as
+    well as in the Django cache, when the switch is enabled.
+    """
+    if courseware_waffle().is_enabled(SAFE_EXEC_RESULT_CACHE):
+        return SafeExecCache(cache, text_type(course_id))
+    return cache
+
+
+def get_rendered_input_cache_scope():
+    """
+    Returns the current site and theme, under which capa inputs without
+    student state are rendered once for all students, when the switch is
+    enabled.  A comprehensive theme may override the input templates, so
+    inputs are not shared between sites or themes.  Returns None when the
+    switch is disabled, for inputs to be rendered for each student.
+    """
+    if not courseware_waffle().is_enabled(RENDERED_INPUT_CACHE):
+        return None
+    site = get_current_site()
+    theme = get_current_theme()
+    return (
+        site.id if site is not None else None,
+        theme.theme_dir_name if theme is not None else None,
+    )
+
+
 def get_module_system_for_user(
         user,
         student_data,  # TODO  # pylint: disable=too-many-statements
@@ -745,9 +815,10 @@ def get_module_system_for_user(
         publish=publish,
         anonymous_student_id=anonymous_student_id,
         course_id=course_id,
-        cache=cache,
+        cache=get_safe_exec_cache(course_id),
         can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
         get_python_lib_zip=(lambda: get_python_lib_zip(contentstore, course_id)),
+        get_rendered_input_cache_scope=get_rendered_input_cache_scope,
         # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
         mixins=descriptor.runtime.mixologist._mixins,  # pylint: disable=protected-access
         wrappers=block_wrappers,
@@ -1050,6 +1121,9 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
 
     set_custom_metrics_for_course_key(course_key)
 
+    if _is_rate_limited_position_save(request, usage_id, handler, suffix):
+        return JsonResponse({'success': True})
+
     with modulestore().bulk_operations(course_key):
         instance, tracking_context = get_module_by_usage_id(request, course_id, usage_id, course=course)
 
@@ -1064,7 +1138,10 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
         req = django_to_webob_request(request)
         try:
             with tracker.get_tracker().context(tracking_context_name, tracking_context):
-                resp = instance.handle(handler, req, suffix)
+                # The history entries are batched around the state writes,
+                # so that those flushed on exit are part of the batch.
+                with batched_history(), buffered_user_state_writes():
+                    resp = instance.handle(handler, req, suffix)
                 if suffix == 'problem_check' \
                         and course \
                         and getattr(course, 'entrance_exam_enabled', False) \
@@ -1095,6 +1172,26 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, course
     return webob_to_django_response(resp)
 
 
+def _is_rate_limited_position_save(request, usage_id, handler, suffix):
+    """
+    Returns whether the request only saves the position of a video, for which
+    the user's last save was less than VIDEO_POSITION_SAVE_INTERVAL_SECONDS ago.
+
+    Such saves are frequent, as the video player saves its position while it
+    plays, and are dropped while the courseware.rate_limit_video_position_saves
+    switch is enabled.
+    """
+    if handler != 'xmodule_handler' or suffix != 'save_user_state':
+        return False
+    if set(request.POST.keys()) != {'saved_video_position'} or not request.user.is_authenticated:
+        return False
+    if not courseware_waffle().is_enabled(RATE_LIMIT_VIDEO_POSITION_SAVES):
+        return False
+
+    cache_key = u'courseware.video_position_save.{}.{}'.format(request.user.id, usage_id)
+    return not cache.add(cache_key, True, VIDEO_POSITION_SAVE_INTERVAL_SECONDS)
+
+
 def hash_resource(resource):
     """
     Hash a :class:`web_fragments.fragment.FragmentResource
@@ -4,7 +4,7 @@ by the individual due dates feature.
 """
 import json
 
-from .field_overrides import FieldOverrideProvider
+from .field_overrides import FieldOverrideProvider, clear_override_indexes
 from .models import StudentFieldOverride
 
 
@@ -17,6 +17,20 @@ class IndividualStudentOverrideProvider(FieldOverrideProvider):
     def get(self, block, name, default):
         return get_override_for_user(self.user, block, name, default)
 
+    def get_overrides(self, course_key):
+        """
+        Publishes all of the user's overrides in the course, with a single query.
+        """
+        overrides = {}
+        query = StudentFieldOverride.objects.filter(
+            course_id=course_key,
+            student_id=self.user.id,
+        )
+        for override in query:
+            location = override.location.map_into_course(course_key)
+            overrides.setdefault(location, {})[override.field] = json.loads(override.value)
+        return overrides
+
     @classmethod
     def enabled_for(cls, course):
         """This simple override provider is always enabled"""
@@ -70,6 +84,7 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    clear_override_indexes()
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +102,4 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    clear_override_indexes()
@@ -0,0 +1,95 @@
+"""
+Asynchronous tasks of the courseware app.
+"""
+import json
+import logging
+from urllib import unquote
+from urlparse import urlparse
+
+import dogstats_wrapper as dog_stats_api
+from celery import task
+from celery_utils.logged_task import LoggedTask
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from django.utils.translation import ugettext as _
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from courseware.models import StudentModule
+
+log = logging.getLogger(__name__)
+
+# Delay before the first retry of a submission that could not be delivered to
+# xqueue, doubled for each further retry.
+XQUEUE_RETRY_DELAY_SECONDS = 5
+XQUEUE_MAX_RETRIES = 6
+
+
+@task(bind=True, base=LoggedTask, max_retries=XQUEUE_MAX_RETRIES)
+def send_to_xqueue(self, header, body):
+    """
+    Delivers a submission deferred by module_render.defer_xqueue_submission
+    to xqueue, retrying with exponential backoff while it can't be delivered.
+
+    The xqueue interface of each worker process keeps its session, and so its
+    connections to xqueue, across submissions.
+    """
+    # Imported here, as module_render imports this module.
+    from courseware.module_render import XQUEUE_INTERFACE
+
+    error, msg = XQUEUE_INTERFACE.deliver(header, body)
+    if not error:
+        return
+
+    if self.request.retries >= self.max_retries:
+        log.error('Giving up on delivering a submission to xqueue (%s): %s', msg, header)
+        dog_stats_api.increment('courseware.xqueue.undelivered_submissions')
+        _unqueue_undelivered_submission(header, msg)
+        return
+    log.warning('Failed to deliver a submission to xqueue, retrying (%s): %s', msg, header)
+    raise self.retry(countdown=XQUEUE_RETRY_DELAY_SECONDS * 2 ** self.request.retries)
+
+
+def _unqueue_undelivered_submission(header, error_msg):
+    """
+    Clears the queued state of the submission with the given xqueue header from
+    the learner's problem state, with the message shown when a submission can't
+    be delivered without deferring it (see CodeResponse.get_score), so that the
+    learner can submit again instead of waiting for a grade that won't come.
+    """
+    header = json.loads(header)
+    try:
+        callback = resolve(unquote(urlparse(header['lms_callback_url']).path))
+        course_key = CourseKey.from_string(callback.kwargs['course_id'])
+        usage_key = UsageKey.from_string(callback.kwargs['mod_id']).map_into_course(course_key)
+    except (Resolver404, InvalidKeyError, KeyError):
+        log.exception('Cannot find the learner state of an undelivered xqueue submission: %s', header)
+        return
+
+    with transaction.atomic():
+        try:
+            student_module = StudentModule.objects.select_for_update().get(
+                student_id=callback.kwargs['userid'], course_id=course_key, module_state_key=usage_key,
+            )
+        except StudentModule.DoesNotExist:
+            log.warning('No learner state for an undelivered xqueue submission: %s', header)
+            return
+
+        state = json.loads(student_module.state)
+        queued_answers = [
+            answer for answer in state.get('correct_map', {}).itervalues()
+            if (answer.get('queuestate') or {}).get('key') == header['lms_key']
+        ]
+        # The queued state was already replaced, such as by a new submission.
+        if not queued_answers:
+            return
+        for answer in queued_answers:
+            answer.update(
+                correctness=None,
+                npoints=None,
+                queuestate=None,
+                msg=_('Unable to deliver your submission to grader (Reason: {error_msg}).'
+                      ' Please try again later.').format(error_msg=error_msg),
+            )
+        student_module.state = json.dumps(state)
+        student_module.save()
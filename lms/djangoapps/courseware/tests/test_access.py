@@ -16,6 +16,7 @@ from milestones.tests.utils import MilestonesTestCaseMixin
 from mock import Mock, patch
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locator import CourseLocator
+from waffle.testutils import override_switch
 
 import courseware.access as access
 import courseware.access_response as access_response
@@ -28,6 +29,7 @@ from courseware.tests.factories import (
     UserFactory
 )
 from courseware.tests.helpers import LoginEnrollmentTestCase, masquerade_as_group_member
+from courseware.waffle import CACHE_ACCESS_DECISIONS, WAFFLE_NAMESPACE
 from lms.djangoapps.ccx.models import CustomCourseForEdX
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from openedx.core.djangoapps.waffle_utils.testutils import WAFFLE_TABLES
@@ -729,6 +731,53 @@ class UserRoleTestCase(TestCase):
         )
 
 
+@attr(shard=1)
+@override_switch(u'{}.{}'.format(WAFFLE_NAMESPACE, CACHE_ACCESS_DECISIONS), active=True)
+class AccessDecisionCacheTestCase(TestCase):
+    """
+    Tests for the request cache of access decisions.
+    """
+
+    def setUp(self):
+        super(AccessDecisionCacheTestCase, self).setUp()
+        self.course_key = CourseLocator('edX', 'toy', '2012_Fall')
+        self.student = UserFactory()
+        self.course_staff = StaffFactory(course_key=self.course_key)
+        access.clear_access_decisions()
+        self.addCleanup(access.clear_access_decisions)
+
+    def test_cached_decision(self):
+        with patch.object(access, '_has_access_course_key', wraps=access._has_access_course_key) as mock_check:
+            with patch('courseware.access.monitoring_utils.accumulate') as mock_accumulate:
+                self.assertTrue(access.has_access(self.course_staff, 'staff', self.course_key))
+                self.assertTrue(access.has_access(self.course_staff, 'staff', self.course_key))
+                self.assertFalse(access.has_access(self.student, 'staff', self.course_key))
+        self.assertEqual(mock_check.call_count, 2)
+        self.assertEqual(
+            [call_args[0] for call_args in mock_accumulate.call_args_list],
+            [
+                ('has_access.checks', 1),
+                ('has_access.checks', 1),
+                ('has_access.cache_hits', 1),
+                ('has_access.checks', 1),
+            ],
+        )
+
+    def test_invalidated_by_role_change(self):
+        self.assertFalse(access.has_access(self.student, 'staff', self.course_key))
+        CourseStaffRole(self.course_key).add_users(self.student)
+        self.assertTrue(access.has_access(self.student, 'staff', self.course_key))
+        CourseStaffRole(self.course_key).remove_users(self.student)
+        self.assertFalse(access.has_access(self.student, 'staff', self.course_key))
+
+    def test_masquerade(self):
+        self.assertTrue(access.has_access(self.course_staff, 'staff', self.course_key))
+        self.course_staff.masquerade_settings = {
+            self.course_key: CourseMasquerade(self.course_key, role='student')
+        }
+        self.assertFalse(access.has_access(self.course_staff, 'staff', self.course_key))
+
+
 @attr(shard=5)
 @ddt.ddt
 class CourseOverviewAccessTestCase(ModuleStoreTestCase):
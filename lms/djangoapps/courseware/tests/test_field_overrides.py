@@ -2,19 +2,23 @@
 Tests for `field_overrides` module.
 """
 # pylint: disable=missing-docstring
+import datetime
 import unittest
 
+import pytz
 from django.test.utils import override_settings
+from mock import patch
 from nose.plugins.attrib import attr
 from xblock.field_data import DictFieldData
 
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..field_overrides import (
     FieldOverrideProvider,
     OverrideFieldData,
     OverrideModulestoreFieldData,
+    clear_override_indexes,
     disable_overrides,
     resolve_dotted
 )
@@ -45,6 +49,41 @@ class TestOverrideProvider(FieldOverrideProvider):
         return True
 
 
+class TestPublishingOverrideProvider(FieldOverrideProvider):
+    """
+    A concrete implementation of `FieldOverrideProvider` that publishes its
+    overrides up front.
+    """
+    overrides = {}
+
+    def get(self, block, name, default):
+        raise AssertionError('Published overrides are looked up without calling get')
+
+    def get_overrides(self, course_key):
+        return self.overrides
+
+    @classmethod
+    def enabled_for(cls, course):
+        return True
+
+
+class TestDeclaringOverrideProvider(FieldOverrideProvider):
+    """
+    A concrete implementation of `FieldOverrideProvider` that declares the
+    fields it may override, without publishing its overrides.
+    """
+    overridable_fields = frozenset(['due'])
+
+    def get(self, block, name, default):
+        if name == 'due' and block.category == 'course':
+            return datetime.datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        return default
+
+    @classmethod
+    def enabled_for(cls, course):
+        return True
+
+
 class OverrideFieldBase(SharedModuleStoreTestCase):
     """
     Base class for field data override tests.  Using override_settings and
@@ -149,6 +188,95 @@ class OverrideModulestoreFieldDataTests(FieldOverrideTestMixin, OverrideFieldDat
         self.assertIsInstance(data, DictFieldData)
 
 
+@attr(shard=1)
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'courseware.tests.test_field_overrides.TestPublishingOverrideProvider',))
+class PublishedOverridesTests(OverrideFieldBase):
+    """
+    Tests for `OverrideFieldData` with providers that publish their overrides.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(PublishedOverridesTests, cls).setUpClass()
+        cls.chapter = ItemFactory.create(parent=cls.course, category='chapter', display_name='Chapter')
+
+    def setUp(self):
+        super(PublishedOverridesTests, self).setUp()
+        OverrideFieldData.provider_classes = None
+        clear_override_indexes()
+        self.addCleanup(clear_override_indexes)
+        self.course = self.store.get_course(self.course.id)
+        self.chapter = self.store.get_item(self.chapter.location)
+        self.data = OverrideFieldData.wrap(TESTUSER, self.course, DictFieldData({}))
+
+    def tearDown(self):
+        super(PublishedOverridesTests, self).tearDown()
+        OverrideFieldData.provider_classes = None
+
+    def test_get(self):
+        TestPublishingOverrideProvider.overrides = {
+            self.chapter.location: {'display_name': 'Overridden'},
+            None: {'graded': True},
+        }
+        self.assertEqual(self.data.get(self.chapter, 'display_name'), 'Overridden')
+        self.assertTrue(self.data.get(self.course, 'graded'))
+        self.assertTrue(self.data.has(self.chapter, 'graded'))
+        self.assertFalse(self.data.has(self.course, 'display_name'))
+
+    def test_inherited_override(self):
+        due = datetime.datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        TestPublishingOverrideProvider.overrides = {
+            self.course.location: {'due': self.course.fields['due'].to_json(due)},
+        }
+        self.assertEqual(self.data.default(self.chapter, 'due'), due)
+        self.assertFalse(self.data.has(self.chapter, 'due'))
+
+    def test_ancestors_not_searched(self):
+        TestPublishingOverrideProvider.overrides = {
+            self.chapter.location: {'display_name': 'Overridden'},
+        }
+        with patch('courseware.field_overrides._lineage') as mock_lineage:
+            with self.assertRaises(KeyError):
+                self.data.default(self.chapter, 'due')
+        self.assertFalse(mock_lineage.called)
+
+
+@attr(shard=1)
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'courseware.tests.test_field_overrides.TestDeclaringOverrideProvider',))
+class DeclaredOverridableFieldsTests(OverrideFieldBase):
+    """
+    Tests for `OverrideFieldData` with providers that declare the fields they
+    may override.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(DeclaredOverridableFieldsTests, cls).setUpClass()
+        cls.chapter = ItemFactory.create(parent=cls.course, category='chapter', display_name='Chapter')
+
+    def setUp(self):
+        super(DeclaredOverridableFieldsTests, self).setUp()
+        OverrideFieldData.provider_classes = None
+        self.course = self.store.get_course(self.course.id)
+        self.chapter = self.store.get_item(self.chapter.location)
+        self.data = OverrideFieldData.wrap(TESTUSER, self.course, DictFieldData({}))
+
+    def tearDown(self):
+        super(DeclaredOverridableFieldsTests, self).tearDown()
+        OverrideFieldData.provider_classes = None
+
+    def test_inherited_override(self):
+        self.assertEqual(self.data.default(self.chapter, 'due'), datetime.datetime(2015, 1, 1, tzinfo=pytz.UTC))
+        self.assertFalse(self.data.has(self.chapter, 'due'))
+
+    def test_ancestors_not_searched(self):
+        with patch('courseware.field_overrides._lineage') as mock_lineage:
+            with self.assertRaises(KeyError):
+                self.data.default(self.chapter, 'graded')
+            self.assertFalse(self.data.has(self.chapter, 'graded'))
+        self.assertFalse(mock_lineage.called)
+
+
 @attr(shard=1)
 class ResolveDottedTests(unittest.TestCase):
     """
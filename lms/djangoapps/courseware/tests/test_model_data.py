@@ -12,7 +12,13 @@ from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fields import BlockScope, Scope, ScopeIds
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import (
+    DjangoKeyValueStore,
+    FieldDataCache,
+    InvalidScopeError,
+    buffered_user_state_writes,
+    on_user_state_writes_flushed
+)
 from courseware.models import (
     StudentModule,
     XModuleStudentInfoField,
@@ -20,6 +26,8 @@ from courseware.models import (
     XModuleUserStateSummaryField
 )
 from courseware.tests.factories import StudentModuleFactory as cmfStudentModuleFactory
+from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.waffle import BUFFER_USER_STATE_WRITES, waffle
 from courseware.tests.factories import (
     StudentInfoFactory,
     StudentPrefsFactory,
@@ -140,6 +148,14 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         with self.assertNumQueries(0):
             self.assertRaises(KeyError, self.kvs.get, user_state_key('not_a_field'))
 
+    def test_add_cached_descriptor(self):
+        "Test that adding a descriptor whose state is already cached doesn't query the database"
+        with self.assertNumQueries(0):
+            self.field_data_cache.add_descriptors_to_cache(
+                [mock_descriptor([mock_field(Scope.user_state, 'a_field')])]
+            )
+        self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+
     def test_set_existing_field(self):
         "Test that setting an existing user_state field changes the value"
         # We are updating a problem, so we write to courseware_studentmodulehistory
@@ -234,6 +250,43 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(exception_context.exception.saved_field_names, [])
 
+    def test_buffered_writes(self):
+        "Test that buffered writes to the same StudentModule are merged into a single write"
+        with waffle().override(BUFFER_USER_STATE_WRITES, active=True):
+            with patch.object(
+                DjangoXBlockUserStateClient, 'set_many', autospec=True, side_effect=DjangoXBlockUserStateClient.set_many
+            ) as mock_set_many:
+                with buffered_user_state_writes():
+                    with self.assertNumQueries(0):
+                        self.kvs.set(user_state_key('a_field'), 'new_value')
+                        self.kvs.set_many(self.construct_kv_dict())
+                    self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+                    self.kvs.delete(user_state_key('field_b'))
+                    self.assertEquals(mock_set_many.call_count, 0)
+        self.assertEquals(mock_set_many.call_count, 1)
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'b_value', 'field_a': 'new value'},
+            json.loads(StudentModule.objects.all()[0].state)
+        )
+
+    def test_buffered_writes_flushed_callback(self):
+        "Test that callbacks registered while writes are buffered are called after the writes"
+        def assert_state_written():
+            self.assertEquals('new_value', json.loads(StudentModule.objects.all()[0].state)['a_field'])
+        callback = Mock(side_effect=assert_state_written)
+
+        with waffle().override(BUFFER_USER_STATE_WRITES, active=True):
+            with buffered_user_state_writes():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                on_user_state_writes_flushed(callback)
+                self.assertFalse(callback.called)
+        callback.assert_called_once_with()
+
+        # Without buffered writes, callbacks are called right away.
+        callback = Mock()
+        on_user_state_writes_flushed(callback)
+        callback.assert_called_once_with()
+
 
 @attr(shard=1)
 class TestMissingStudentModule(TestCase):
@@ -332,6 +385,18 @@ class StorageTestBase(object):
         with self.assertNumQueries(0):
             self.assertEquals('old_value', self.kvs.get(self.key_factory('existing_field')))
 
+    def test_add_cached_descriptor(self):
+        "Test that adding a descriptor whose fields are already cached doesn't query the database"
+        with self.assertNumQueries(0):
+            self.field_data_cache.add_descriptors_to_cache([self.mock_descriptor])
+        self.assertEquals('old_value', self.kvs.get(self.key_factory('existing_field')))
+
+    def test_add_descriptor_with_new_field(self):
+        "Test that adding a descriptor with a field that isn't cached yet queries the database"
+        with self.assertNumQueries(1):
+            self.field_data_cache.add_descriptors_to_cache([mock_descriptor([mock_field(self.scope, 'new_field')])])
+        self.assertEquals('old_value', self.kvs.get(self.key_factory('existing_field')))
+
     def test_get_missing_field(self):
         "Test that getting a missing field from an existing Storage Field raises a KeyError"
         with self.assertNumQueries(0):
@@ -408,6 +473,56 @@ class StorageTestBase(object):
         self.assertEquals(exception.saved_field_names, ['existing_field', 'other_existing_field'])
 
 
+@attr(shard=1)
+class TestFieldDataCachePrefetch(TestCase):
+    """Tests for the queries made to prefetch the fields of multiple descriptors"""
+
+    def setUp(self):
+        super(TestFieldDataCachePrefetch, self).setUp()
+        self.user = UserFactory.create()
+
+    def _descriptor(self, block_id, fields):
+        """Returns a mock descriptor with the given block id and fields"""
+        descriptor = mock_descriptor(fields)
+        descriptor.scope_ids = ScopeIds(self.user.id, 'mock_problem', location('def_id'), location(block_id))
+        return descriptor
+
+    def test_query_per_scope(self):
+        "Test that each scope is queried once for all of the descriptors with fields in it"
+        descriptors = [
+            self._descriptor('usage_1', [mock_field(Scope.user_state, 'a_field')]),
+            self._descriptor('usage_2', [mock_field(Scope.user_state, 'a_field')]),
+            self._descriptor('usage_3', [mock_field(Scope.user_state_summary, 'summary_field')]),
+        ]
+        with self.assertNumQueries(2):
+            field_data_cache = FieldDataCache(descriptors, course_id, self.user)
+
+        with self.assertNumQueries(0):
+            field_data_cache.add_descriptors_to_cache(descriptors)
+
+    def test_query_for_new_descriptors_only(self):
+        "Test that adding descriptors only queries for those whose fields aren't cached yet"
+        field_data_cache = FieldDataCache(
+            [self._descriptor('usage_1', [mock_field(Scope.user_state, 'a_field')])], course_id, self.user
+        )
+        StudentModuleFactory.create(
+            student=self.user,
+            module_state_key=location('usage_2'),
+            state=json.dumps({'a_field': 'a_value'}),
+        )
+        with patch('courseware.model_data.monitoring_utils.accumulate') as mock_accumulate:
+            with self.assertNumQueries(1):
+                field_data_cache.add_descriptors_to_cache([
+                    self._descriptor('usage_1', [mock_field(Scope.user_state, 'a_field')]),
+                    self._descriptor('usage_2', [mock_field(Scope.user_state, 'a_field')]),
+                ])
+        mock_accumulate.assert_any_call('field_data_cache.queries', 1)
+
+        kvs = DjangoKeyValueStore(field_data_cache)
+        key = DjangoKeyValueStore.Key(Scope.user_state, self.user.id, location('usage_2'), 'a_field')
+        self.assertEquals('a_value', kvs.get(key))
+
+
 class TestUserStateSummaryStorage(StorageTestBase, TestCase):
     """Tests for UserStateSummaryStorage"""
     factory = UserStateSummaryFactory
@@ -11,12 +11,15 @@ import ddt
 import pytest
 import pytz
 from bson import ObjectId
+from celery.exceptions import Retry
 from completion.models import BlockCompletion
 from completion import waffle as completion_waffle
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.urls import reverse
 from django.http import Http404, HttpResponse
+from django.test import TestCase
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from edx_proctoring.api import create_exam, create_exam_attempt, update_attempt_status
@@ -36,18 +39,28 @@ from xblock.field_data import FieldData
 from xblock.fields import ScopeIds
 from xblock.runtime import Runtime
 
+from capa.safe_exec import SafeExecCache
 from capa.tests.response_xml_factory import OptionResponseXMLFactory
+from capa.xqueue_interface import make_xheader
 from course_modes.models import CourseMode
 from courseware import module_render as render
 from courseware.courses import get_course_info_section, get_course_with_access
 from courseware.field_overrides import OverrideFieldData
 from courseware.masquerade import CourseMasquerade
-from courseware.model_data import FieldDataCache
+from courseware.model_data import FieldDataCache, buffered_user_state_writes
 from courseware.models import StudentModule
 from courseware.module_render import get_module_for_descriptor, hash_resource
 from courseware.tests.factories import GlobalStaffFactory, StudentModuleFactory, UserFactory
 from courseware.tests.test_submitting_problems import TestSubmittingProblems
 from courseware.tests.tests import LoginEnrollmentTestCase
+from courseware.tasks import XQUEUE_MAX_RETRIES, XQUEUE_RETRY_DELAY_SECONDS, send_to_xqueue
+from courseware.waffle import (
+    BUFFER_USER_STATE_WRITES,
+    DEFER_XQUEUE_SUBMISSIONS,
+    RENDERED_INPUT_CACHE,
+    SAFE_EXEC_RESULT_CACHE
+)
+from courseware.waffle import waffle as courseware_waffle
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from openedx.core.djangoapps.credit.api import set_credit_requirement_status, set_credit_requirements
 from openedx.core.djangoapps.credit.models import CreditCourse
@@ -2432,3 +2445,141 @@ class TestDisabledXBlockTypes(ModuleStoreTestCase):
         item = self.store.get_item(item_id)
         self.assertEqual(item.__class__.__name__, descriptor)
         return item_id
+
+
+class TestSafeExecCache(TestCase):
+    """
+    Tests the cache of the results of sandboxed code given to the runtime.
+    """
+    def test_safe_exec_cache(self):
+        course_key = CourseKey.from_string('course-v1:edX+toy+2012_Fall')
+        self.assertIs(render.get_safe_exec_cache(course_key), cache)
+
+        with courseware_waffle().override(SAFE_EXEC_RESULT_CACHE, active=True):
+            safe_exec_cache = render.get_safe_exec_cache(course_key)
+        self.assertIsInstance(safe_exec_cache, SafeExecCache)
+        self.assertIs(safe_exec_cache.shared_cache, cache)
+        self.assertEqual(safe_exec_cache.namespace, text_type(course_key))
+
+
+class TestRenderedInputCacheScope(TestCase):
+    """
+    Tests the scope under which capa inputs without student state are shared.
+    """
+    @patch('courseware.module_render.get_current_theme', return_value=Mock(theme_dir_name='red-theme'))
+    @patch('courseware.module_render.get_current_site', return_value=Mock(id=3))
+    def test_rendered_input_cache_scope(self, _mock_site, _mock_theme):
+        self.assertIsNone(render.get_rendered_input_cache_scope())
+
+        with courseware_waffle().override(RENDERED_INPUT_CACHE, active=True):
+            self.assertEqual(render.get_rendered_input_cache_scope(), (3, 'red-theme'))
+
+    @patch('courseware.module_render.get_current_theme', return_value=None)
+    @patch('courseware.module_render.get_current_site', return_value=None)
+    def test_rendered_input_cache_scope_without_site(self, _mock_site, _mock_theme):
+        with courseware_waffle().override(RENDERED_INPUT_CACHE, active=True):
+            self.assertEqual(render.get_rendered_input_cache_scope(), (None, None))
+
+
+@ddt.ddt
+class TestDeferredXQueueSubmissions(TestCase):
+    """
+    Tests the delivery of xqueue submissions by a task, to a stub xqueue.
+    """
+    def setUp(self):
+        super(TestDeferredXQueueSubmissions, self).setUp()
+        self.header = make_xheader('http://lms/xqueue_callback', 'queuekey', 'test-queue')
+        self.body = json.dumps({'student_response': 'print 42'})
+        patcher = patch.object(render.XQUEUE_INTERFACE.session, 'post')
+        self.mock_post = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.set_xqueue_reply(status_code=200, return_code=0)
+
+    def set_xqueue_reply(self, status_code, return_code):
+        """
+        Sets the reply of the stub xqueue to all further submissions.
+        """
+        self.mock_post.return_value = Mock(
+            status_code=status_code,
+            text=json.dumps({'return_code': return_code, 'content': '1'}),
+        )
+
+    def test_switch_disabled(self):
+        self.assertEqual(render.XQUEUE_INTERFACE.send_to_queue(self.header, self.body), (0, '1'))
+        self.assertEqual(self.mock_post.call_count, 1)
+
+    def test_deferred_until_commit(self):
+        with courseware_waffle().override(DEFER_XQUEUE_SUBMISSIONS, active=True):
+            with patch('courseware.module_render.transaction.on_commit') as mock_on_commit:
+                self.assertEqual(
+                    render.XQUEUE_INTERFACE.send_to_queue(self.header, self.body),
+                    (0, 'queued for delivery'),
+                )
+        self.assertFalse(self.mock_post.called)
+
+        # Commit the transaction, which runs the task.
+        mock_on_commit.call_args[0][0]()
+        self.assertEqual(self.mock_post.call_count, 1)
+        self.assertEqual(self.mock_post.call_args[1]['data']['xqueue_header'], self.header)
+
+    def test_deferred_until_buffered_writes_flushed(self):
+        with courseware_waffle().override(DEFER_XQUEUE_SUBMISSIONS, active=True):
+            with courseware_waffle().override(BUFFER_USER_STATE_WRITES, active=True):
+                with patch('courseware.module_render.transaction.on_commit') as mock_on_commit:
+                    with buffered_user_state_writes():
+                        render.XQUEUE_INTERFACE.send_to_queue(self.header, self.body)
+                        # The queued state of the learner is not written yet.
+                        self.assertFalse(mock_on_commit.called)
+                    self.assertEqual(mock_on_commit.call_count, 1)
+        self.assertFalse(self.mock_post.called)
+
+        mock_on_commit.call_args[0][0]()
+        self.assertEqual(self.mock_post.call_count, 1)
+
+    def test_files_not_deferred(self):
+        submitted_file = Mock()
+        submitted_file.name = 'answer.py'
+        with courseware_waffle().override(DEFER_XQUEUE_SUBMISSIONS, active=True):
+            result = render.XQUEUE_INTERFACE.send_to_queue(self.header, self.body, files_to_upload=[submitted_file])
+        self.assertEqual(result, (0, '1'))
+        self.assertEqual(self.mock_post.call_args[1]['files'], {'answer.py': submitted_file})
+
+    @ddt.data(0, XQUEUE_MAX_RETRIES)
+    def test_delivery_failure(self, retries):
+        self.set_xqueue_reply(status_code=502, return_code=1)
+        with patch.object(send_to_xqueue, 'retry', return_value=Retry()) as mock_retry:
+            result = send_to_xqueue.apply(args=(self.header, self.body), retries=retries)
+        if retries < XQUEUE_MAX_RETRIES:
+            self.assertIsInstance(result.result, Retry)
+            mock_retry.assert_called_once_with(countdown=XQUEUE_RETRY_DELAY_SECONDS)
+        else:
+            self.assertTrue(result.successful())
+            self.assertFalse(mock_retry.called)
+
+    def test_undelivered_submission_unqueued(self):
+        course_key = CourseKey.from_string('course-v1:edX+toy+2012_Fall')
+        usage_key = course_key.make_usage_key('problem', 'queued')
+        queued_answer = {'correctness': 'incomplete', 'msg': '', 'queuestate': {'key': 'queuekey', 'time': '1'}}
+        other_answer = {'correctness': 'correct', 'msg': '', 'queuestate': None}
+        student_module = StudentModuleFactory(
+            course_id=course_key,
+            module_state_key=usage_key,
+            state=json.dumps({'correct_map': {'answer_1': queued_answer, 'answer_2': other_answer}}),
+        )
+        callback_url = 'http://lms' + reverse('xqueue_callback', kwargs={
+            'course_id': text_type(course_key),
+            'userid': str(student_module.student.id),
+            'mod_id': text_type(usage_key),
+            'dispatch': 'score_update',
+        })
+        header = make_xheader(callback_url, 'queuekey', 'test-queue')
+
+        self.set_xqueue_reply(status_code=502, return_code=1)
+        result = send_to_xqueue.apply(args=(header, self.body), retries=XQUEUE_MAX_RETRIES)
+        self.assertTrue(result.successful())
+
+        correct_map = json.loads(StudentModule.objects.get(pk=student_module.pk).state)['correct_map']
+        self.assertIsNone(correct_map['answer_1']['queuestate'])
+        self.assertIsNone(correct_map['answer_1']['correctness'])
+        self.assertIn('Unable to deliver your submission to grader', correct_map['answer_1']['msg'])
+        self.assertEqual(correct_map['answer_2'], other_answer)
@@ -3,14 +3,19 @@ Black-box tests of the DjangoUserStateClient against the semantics
 defined in edx_user_state_client.
 """
 
+import json
 from collections import defaultdict
 from unittest import skip
 
 from django.test import TestCase
+from django.test.utils import override_settings
 from edx_user_state_client.tests import UserStateClientTestBase
 
-from courseware.tests.factories import UserFactory
+from courseware.fields import COMPRESSED_STATE_PREFIX
+from courseware.models import StudentModule
+from courseware.tests.factories import StudentModuleFactory, UserFactory, location
 from courseware.user_state_client import DjangoXBlockUserStateClient
+from courseware.waffle import COMPRESS_STUDENT_MODULE_STATE, waffle
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
@@ -36,3 +41,91 @@ class TestDjangoUserStateClient(UserStateClientTestBase, ModuleStoreTestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
+
+
+class TestCompressedUserState(TestCase):
+    """
+    Tests that compressed states are transparent to the DjangoUserStateClient.
+    """
+    shard = 4
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestCompressedUserState, self).setUp()
+        self.user = UserFactory.create()
+        self.client = DjangoXBlockUserStateClient(self.user)
+        self.block_key = location('usage_id')
+        self.state = {'student_answers': {'answer_{}'.format(index): 'choice_1' for index in range(100)}}
+
+    def _num_compressed_states(self):
+        """
+        Returns the number of StudentModules with a compressed stored state.
+        """
+        return StudentModule.objects.filter(state__startswith=COMPRESSED_STATE_PREFIX).count()
+
+    def _get_state(self):
+        return self.client.get(self.user.username, self.block_key).state
+
+    def test_compressed_state(self):
+        with waffle().override(COMPRESS_STUDENT_MODULE_STATE, active=True):
+            self.client.set(self.user.username, self.block_key, self.state)
+        self.assertEqual(self._num_compressed_states(), 1)
+        self.assertEqual(self._get_state(), self.state)
+
+        self.client.set(self.user.username, self.block_key, {'attempts': 1})
+        self.assertEqual(self._num_compressed_states(), 0)
+        self.assertEqual(self._get_state(), dict(self.state, attempts=1))
+
+    def test_short_state_not_compressed(self):
+        with waffle().override(COMPRESS_STUDENT_MODULE_STATE, active=True):
+            self.client.set(self.user.username, self.block_key, {'attempts': 1})
+        self.assertEqual(self._num_compressed_states(), 0)
+        self.assertEqual(StudentModule.objects.get().state, json.dumps({'attempts': 1}))
+
+
+@override_settings(USER_STATE_BATCH_SIZE=2)
+class TestIterAllForBlock(TestCase):
+    """
+    Tests the batched reads of the states of all users of a block.
+    """
+    shard = 4
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestIterAllForBlock, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.block_key = location('usage_id')
+        self.student_modules = [
+            StudentModuleFactory.create(module_state_key=self.block_key, state=json.dumps({'a': index, 'b': index}))
+            for index in range(5)
+        ]
+        # Neither deleted nor missing states are returned.
+        StudentModuleFactory.create(module_state_key=self.block_key, state='{}')
+        StudentModuleFactory.create(module_state_key=self.block_key, state=None)
+        StudentModuleFactory.create(module_state_key=location('other_usage_id'), state=json.dumps({'a': 0}))
+
+    def _usernames_and_states(self, user_states):
+        return sorted((user_state.username, user_state.state) for user_state in user_states)
+
+    def test_iter_all_for_block(self):
+        # One query for each batch of 2 rows, and one for the empty last batch.
+        with self.assertNumQueries(4):
+            user_states = list(self.client.iter_all_for_block(self.block_key))
+        self.assertEqual(
+            self._usernames_and_states(user_states),
+            sorted(
+                (student_module.student.username, json.loads(student_module.state))
+                for student_module in self.student_modules
+            ),
+        )
+        self.assertTrue(all(user_state.block_key == self.block_key for user_state in user_states))
+
+    def test_usernames_and_fields(self):
+        usernames = [student_module.student.username for student_module in self.student_modules[:3]]
+        user_states = self.client.iter_all_for_block(self.block_key, usernames=usernames + ['unknown'], fields=['a'])
+        self.assertEqual(
+            self._usernames_and_states(user_states),
+            sorted((username, {'a': index}) for index, username in enumerate(usernames)),
+        )
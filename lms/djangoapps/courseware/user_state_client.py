@@ -9,7 +9,6 @@ from operator import attrgetter
 from time import time
 
 from django.conf import settings
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.db.utils import IntegrityError
@@ -17,7 +16,7 @@ from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClie
 from xblock.fields import Scope
 
 import dogstats_wrapper as dog_stats_api
-from courseware.models import BaseStudentModuleHistory, StudentModule
+from courseware.models import DEFAULT_CHUNK_SIZE, BaseStudentModuleHistory, StudentModule, chunks
 from openedx.core.djangoapps import monitoring_utils
 
 try:
@@ -441,7 +440,49 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
-    def iter_all_for_block(self, block_key, scope=Scope.user_state):
+    def _iter_user_states(self, student_modules, scope, fields=None):
+        """
+        Yields the XBlockUserState of each of the given StudentModules with a stored state.
+
+        The StudentModules are read in batches of settings.USER_STATE_BATCH_SIZE rows of
+        increasing id, along with the usernames of their students, and the states of each
+        batch are decoded as it is consumed. Memory use is thus independent of the number
+        of StudentModules, and the cost of reading a batch doesn't grow with its offset.
+
+        Arguments:
+            student_modules (QuerySet): The StudentModules to read.
+            scope (Scope): The scope of the yielded states.
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
+        """
+        batch_size = settings.USER_STATE_BATCH_SIZE
+        rows = student_modules.filter(state__isnull=False).order_by('id').values_list(
+            'id', 'student__username', 'module_state_key', 'state', 'modified',
+        )
+
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            for _, username, block_key, state, modified in batch:
+                state = json.loads(state)
+
+                # If the state is the empty dict, then it has been deleted, and so
+                # conformant UserStateClients should treat it as if it doesn't exist.
+                if state == {}:
+                    continue
+
+                if fields is not None:
+                    state = {
+                        field: state[field]
+                        for field in fields
+                        if field in state
+                    }
+                yield XBlockUserState(username, block_key, state, modified, scope)
+
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1][0]
+
+    def iter_all_for_block(self, block_key, scope=Scope.user_state, usernames=None, fields=None):
         """
         Return an iterator over the data stored in the block (e.g. a problem block).
 
@@ -451,6 +492,9 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         Arguments:
             block_key: an XBlock's locator (e.g. :class:`~BlockUsageLocator`)
             scope (Scope): must be `Scope.user_state`
+            usernames: A list of the names of the users whose data to retrieve. If None,
+                retrieve the data of all users.
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
 
         Returns:
             an iterator over all data. Each invocation returns the next :class:`~XBlockUserState`
@@ -459,19 +503,16 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
-        results = StudentModule.objects.order_by('id').filter(module_state_key=block_key)
-        p = Paginator(results, settings.USER_STATE_BATCH_SIZE)
+        self._nr_stat_increment('iter_all_for_block', 'calls')
 
-        for page_number in p.page_range:
-            page = p.page(page_number)
+        results = StudentModule.objects.filter(module_state_key=block_key)
+        if usernames is None:
+            return self._iter_user_states(results, scope, fields)
 
-            for sm in page.object_list:
-                state = json.loads(sm.state)
-
-                if state == {}:
-                    continue
-
-                yield XBlockUserState(sm.student.username, sm.module_state_key, state, sm.modified, scope)
+        return itertools.chain.from_iterable(
+            self._iter_user_states(results.filter(student__username__in=usernames_chunk), scope, fields)
+            for usernames_chunk in chunks(usernames, DEFAULT_CHUNK_SIZE)
+        )
 
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state):
         """
@@ -491,19 +532,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
-        results = StudentModule.objects.order_by('id').filter(course_id=course_key)
+        self._nr_stat_increment('iter_all_for_course', 'calls')
+
+        results = StudentModule.objects.filter(course_id=course_key)
         if block_type:
             results = results.filter(module_type=block_type)
 
-        p = Paginator(results, settings.USER_STATE_BATCH_SIZE)
-
-        for page_number in p.page_range:
-            page = p.page(page_number)
-
-            for sm in page.object_list:
-                state = json.loads(sm.state)
-
-                if state == {}:
-                    continue
-
-                yield XBlockUserState(sm.student.username, sm.module_state_key, state, sm.modified, scope)
+        return self._iter_user_states(results, scope)
@@ -68,7 +68,10 @@ from lms.djangoapps.certificates.models import CertificateStatuses
 from lms.djangoapps.commerce.utils import EcommerceService
 from lms.djangoapps.courseware.exceptions import CourseAccessRedirect, Redirect
 from lms.djangoapps.experiments.utils import get_experiment_user_metadata_context
+from lms.djangoapps.grades.config.waffle import CACHE_PROGRESS_SUMMARIES
+from lms.djangoapps.grades.config.waffle import waffle as grades_waffle
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.grades.progress_summary import read_progress_summary
 from lms.djangoapps.instructor.enrollment import uses_shib
 from lms.djangoapps.instructor.views.api import require_global_staff
 from lms.djangoapps.verify_student.services import IDVerificationService
@@ -980,7 +983,10 @@ def _progress(request, course_key, student_id):
     # NOTE: To make sure impersonation by instructor works, use
     # student instead of request.user in the rest of the function.
 
-    course_grade = CourseGradeFactory().read(student, course)
+    if grades_waffle().is_enabled(CACHE_PROGRESS_SUMMARIES):
+        course_grade = read_progress_summary(student, course)
+    else:
+        course_grade = CourseGradeFactory().read(student, course)
     courseware_summary = course_grade.chapter_grades.values()
 
     studio_url = get_studio_url(course, 'settings/grading')
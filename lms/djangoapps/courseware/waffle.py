@@ -0,0 +1,25 @@
+"""
+This module contains various configuration settings via
+waffle switches for the Courseware app.
+"""
+from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
+
+# Namespace
+WAFFLE_NAMESPACE = u'courseware'
+
+# Switches
+BUFFER_USER_STATE_WRITES = u'buffer_user_state_writes'
+ASYNC_STUDENT_MODULE_HISTORY = u'async_student_module_history'
+RATE_LIMIT_VIDEO_POSITION_SAVES = u'rate_limit_video_position_saves'
+COMPRESS_STUDENT_MODULE_STATE = u'compress_student_module_state'
+CACHE_ACCESS_DECISIONS = u'cache_access_decisions'
+SAFE_EXEC_RESULT_CACHE = u'safe_exec_result_cache'
+DEFER_XQUEUE_SUBMISSIONS = u'defer_xqueue_submissions'
+RENDERED_INPUT_CACHE = u'rendered_input_cache'
+
+
+def waffle():
+    """
+    Returns the namespaced, cached, audited Waffle class for Courseware.
+    """
+    return WaffleSwitchNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'Courseware: ')
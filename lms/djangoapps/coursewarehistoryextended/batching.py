@@ -0,0 +1,62 @@
+"""
+Batching of the StudentModuleHistoryExtended entries saved during a request.
+
+Within :func:`batched_history`, the history entries of the saved StudentModules
+are collected instead of being saved one at a time. They are then written
+asynchronously, by a single task, once the current transaction commits.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from courseware.waffle import ASYNC_STUDENT_MODULE_HISTORY, waffle
+from openedx.core.djangoapps.request_cache import get_cache
+
+_CACHE_NAMESPACE = u'coursewarehistoryextended.batching'
+_CACHE_KEY = u'history_entries'
+
+
+@contextmanager
+def batched_history():
+    """
+    Collects the history entries of the StudentModules saved within the
+    context, and writes them asynchronously once the current transaction
+    commits.
+
+    Entries are only batched while the courseware.async_student_module_history
+    switch is enabled. Nested contexts share the batch of the outermost one.
+    """
+    request_cache = get_cache(_CACHE_NAMESPACE)
+    if _CACHE_KEY in request_cache or not waffle().is_enabled(ASYNC_STUDENT_MODULE_HISTORY):
+        yield
+        return
+
+    history_entries = request_cache[_CACHE_KEY] = []
+    try:
+        yield
+    finally:
+        del request_cache[_CACHE_KEY]
+        if history_entries:
+            # Imported here, as the tasks import the models of this app,
+            # which may not be installed.
+            from .tasks import write_history_entries
+            transaction.on_commit(lambda: write_history_entries.delay(history_entries))
+
+
+def add_to_batch(history_entry):
+    """
+    Adds the serialized values of the given history entry to the current
+    batch. Returns whether there is a batch to add it to.
+    """
+    history_entries = get_cache(_CACHE_NAMESPACE).get(_CACHE_KEY)
+    if history_entries is None:
+        return False
+
+    history_entries.append({
+        'student_module_id': history_entry.student_module_id,
+        'created': history_entry.created.isoformat(),
+        'state': history_entry.state,
+        'grade': history_entry.grade,
+        'max_grade': history_entry.max_grade,
+    })
+    return True
@@ -17,6 +17,7 @@ from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from courseware.models import BaseStudentModuleHistory, StudentModule
+from coursewarehistoryextended.batching import add_to_batch
 from coursewarehistoryextended.fields import UnsignedBigIntAutoField
 
 
@@ -42,7 +43,8 @@ class StudentModuleHistoryExtended(BaseStudentModuleHistory):
         """
         Checks the instance's module_type, and creates & saves a
         StudentModuleHistoryExtended entry if the module_type is one that
-        we save.
+        we save. Within batching.batched_history, the entry is saved later,
+        along with the rest of the batch.
         """
         if instance.module_type in StudentModuleHistoryExtended.HISTORY_SAVING_TYPES:
             history_entry = StudentModuleHistoryExtended(student_module=instance,
@@ -51,7 +53,8 @@ class StudentModuleHistoryExtended(BaseStudentModuleHistory):
                                                          state=instance.state,
                                                          grade=instance.grade,
                                                          max_grade=instance.max_grade)
-            history_entry.save()
+            if not add_to_batch(history_entry):
+                history_entry.save()
 
     @receiver(post_delete, sender=StudentModule)
     def delete_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
@@ -0,0 +1,27 @@
+"""
+Asynchronous tasks of the coursewarehistoryextended app.
+"""
+from celery import task
+from celery_utils.logged_task import LoggedTask
+from dateutil.parser import parse as parse_datetime
+
+from coursewarehistoryextended.models import StudentModuleHistoryExtended
+
+
+@task(base=LoggedTask)
+def write_history_entries(history_entries):
+    """
+    Writes the StudentModuleHistoryExtended entries with the given
+    serialized values, as collected by batching.batched_history.
+    """
+    StudentModuleHistoryExtended.objects.bulk_create([
+        StudentModuleHistoryExtended(
+            student_module_id=history_entry['student_module_id'],
+            version=None,
+            created=parse_datetime(history_entry['created']),
+            state=history_entry['state'],
+            grade=history_entry['grade'],
+            max_grade=history_entry['max_grade'],
+        )
+        for history_entry in history_entries
+    ])
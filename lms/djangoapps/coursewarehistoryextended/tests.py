@@ -15,6 +15,10 @@ from nose.plugins.attrib import attr
 
 from courseware.models import BaseStudentModuleHistory, StudentModule, StudentModuleHistory
 from courseware.tests.factories import StudentModuleFactory, course_id, location
+from courseware.waffle import ASYNC_STUDENT_MODULE_HISTORY, waffle
+from coursewarehistoryextended.batching import batched_history
+from coursewarehistoryextended.models import StudentModuleHistoryExtended
+from coursewarehistoryextended.tasks import write_history_entries
 
 
 @attr(shard=1)
@@ -79,3 +83,38 @@ class TestStudentModuleHistoryBackends(TestCase):
         student_module = StudentModule.objects.all()
         history = BaseStudentModuleHistory.get_history(student_module)
         self.assertEquals(len(history), 0)
+
+
+@attr(shard=1)
+@skipUnless(settings.FEATURES["ENABLE_CSMH_EXTENDED"], "CSMH Extended needs to be enabled")
+class TestBatchedHistory(TestCase):
+    """ Tests of the asynchronous, batched writes of CSMHE """
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    @patch('django.db.transaction.on_commit', side_effect=lambda func: func())
+    def test_batched_history(self, mock_on_commit):
+        with waffle().override(ASYNC_STUDENT_MODULE_HISTORY, active=True):
+            with patch('coursewarehistoryextended.tasks.write_history_entries.delay', autospec=True) as mock_delay:
+                with batched_history():
+                    for record in (1, 2, 3):
+                        StudentModuleFactory.create(module_state_key=location('usage_id_{}'.format(record)),
+                                                    course_id=course_id,
+                                                    state=json.dumps({'order': record}))
+                    self.assertEquals(StudentModuleHistoryExtended.objects.count(), 0)
+
+        self.assertEquals(mock_on_commit.call_count, 1)
+        history_entries = mock_delay.call_args[0][0]
+        self.assertEquals(len(history_entries), 3)
+
+        # The entries are sent to the task as json
+        write_history_entries(json.loads(json.dumps(history_entries)))
+        self.assertEquals(
+            [json.loads(entry.state) for entry in StudentModuleHistoryExtended.objects.order_by('id')],
+            [{'order': 1}, {'order': 2}, {'order': 3}],
+        )
+
+    def test_not_batched(self):
+        with batched_history():
+            StudentModuleFactory.create(module_state_key=location('usage_id'), course_id=course_id)
+            self.assertEquals(StudentModuleHistoryExtended.objects.count(), 1)
@@ -0,0 +1,120 @@
+"""
+Bulk retrieval of the raw scores of multiple users in a course.
+
+Computing the grades of many users one at a time requires a query for
+the user's scores in the courseware student module table and another
+for the user's scores in the submissions table.  The functions in this
+module retrieve those scores for a batch of users at once and store
+them in the request cache, where the SubsectionGradeFactory looks for
+them before querying for a single user.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError
+
+from courseware.model_data import ScoresClient
+from openedx.core.djangoapps.request_cache import get_cache
+from student.models import AnonymousUserId, anonymous_id_for_user
+from submissions.models import ScoreSummary
+from submissions.serializers import UnannotatedScoreSerializer
+
+_CACHE_NAMESPACE = u'grades.bulk_scores'
+
+
+def prefetch(course_key, users, scorable_locations):
+    """
+    Prefetches the courseware student module scores of the given
+    scorable_locations and the submissions scores for the given users in
+    the given course, with a single query per score source.
+    """
+    scores_clients = ScoresClient.create_for_users(
+        course_key, [user.id for user in users], scorable_locations,
+    )
+    submissions_scores = _get_submissions_scores(course_key, users)
+
+    prefetched = get_cache(_CACHE_NAMESPACE)
+    for user in users:
+        prefetched[_cache_key(user.id, course_key)] = (scores_clients[user.id], submissions_scores[user.id])
+
+
+def get_prefetched_csm_scores(user_id, course_key):
+    """
+    Returns the prefetched ScoresClient of the given user in the given
+    course, or None if it was not prefetched.
+    """
+    prefetched = get_cache(_CACHE_NAMESPACE).get(_cache_key(user_id, course_key))
+    return prefetched[0] if prefetched else None
+
+
+def get_prefetched_submissions_scores(user_id, course_key):
+    """
+    Returns the prefetched submissions scores of the given user in the
+    given course, or None if they were not prefetched.
+    """
+    prefetched = get_cache(_CACHE_NAMESPACE).get(_cache_key(user_id, course_key))
+    return prefetched[1] if prefetched else None
+
+
+def clear_prefetched(course_key, users):
+    """
+    Clears the scores prefetched for the given users in the given course.
+    """
+    prefetched = get_cache(_CACHE_NAMESPACE)
+    for user in users:
+        prefetched.pop(_cache_key(user.id, course_key), None)
+
+
+def _get_submissions_scores(course_key, users):
+    """
+    Returns a dictionary mapping the id of each given user to the user's
+    scores in the given course, as would be returned by
+    submissions.api.get_scores.
+    """
+    anonymous_user_ids = _get_anonymous_user_ids(course_key, users)
+    user_ids_by_anonymous_id = {
+        anonymous_user_id: user_id for user_id, anonymous_user_id in anonymous_user_ids.iteritems()
+    }
+    score_summaries = ScoreSummary.objects.filter(
+        student_item__course_id=str(course_key),
+        student_item__student_id__in=user_ids_by_anonymous_id.keys(),
+    ).select_related('latest', 'latest__submission', 'student_item')
+
+    scores_by_user = defaultdict(dict)
+    for summary in score_summaries:
+        if summary.latest.is_hidden():
+            continue
+        user_id = user_ids_by_anonymous_id[summary.student_item.student_id]
+        scores_by_user[user_id][summary.student_item.item_id] = UnannotatedScoreSerializer(summary.latest).data
+    return scores_by_user
+
+
+def _get_anonymous_user_ids(course_key, users):
+    """
+    Returns a dictionary mapping the id of each given user to the user's
+    anonymous id in the given course.  Anonymous ids that are not yet
+    stored are saved, as with anonymous_id_for_user.
+    """
+    anonymous_user_ids = {
+        user.id: anonymous_id_for_user(user, course_key, save=False) for user in users
+    }
+    stored_ids = set(
+        AnonymousUserId.objects.filter(
+            anonymous_user_id__in=anonymous_user_ids.values(),
+        ).values_list('anonymous_user_id', flat=True)
+    )
+    for user in users:
+        if anonymous_user_ids[user.id] not in stored_ids:
+            try:
+                AnonymousUserId.objects.get_or_create(
+                    user=user,
+                    course_id=course_key,
+                    anonymous_user_id=anonymous_user_ids[user.id],
+                )
+            except IntegrityError:
+                # Another thread has already created this entry.
+                pass
+    return anonymous_user_ids
+
+
+def _cache_key(user_id, course_key):
+    return user_id, unicode(course_key)
@@ -10,6 +10,11 @@ WAFFLE_NAMESPACE = u'grades'
 # Switches
 ASSUME_ZERO_GRADE_IF_ABSENT = u'assume_zero_grade_if_absent'
 DISABLE_REGRADE_ON_POLICY_CHANGE = u'disable_regrade_on_policy_change'
+BULK_GRADE_ITERATION = u'bulk_grade_iteration'
+COALESCE_SUBSECTION_GRADE_UPDATES = u'coalesce_subsection_grade_updates'
+BULK_ENSURE_VISIBLE_BLOCKS = u'bulk_ensure_visible_blocks'
+CACHE_PROGRESS_SUMMARIES = u'cache_progress_summaries'
+VECTORIZED_GRADE_COMPUTATION = u'vectorized_grade_computation'
 
 # Course Flags
 REJECTED_EXAM_OVERRIDES_GRADE = u'rejected_exam_overrides_grade'
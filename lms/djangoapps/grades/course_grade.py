@@ -321,5 +321,22 @@ class CourseGrade(CourseGradeBase):
         return success_cutoff and percent >= success_cutoff
 
 
+class ComputedCourseGrade(CourseGrade):
+    """
+    Course Grade class for grades computed with those of other users
+    by a CourseGradeMatrix, along with their subsection grades.
+    """
+    def __init__(self, user, course_data, subsection_grades, percent, letter_grade, passed):
+        super(ComputedCourseGrade, self).__init__(user, course_data, percent, letter_grade, passed)
+        self._computed_subsection_grades = subsection_grades
+
+    def _get_subsection_grade(self, subsection, force_update_subsections=False):
+        subsection_grade = self._computed_subsection_grades.get(subsection.location)
+        if subsection_grade is None:
+            # The subsection is not in the course structure the grade was computed for.
+            subsection_grade = super(ComputedCourseGrade, self)._get_subsection_grade(subsection)
+        return subsection_grade
+
+
 def _uniqueify_and_keep_order(iterable):
     return OrderedDict([(item, None) for item in iterable]).keys()
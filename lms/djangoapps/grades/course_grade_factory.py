@@ -1,7 +1,8 @@
 """
 Course Grade Factory Class
 """
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
+from itertools import islice
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
@@ -9,10 +10,15 @@ from six import text_type
 
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
 
+from . import bulk_scores
 from .config import assume_zero_if_absent, should_persist_grades
+from .config.waffle import BULK_GRADE_ITERATION, VECTORIZED_GRADE_COMPUTATION, waffle
 from .course_data import CourseData
-from .course_grade import CourseGrade, ZeroCourseGrade
-from .models import PersistentCourseGrade, prefetch
+from .course_grade import ComputedCourseGrade, CourseGrade, ZeroCourseGrade
+from .course_grade_matrix import CourseGradeMatrix
+from .models import PersistentCourseGrade, bulk_prefetch, clear_bulk_prefetch, prefetch
+from .scores import possibly_scored
+from .subsection_grade_factory import SubsectionGradeFactory
 
 log = getLogger(__name__)
 
@@ -23,6 +29,9 @@ class CourseGradeFactory(object):
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
 
+    # Number of users whose data is retrieved together by iter.
+    BULK_ITERATION_CHUNK_SIZE = 200
+
     def read(
             self,
             user,
@@ -92,6 +101,10 @@ class CourseGradeFactory(object):
 
         If an error occurred, course_grade will be None and err_msg will be an
         exception message. If there was no error, err_msg is an empty string.
+
+        With the BULK_GRADE_ITERATION and VECTORIZED_GRADE_COMPUTATION
+        switches enabled, the updated course and subsection grades of each
+        chunk of users are computed together by CourseGradeMatrix.
         """
         # Pre-fetch the collected course_structure (in _iter_grade_result) so:
         # 1. Correctness: the same version of the course is used to
@@ -102,9 +115,53 @@ class CourseGradeFactory(object):
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
         stats_tags = [u'action:{}'.format(course_data.course_key)]
-        for user in users:
-            with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
-                yield self._iter_grade_result(user, course_data, force_update)
+        if not waffle().is_enabled(BULK_GRADE_ITERATION):
+            for user in users:
+                with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
+                    yield self._iter_grade_result(user, course_data, force_update)
+            return
+
+        users = iter(users)
+        while True:
+            users_chunk = list(islice(users, self.BULK_ITERATION_CHUNK_SIZE))
+            if not users_chunk:
+                break
+            course_grade_users = self._bulk_prefetch(users_chunk, course_data)
+            try:
+                if force_update and waffle().is_enabled(VECTORIZED_GRADE_COMPUTATION):
+                    for result in self._iter_vectorized_update_results(users_chunk, course_data, stats_tags):
+                        yield result
+                else:
+                    for user in users_chunk:
+                        with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
+                            yield self._iter_grade_result(user, course_data, force_update)
+            finally:
+                self._clear_bulk_prefetch(users_chunk, course_data, course_grade_users)
+
+    @staticmethod
+    def _bulk_prefetch(users, course_data):
+        """
+        Retrieves, in bulk, the stored grades and the raw scores of the
+        given users, so they are not queried for each user individually.
+        Returns the users whose course grades were retrieved.
+        """
+        course_grade_users = []
+        if should_persist_grades(course_data.course_key):
+            course_grade_users = bulk_prefetch(users, course_data.course_key)
+        scorable_locations = [
+            block_key for block_key in course_data.collected_structure if possibly_scored(block_key)
+        ]
+        bulk_scores.prefetch(course_data.course_key, users, scorable_locations)
+        return course_grade_users
+
+    @staticmethod
+    def _clear_bulk_prefetch(users, course_data, course_grade_users):
+        """
+        Releases the data retrieved by _bulk_prefetch for the given users.
+        """
+        if should_persist_grades(course_data.course_key):
+            clear_bulk_prefetch(users, course_data.course_key, course_grade_users)
+        bulk_scores.clear_prefetched(course_data.course_key, users)
 
     def _iter_grade_result(self, user, course_data, force_update):
         try:
@@ -121,15 +178,82 @@ class CourseGradeFactory(object):
             course_grade = method(**kwargs)
             return self.GradeResult(user, course_grade, None)
         except Exception as exc:  # pylint: disable=broad-except
-            # Keep marching on even if this student couldn't be graded for
-            # some reason, but log it for future reference.
-            log.exception(
-                'Cannot grade student %s in course %s because of exception: %s',
-                user.id,
-                course_data.course_key,
-                text_type(exc)
-            )
-            return self.GradeResult(user, None, exc)
+            return self._grade_error_result(user, course_data, exc)
+
+    def _iter_vectorized_update_results(self, users, course_data, stats_tags):
+        """
+        Yields the GradeResult of each of the given users, as
+        _iter_grade_result does with force_update, but with the course
+        and subsection grades of the users whose course structures have
+        the same scored subsections computed together by a
+        CourseGradeMatrix, from the users' bulk-prefetched scores.
+
+        The subsection grades of all the users are updated before any of
+        their course grades are saved.
+        """
+        course_grades, errors, matrices = {}, {}, OrderedDict()
+        with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter_vectorized', tags=stats_tags):
+            for user in users:
+                try:
+                    user_course_data = CourseData(
+                        user,
+                        course=course_data.course,
+                        collected_block_structure=course_data.collected_structure,
+                        course_key=course_data.course_key,
+                    )
+                    matrix = CourseGradeMatrix.from_course_data(user_course_data)
+                    subsection_grade_factory = SubsectionGradeFactory(user, course_data=user_course_data)
+                    problem_scores = subsection_grade_factory.problem_scores(matrix.problem_locations)
+                    matrices.setdefault(matrix.subsections, (matrix, []))[1].append(
+                        (user, user_course_data, subsection_grade_factory, problem_scores)
+                    )
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors[user.id] = exc
+
+            for matrix, matrix_users in matrices.itervalues():
+                grade_arrays = matrix.grade([problem_scores for _, _, _, problem_scores in matrix_users])
+                for row, (user, user_course_data, subsection_grade_factory, problem_scores) in enumerate(matrix_users):
+                    try:
+                        subsection_grades = matrix.subsection_grades(
+                            user_course_data.structure, problem_scores, grade_arrays.subsection_totals, row,
+                        )
+                        subsection_grade_factory.save_computed(subsection_grades.values())
+                        course_grades[user.id] = ComputedCourseGrade(
+                            user,
+                            user_course_data,
+                            subsection_grades,
+                            percent=grade_arrays.percents[row].item(),
+                            letter_grade=grade_arrays.letter_grades[row],
+                            passed=grade_arrays.passed[row],
+                        )
+                    except Exception as exc:  # pylint: disable=broad-except
+                        errors[user.id] = exc
+
+        for user in users:
+            if user.id in errors:
+                result = self._grade_error_result(user, course_data, errors[user.id])
+            else:
+                try:
+                    course_grade = course_grades[user.id]
+                    result = self.GradeResult(user, self._save(user, course_grade.course_data, course_grade), None)
+                except Exception as exc:  # pylint: disable=broad-except
+                    result = self._grade_error_result(user, course_data, exc)
+            yield result
+
+    def _grade_error_result(self, user, course_data, exc):
+        """
+        Returns the GradeResult of the given user, who could not be
+        graded because of the given exception.
+        """
+        # Keep marching on even if this student couldn't be graded for
+        # some reason, but log it for future reference.
+        log.exception(
+            'Cannot grade student %s in course %s because of exception: %s',
+            user.id,
+            course_data.course_key,
+            text_type(exc)
+        )
+        return self.GradeResult(user, None, exc)
 
     @staticmethod
     def _create_zero(user, course_data):
@@ -167,19 +291,33 @@ class CourseGradeFactory(object):
         Sends a COURSE_GRADE_CHANGED signal to listeners and a
         COURSE_GRADE_NOW_PASSED if learner has passed course.
         """
-        should_persist = should_persist_grades(course_data.course_key)
+        course_grade = CourseGradeFactory._unsaved_course_grade(user, course_data, force_update_subsections)
+        return CourseGradeFactory._save(user, course_data, course_grade.update())
 
-        if should_persist and force_update_subsections:
+    @staticmethod
+    def _unsaved_course_grade(user, course_data, force_update_subsections=False):
+        """
+        Returns a CourseGrade object for the given user and course,
+        whose values are yet to be computed.
+        """
+        if should_persist_grades(course_data.course_key) and force_update_subsections:
             prefetch(user, course_data.course_key)
 
-        course_grade = CourseGrade(
+        return CourseGrade(
             user,
             course_data,
             force_update_subsections=force_update_subsections
         )
-        course_grade = course_grade.update()
 
-        should_persist = should_persist and course_grade.attempted
+    @staticmethod
+    def _save(user, course_data, course_grade):
+        """
+        Saves and returns the given computed CourseGrade object for the
+        given user and course.
+        Sends a COURSE_GRADE_CHANGED signal to listeners and a
+        COURSE_GRADE_NOW_PASSED if learner has passed course.
+        """
+        should_persist = should_persist_grades(course_data.course_key) and course_grade.attempted
         if should_persist:
             course_grade._subsection_grade_factory.bulk_create_unsaved()
             PersistentCourseGrade.update_or_create(
@@ -0,0 +1,259 @@
+"""
+Vectorized computation of the course grades of many users at once.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy
+
+from xmodule.graders import AggregatedScore, aggregate_score_arrays
+
+from .course_grade import CourseGradeBase
+from .scores import compute_percents, get_score, possibly_scored
+from .subsection_grade import ComputedSubsectionGrade
+
+ScoredSubsection = namedtuple('ScoredSubsection', ['location', 'format', 'graded', 'problem_locations'])
+
+SubsectionTotalArrays = namedtuple(
+    'SubsectionTotalArrays', ['all_earned', 'all_possible', 'graded_earned', 'graded_possible'],
+)
+
+CourseGradeArrays = namedtuple('CourseGradeArrays', ['percents', 'letter_grades', 'passed', 'subsection_totals'])
+
+
+class CourseGradeMatrix(object):
+    """
+    Computes the course grades of many users with array operations on
+    a matrix of their problem scores, with a row per user and a column
+    per scorable problem in the course.
+
+    The results are identical to those computed, one user at a time,
+    by CourseGrade.update from the users' problem scores, and the
+    subsection grades built by subsection_grades are identical to those
+    of CreateSubsectionGrade.  Grades are not persisted and no signals
+    are sent.
+
+    The columns of a matrix are the problems of a single transformed
+    course structure, so only users whose structures have the same
+    scored subsections can be graded together.
+    """
+    def __init__(self, subsections, grader, grade_cutoffs, unattempted_scores=None):
+        """
+        Arguments:
+            subsections ([ScoredSubsection]) - The subsections of the
+                course, in course order.
+            grader (CourseGrader) - The grader of the course.
+            grade_cutoffs (dict) - The letter grade cutoffs of the course.
+            unattempted_scores ({UsageKey: ProblemScore}) - The scores
+                of the problems a user has not attempted, used for the
+                problems missing from a user's scores.
+        """
+        self.subsections = tuple(subsections)
+        self.grader = grader
+        self.grade_cutoffs = grade_cutoffs
+        self.problem_locations = list(OrderedDict(
+            (location, None) for subsection in subsections for location in subsection.problem_locations
+        ))
+        self._problem_columns = {location: column for column, location in enumerate(self.problem_locations)}
+
+        unattempted_scores = [(unattempted_scores or {}).get(location) for location in self.problem_locations]
+        self._unattempted_possible = numpy.array(
+            [score.possible if score else 0.0 for score in unattempted_scores], dtype=float,
+        )
+        self._unattempted_graded = numpy.array(
+            [bool(score and score.graded) for score in unattempted_scores], dtype=bool,
+        )
+
+    @classmethod
+    def from_course_data(cls, course_data):
+        """
+        Returns a CourseGradeMatrix for the grading policy of the course
+        in the given CourseData and for its structure as transformed for
+        its user.
+        """
+        structure = course_data.structure
+        subsections = OrderedDict()
+        for chapter_key in structure.get_children(course_data.location):
+            for subsection_key in structure.get_children(chapter_key):
+                if subsection_key not in subsections:
+                    subsections[subsection_key] = cls._scored_subsection(structure, subsection_key)
+
+        # As in CreateSubsectionGrade, the problems a user has not
+        # attempted are worth the maximum score of their latest content.
+        unattempted_scores = {
+            location: get_score(submissions_scores={}, csm_scores={}, persisted_block=None, block=structure[location])
+            for subsection in subsections.itervalues()
+            for location in subsection.problem_locations
+        }
+
+        course = CourseGradeBase._prep_course_for_grading(course_data.course)  # pylint: disable=protected-access
+        return cls(subsections.values(), course.grader, course.grade_cutoffs, unattempted_scores)
+
+    def score_arrays(self, users_problem_scores):
+        """
+        Returns the weighted earned, weighted possible and graded
+        matrices of the given problem scores, with the unattempted
+        scores of the problems missing from a user's scores.
+
+        Arguments:
+            users_problem_scores ([{UsageKey: ProblemScore}]) - For each
+                user, the user's scores keyed by problem location.
+        """
+        num_users = len(users_problem_scores)
+        earned = numpy.zeros((num_users, len(self.problem_locations)))
+        possible = numpy.tile(self._unattempted_possible, (num_users, 1))
+        graded = numpy.tile(self._unattempted_graded, (num_users, 1))
+        for row, problem_scores in enumerate(users_problem_scores):
+            for location, score in problem_scores.iteritems():
+                column = self._problem_columns.get(location)
+                if column is not None:
+                    earned[row, column] = score.earned
+                    possible[row, column] = score.possible
+                    graded[row, column] = score.graded
+        return earned, possible, graded
+
+    def subsection_totals(self, earned, possible, graded):
+        """
+        Returns the SubsectionTotalArrays of the totals of each
+        subsection, as matrices with a row per user and a column per
+        subsection, from the given score matrices.
+        """
+        shape = (earned.shape[0], len(self.subsections))
+        totals = SubsectionTotalArrays(*[numpy.zeros(shape) for _ in SubsectionTotalArrays._fields])
+        for column, subsection in enumerate(self.subsections):
+            problem_columns = [self._problem_columns[location] for location in subsection.problem_locations]
+            column_totals = aggregate_score_arrays(
+                earned[:, problem_columns], possible[:, problem_columns], graded[:, problem_columns],
+            )
+            for total, column_total in zip(totals, column_totals):
+                total[:, column] = column_total
+        return totals
+
+    def subsection_grades(self, structure, problem_scores, subsection_totals, row):
+        """
+        Returns the ComputedSubsectionGrades of a user, keyed by
+        subsection location, in course order.
+
+        Arguments:
+            structure (BlockStructure) - The user's course structure.
+            problem_scores ({UsageKey: ProblemScore}) - The user's
+                scores keyed by problem location, as returned by
+                SubsectionGradeFactory.problem_scores.
+            subsection_totals (SubsectionTotalArrays) - The subsection
+                totals of the users graded together.
+            row (int) - The user's row in subsection_totals.
+        """
+        subsection_grades = OrderedDict()
+        for column, subsection in enumerate(self.subsections):
+            subsection_problem_scores = OrderedDict(
+                (location, problem_scores[location])
+                for location in subsection.problem_locations
+                if location in problem_scores
+            )
+            all_total = AggregatedScore(
+                float(subsection_totals.all_earned[row, column]),
+                float(subsection_totals.all_possible[row, column]),
+                False,
+                first_attempted=_first_attempted(subsection_problem_scores.itervalues()),
+            )
+            graded_total = AggregatedScore(
+                float(subsection_totals.graded_earned[row, column]),
+                float(subsection_totals.graded_possible[row, column]),
+                True,
+                first_attempted=_first_attempted(
+                    score for score in subsection_problem_scores.itervalues() if score.graded
+                ),
+            )
+            subsection_grades[subsection.location] = ComputedSubsectionGrade(
+                structure[subsection.location], subsection_problem_scores, all_total, graded_total,
+            )
+        return subsection_grades
+
+    def grade(self, users_problem_scores):
+        """
+        Returns the CourseGradeArrays of the users with the given
+        problem scores, in the same order.
+
+        Arguments:
+            users_problem_scores ([{UsageKey: ProblemScore}]) - For each
+                user, the user's scores keyed by problem location.
+        """
+        num_users = len(users_problem_scores)
+        subsection_totals = self.subsection_totals(*self.score_arrays(users_problem_scores))
+        graded_earned, graded_possible = subsection_totals.graded_earned, subsection_totals.graded_possible
+
+        # As in CourseGrade.graded_subsections_by_format, only graded
+        # subsections with possible points are part of a grade sheet.
+        percents_by_format = {}
+        for subsection_format in OrderedDict((subsection.format, None) for subsection in self.subsections):
+            columns = [
+                column for column, subsection in enumerate(self.subsections)
+                if subsection.graded and subsection.format == subsection_format
+            ]
+            percents_by_format[subsection_format] = numpy.where(
+                graded_possible[:, columns] > 0,
+                compute_percents(graded_earned[:, columns], graded_possible[:, columns]),
+                numpy.nan,
+            )
+
+        percents = _round_half_away_from_zero(
+            self.grader.grade_percents(percents_by_format, num_users) * 100 + 0.05
+        ) / 100
+        return CourseGradeArrays(percents, self._letter_grades(percents), self._passed(percents), subsection_totals)
+
+    def _letter_grades(self, percents):
+        """
+        Vectorized counterpart of CourseGrade._compute_letter_grade.
+        """
+        letter_grades = [None] * len(percents)
+        descending_grades = sorted(self.grade_cutoffs, key=lambda x: self.grade_cutoffs[x], reverse=True)
+        for possible_grade in reversed(descending_grades):
+            for row in numpy.flatnonzero(percents >= self.grade_cutoffs[possible_grade]):
+                letter_grades[row] = possible_grade
+        return letter_grades
+
+    def _passed(self, percents):
+        """
+        Vectorized counterpart of CourseGrade._compute_passed.
+        """
+        nonzero_cutoffs = [cutoff for cutoff in self.grade_cutoffs.values() if cutoff > 0]
+        success_cutoff = min(nonzero_cutoffs) if nonzero_cutoffs else None
+        if not success_cutoff:
+            return [success_cutoff] * len(percents)
+        return [bool(passed) for passed in percents >= success_cutoff]
+
+    @staticmethod
+    def _scored_subsection(structure, subsection_key):
+        """
+        Returns the ScoredSubsection for the given subsection in the
+        given block structure.
+        """
+        subsection = structure[subsection_key]
+        return ScoredSubsection(
+            location=subsection_key,
+            format=getattr(subsection, 'format', ''),
+            graded=getattr(subsection, 'graded', False),
+            problem_locations=tuple(
+                block_key
+                for block_key in structure.post_order_traversal(filter_func=possibly_scored, start_node=subsection_key)
+                if getattr(structure[block_key], 'has_score', False)
+            ),
+        )
+
+
+def _first_attempted(problem_scores):
+    """
+    Returns the earliest first attempt of the given problem scores, as
+    aggregate_scores does, or None if none was attempted.
+    """
+    first_attempts = [score.first_attempted for score in problem_scores if score.first_attempted]
+    return min(first_attempts) if first_attempts else None
+
+
+def _round_half_away_from_zero(values):
+    """
+    Vectorized counterpart of the built-in round, which, unlike
+    numpy.around, rounds halfway values away from zero.
+    """
+    magnitudes = numpy.absolute(values)
+    floors = numpy.floor(magnitudes)
+    return numpy.copysign(floors + (magnitudes - floors >= 0.5), values)
@@ -6,23 +6,51 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import hashlib
 import logging
+import time
+from calendar import timegm
+from collections import defaultdict
+from multiprocessing import Pool
 
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from lms.djangoapps.grades.config.models import ComputeGradesSetting
+from lms.djangoapps.grades.models import ComputeGradesChunk
 from openedx.core.lib.command_utils import get_mutually_exclusive_required_option, parse_course_keys
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import clear_existing_modulestores, modulestore
 
 from ... import tasks
 
 log = logging.getLogger(__name__)
 
 
+def _initialize_pool_process():
+    """
+    Initializes a local pool process, so it does not share the
+    modulestore connections of the parent process.
+    """
+    clear_existing_modulestores()
+
+
+def _compute_grades_in_pool_process(kwargs):
+    """
+    Computes the grades of a chunk of learners in a local pool process.
+    Returns a tuple of (course_key, num_users, start_time, end_time).
+    """
+    start_time = time.time()
+    num_users = tasks.compute_grades_for_course(**kwargs)
+    return kwargs['course_key'], num_users, start_time, time.time()
+
+
 class Command(BaseCommand):
     """
     Example usage:
         $ ./manage.py lms compute_grades --all_courses --settings=devstack
         $ ./manage.py lms compute_grades 'edX/DemoX/Demo_Course' --settings=devstack
+
+    To compute grades in 8 local processes, in a run that resumes from its
+    last completed chunks when the same command is repeated:
+        $ ./manage.py lms compute_grades --all_courses --processes=8 --run_name=regrade-1 --settings=devstack
     """
     args = '<course_id course_id ...>'
     help = 'Computes grade values for all learners in specified courses.'
@@ -66,6 +94,23 @@ class Command(BaseCommand):
             default=0,
             type=int,
         )
+        parser.add_argument(
+            '--run_name',
+            help='Name of a resumable run. Completed chunks of learners are recorded under this name, '
+                 'and skipped when the command is repeated with the same name.',
+        )
+        parser.add_argument(
+            '--processes',
+            help='Compute grades in this many local processes, instead of in celery tasks.',
+            default=0,
+            type=int,
+        )
+        parser.add_argument(
+            '--report',
+            help='Report the throughput of the run named by --run_name, instead of computing grades.',
+            action='store_true',
+            default=False,
+        )
         parser.add_argument(
             '--no_estimate_first_attempted',
             help='Use score data to estimate first_attempted timestamp.',
@@ -75,7 +120,66 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self._set_log_level(options)
-        self.enqueue_all_shuffled_tasks(options)
+        if options.get('report'):
+            self.report_run(options['run_name'])
+        elif options.get('processes'):
+            self.compute_all_in_local_processes(options)
+        else:
+            self.enqueue_all_shuffled_tasks(options)
+
+    def compute_all_in_local_processes(self, options):
+        """
+        Compute grades for all chunks of learners, in shuffled order, in a
+        pool of local processes, then report the throughput per course.
+        """
+        all_kwargs = list(self._shuffled_task_kwargs(options))
+        # Connections must not be shared with the forked pool processes.
+        connections.close_all()
+        pool = Pool(processes=options['processes'], initializer=_initialize_pool_process)
+        try:
+            chunk_timings = []
+            for chunk_timing in pool.imap_unordered(_compute_grades_in_pool_process, all_kwargs):
+                chunk_timings.append(chunk_timing)
+                log.info("Grades: Computed chunk {} of {}: {} users in {}".format(
+                    len(chunk_timings), len(all_kwargs), chunk_timing[1], chunk_timing[0],
+                ))
+        finally:
+            pool.terminate()
+            pool.join()
+        self._log_throughput(chunk_timings)
+
+    def report_run(self, run_name):
+        """
+        Report the throughput per course of the chunks completed so far in
+        the given run, whether computed locally or in celery tasks.
+        """
+        self._log_throughput([
+            (
+                chunk.course_id,
+                chunk.num_users,
+                timegm(chunk.modified.utctimetuple()) - chunk.duration_seconds,
+                timegm(chunk.modified.utctimetuple()),
+            )
+            for chunk in ComputeGradesChunk.objects.filter(run_name=run_name)
+        ])
+
+    def _log_throughput(self, chunk_timings):
+        """
+        Logs the number of users and users per second for each course in the
+        given list of (course_key, num_users, start_time, end_time) tuples.
+        The users per second of a course are measured over the time from its
+        first chunk's start to its last chunk's end.
+        """
+        timings_by_course = defaultdict(list)
+        for course_key, num_users, start_time, end_time in chunk_timings:
+            timings_by_course[unicode(course_key)].append((num_users, start_time, end_time))
+
+        for course_key, timings in sorted(timings_by_course.items()):
+            num_users = sum(timing[0] for timing in timings)
+            elapsed = max(timing[2] for timing in timings) - min(timing[1] for timing in timings)
+            log.info("Grades: Course {}: {} users in {:.1f} seconds, {:.2f} users/sec".format(
+                course_key, num_users, elapsed, num_users / elapsed if elapsed else 0.0,
+            ))
 
     def enqueue_all_shuffled_tasks(self, options):
         """
@@ -101,20 +205,32 @@ class Command(BaseCommand):
         """
         all_args = []
         estimate_first_attempted = options['estimate_first_attempted']
+        run_name = options.get('run_name')
+        completed_chunks = ComputeGradesChunk.completed_chunks(run_name) if run_name else set()
+        num_skipped_chunks = 0
         for course_key in self._get_course_keys(options):
             # This is a tuple to reduce memory consumption.
             # The dictionaries with their extra overhead will be created
             # and consumed one at a time.
             for task_arg_tuple in tasks._course_task_args(course_key, **options):
+                # Chunks of the same offset but another batch size are computed again.
+                if task_arg_tuple[:3] in completed_chunks:
+                    num_skipped_chunks += 1
+                    continue
                 all_args.append(task_arg_tuple)
+        if completed_chunks:
+            log.info("Grades: Resuming run {}, skipping {} completed chunks".format(run_name, num_skipped_chunks))
         all_args.sort(key=lambda x: hashlib.md5(b'{!r}'.format(x)))
         for args in all_args:
-            yield {
+            kwargs = {
                 'course_key': args[0],
                 'offset': args[1],
                 'batch_size': args[2],
                 'estimate_first_attempted': estimate_first_attempted,
             }
+            if run_name:
+                kwargs['run_name'] = run_name
+            yield kwargs
 
     def _get_course_keys(self, options):
         """
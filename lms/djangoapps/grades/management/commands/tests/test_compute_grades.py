@@ -10,9 +10,10 @@ import ddt
 import six
 from django.contrib.auth import get_user_model
 from django.core.management import CommandError, call_command
-from mock import ANY, patch
+from mock import ANY, MagicMock, patch
 
 from lms.djangoapps.grades.config.models import ComputeGradesSetting
+from lms.djangoapps.grades.models import ComputeGradesChunk
 from lms.djangoapps.grades.management.commands import compute_grades
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
@@ -152,3 +153,50 @@ class TestComputeGrades(SharedModuleStoreTestCase):
                 },),
             ],
         )
+
+    @patch('lms.djangoapps.grades.tasks.compute_grades_for_course_v2')
+    def test_resume_run(self, mock_task):
+        ComputeGradesChunk.record('regrade', self.courses[0].id, 0, 2, 2, 1.0)
+        call_command('compute_grades', '--run_name=regrade', '--batch_size=2', '--courses', self.course_keys[0])
+        self.assertEqual(
+            _sorted_by_batch(mock_task.apply_async.call_args_list),
+            [
+                ({
+                    'kwargs': {
+                        'course_key': self.course_keys[0],
+                        'batch_size': 2,
+                        'offset': 2,
+                        'estimate_first_attempted': True,
+                        'run_name': 'regrade',
+                        'seq_id': ANY,
+                    },
+                },),
+            ],
+        )
+
+    @patch('lms.djangoapps.grades.tasks.compute_grades_for_course_v2')
+    def test_resume_run_with_other_batch_size(self, mock_task):
+        ComputeGradesChunk.record('regrade', self.courses[0].id, 0, 1, 1, 1.0)
+        ComputeGradesChunk.record('regrade', self.courses[0].id, 2, 1, 1, 1.0)
+        call_command('compute_grades', '--run_name=regrade', '--batch_size=2', '--courses', self.course_keys[0])
+        self.assertEqual(
+            [call[1]['kwargs']['offset'] for call in _sorted_by_batch(mock_task.apply_async.call_args_list)],
+            [0, 2],
+        )
+
+    @patch.object(compute_grades, 'connections')
+    @patch.object(compute_grades, 'Pool')
+    def test_local_processes(self, mock_pool, _mock_connections):
+        # Compute the chunks in this process rather than in forked ones.
+        mock_pool.return_value.imap_unordered = MagicMock(side_effect=lambda func, iterable: map(func, iterable))
+        call_command(
+            'compute_grades', '--processes=2', '--run_name=local', '--batch_size=2', '--courses', self.course_keys[0],
+        )
+        self.assertEqual(
+            ComputeGradesChunk.completed_chunks('local'),
+            {(self.course_keys[0], 0, 2), (self.course_keys[0], 2, 2)},
+        )
+        self.assertEqual(
+            sum(ComputeGradesChunk.objects.filter(run_name='local').values_list('num_users', flat=True)),
+            self.num_users,
+        )
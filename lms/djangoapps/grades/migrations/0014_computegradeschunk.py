@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+from opaque_keys.edx.django.models import CourseKeyField
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0013_persistentsubsectiongradeoverride'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComputeGradesChunk',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, verbose_name='created', editable=False)),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, verbose_name='modified', editable=False)),
+                ('run_name', models.CharField(max_length=255)),
+                ('course_id', CourseKeyField(max_length=255)),
+                ('offset', models.IntegerField()),
+                ('batch_size', models.IntegerField()),
+                ('num_users', models.IntegerField()),
+                ('duration_seconds', models.FloatField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='computegradeschunk',
+            unique_together=set([('run_name', 'course_id', 'offset')]),
+        ),
+    ]
@@ -11,10 +11,10 @@ persisted, course grades are also immune to changes in course content.
 import json
 import logging
 from base64 import b64encode
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from hashlib import sha1
 
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.utils.timezone import now
 from lazy import lazy
 from model_utils.models import TimeStampedModel
@@ -23,8 +23,10 @@ from opaque_keys.edx.keys import CourseKey, UsageKey
 
 from coursewarehistoryextended.fields import UnsignedBigIntAutoField, UnsignedBigIntOneToOneField
 from openedx.core.djangoapps.request_cache import get_cache
+from openedx.core.lib.cache_utils import LRUCache
 
 import events
+from lms.djangoapps.grades.config.waffle import BULK_ENSURE_VISIBLE_BLOCKS, waffle
 
 
 log = logging.getLogger(__name__)
@@ -135,6 +137,11 @@ class VisibleBlocks(models.Model):
 
     _CACHE_NAMESPACE = u"grades.models.VisibleBlocks"
 
+    # Process-wide cache mapping the hashes of visible blocks known to be
+    # stored to their ids.  Since the hashes are content-addressed, the same
+    # ones are shared by many users, and stored records are never changed.
+    _STORED_HASHES = LRUCache(max_size=20000)
+
     class Meta(object):
         app_label = "grades"
 
@@ -221,6 +228,80 @@ class VisibleBlocks(models.Model):
         cls._update_cache(user_id, course_key, created)
         return created
 
+    @classmethod
+    def bulk_ensure(cls, course_key, block_record_lists):
+        """
+        Ensures that VisibleBlocks are stored for all of the given
+        BlockRecordList objects of the given course.
+
+        Hashes already known to this process to be stored cost no
+        queries.  The others are stored with a single insert that
+        ignores existing records, followed by a single select of their
+        ids.  Hashes are only remembered once the current transaction
+        is committed, so a rollback cannot leave stale entries.
+        """
+        unknown_brls = {
+            brl.hash_value: brl for brl in block_record_lists if brl.hash_value not in cls._STORED_HASHES
+        }
+        if not unknown_brls:
+            return
+
+        cls._insert_ignoring_existing(course_key, unknown_brls.values())
+        stored_ids = dict(cls.objects.filter(hashed__in=unknown_brls.keys()).values_list('hashed', 'id'))
+
+        def remember_stored_hashes():
+            for hashed, visible_blocks_id in stored_ids.iteritems():
+                cls._STORED_HASHES.set(hashed, visible_blocks_id)
+        transaction.on_commit(remember_stored_hashes)
+
+    @classmethod
+    def _insert_ignoring_existing(cls, course_key, block_record_lists):
+        """
+        Inserts VisibleBlocks for the given BlockRecordList objects,
+        skipping any whose hash is already stored, in a single query
+        where the database supports it.
+        """
+        insert_statements = {
+            'mysql': u'INSERT IGNORE INTO {table} ({columns}) VALUES {values}',
+            'sqlite': u'INSERT OR IGNORE INTO {table} ({columns}) VALUES {values}',
+            'postgresql': u'INSERT INTO {table} ({columns}) VALUES {values} ON CONFLICT DO NOTHING',
+        }
+        if connection.vendor not in insert_statements:
+            existing_hashes = set(
+                cls.objects.filter(hashed__in=[brl.hash_value for brl in block_record_lists])
+                .values_list('hashed', flat=True)
+            )
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create([
+                        VisibleBlocks(blocks_json=brl.json_value, hashed=brl.hash_value, course_id=course_key)
+                        for brl in block_record_lists
+                        if brl.hash_value not in existing_hashes
+                    ])
+            except IntegrityError:
+                # Another process stored some of them concurrently.
+                for brl in block_record_lists:
+                    cls.objects.get_or_create(
+                        hashed=brl.hash_value,
+                        defaults={u'blocks_json': brl.json_value, u'course_id': course_key},
+                    )
+            return
+
+        columns = ['blocks_json', 'hashed', 'course_id']
+        course_id = cls._meta.get_field('course_id').get_db_prep_value(course_key, connection)
+        params = []
+        for brl in block_record_lists:
+            params.extend([brl.json_value, brl.hash_value, course_id])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                insert_statements[connection.vendor].format(
+                    table=connection.ops.quote_name(cls._meta.db_table),
+                    columns=u', '.join(connection.ops.quote_name(column) for column in columns),
+                    values=u', '.join([u'(%s, %s, %s)'] * len(block_record_lists)),
+                ),
+                params,
+            )
+
     @classmethod
     def bulk_get_or_create(cls, user_id, course_key, block_record_lists):
         """
@@ -244,6 +325,16 @@ class VisibleBlocks(models.Model):
                               #       See `VisibleBlocks.bulk_create` for the related hack.
             course_id=course_key,
         )
+        return cls._initialize_cache_from_grades(user_id, course_key, grades_with_blocks)
+
+    @classmethod
+    def _initialize_cache_from_grades(cls, user_id, course_key, grades_with_blocks):
+        """
+        Stores the visible blocks of the given, already retrieved, subsection
+        grades of the given user and course in the cache.
+        Returns a dictionary mapping hashes of these block records to the
+        block record objects.
+        """
         prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades_with_blocks}
         get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = prefetched
         return prefetched
@@ -319,6 +410,8 @@ class PersistentSubsectionGrade(TimeStampedModel):
     visible_blocks = models.ForeignKey(VisibleBlocks, db_column='visible_blocks_hash', to_field='hashed',
                                        on_delete=models.CASCADE)
 
+    _CACHE_NAMESPACE = u"grades.models.PersistentSubsectionGrade"
+
     @property
     def full_usage_key(self):
         """
@@ -374,18 +467,61 @@ class PersistentSubsectionGrade(TimeStampedModel):
             user_id: The user associated with the desired grades
             course_key: The course identifier for the desired grades
         """
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_key), {})
+        if user_id in prefetched_grades:
+            return prefetched_grades[user_id]
+
         return cls.objects.select_related('visible_blocks', 'override').filter(
             user_id=user_id,
             course_id=course_key,
         )
 
+    @classmethod
+    def prefetch(cls, course_key, users):
+        """
+        Prefetches all grades for the given users in the given course,
+        along with their visible blocks and overrides, in a single query.
+        """
+        grades_by_user = defaultdict(list)
+        for grade in cls.objects.select_related('visible_blocks', 'override').filter(
+                user_id__in=[user.id for user in users],
+                course_id=course_key,
+        ):
+            grades_by_user[grade.user_id].append(grade)
+
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).setdefault(cls._cache_key(course_key), {})
+        for user in users:
+            user_grades = grades_by_user[user.id]
+            prefetched_grades[user.id] = user_grades
+            # pylint: disable=protected-access
+            VisibleBlocks._initialize_cache_from_grades(user.id, course_key, user_grades)
+            PersistentSubsectionGradeOverride._initialize_cache_from_grades(user.id, course_key, user_grades)
+
+    @classmethod
+    def clear_prefetched(cls, course_key, users):
+        """
+        Clears the grades, visible blocks and overrides that were
+        prefetched for the given users in the given course.
+        """
+        # pylint: disable=protected-access
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_key), {})
+        for user in users:
+            prefetched_grades.pop(user.id, None)
+            get_cache(VisibleBlocks._CACHE_NAMESPACE).pop(VisibleBlocks._cache_key(user.id, course_key), None)
+            get_cache(PersistentSubsectionGradeOverride._CACHE_NAMESPACE).pop(
+                PersistentSubsectionGradeOverride._cache_key(user.id, course_key), None
+            )
+
     @classmethod
     def update_or_create_grade(cls, **params):
         """
         Wrapper for objects.update_or_create.
         """
         cls._prepare_params(params)
-        VisibleBlocks.cached_get_or_create(params['user_id'], params['visible_blocks'])
+        if waffle().is_enabled(BULK_ENSURE_VISIBLE_BLOCKS):
+            VisibleBlocks.bulk_ensure(params['course_id'], [params['visible_blocks']])
+        else:
+            VisibleBlocks.cached_get_or_create(params['user_id'], params['visible_blocks'])
         cls._prepare_params_visible_blocks_id(params)
         cls._prepare_params_override(params)
 
@@ -418,9 +554,11 @@ class PersistentSubsectionGrade(TimeStampedModel):
         PersistentSubsectionGradeOverride.prefetch(user_id, course_key)
 
         map(cls._prepare_params, grade_params_iter)
-        VisibleBlocks.bulk_get_or_create(
-            user_id, course_key, [params['visible_blocks'] for params in grade_params_iter]
-        )
+        block_record_lists = [params['visible_blocks'] for params in grade_params_iter]
+        if waffle().is_enabled(BULK_ENSURE_VISIBLE_BLOCKS):
+            VisibleBlocks.bulk_ensure(course_key, block_record_lists)
+        else:
+            VisibleBlocks.bulk_get_or_create(user_id, course_key, block_record_lists)
         map(cls._prepare_params_visible_blocks_id, grade_params_iter)
         map(cls._prepare_params_override, grade_params_iter)
 
@@ -466,6 +604,10 @@ class PersistentSubsectionGrade(TimeStampedModel):
             if override.possible_graded_override is not None:
                 params['possible_graded'] = override.possible_graded_override
 
+    @classmethod
+    def _cache_key(cls, course_key):
+        return u"subsection_grades_cache.{}".format(course_key)
+
     @staticmethod
     def _emit_grade_calculated_event(grade):
         events.subsection_grade_calculated(grade)
@@ -528,13 +670,35 @@ class PersistentCourseGrade(TimeStampedModel):
     @classmethod
     def prefetch(cls, course_id, users):
         """
-        Prefetches grades for the given users for the given course.
+        Prefetches grades for the given users for the given course, keeping
+        those already prefetched for other users.
         """
-        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(course_id)] = {
+        grades = {
             grade.user_id: grade
             for grade in
             cls.objects.filter(user_id__in=[user.id for user in users], course_id=course_id)
         }
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).setdefault(cls._cache_key(course_id), {})
+        for user in users:
+            # None records that the user has no grade.
+            prefetched_grades[user.id] = grades.get(user.id)
+
+    @classmethod
+    def is_prefetched(cls, course_id, user_id):
+        """
+        Returns whether the grade of the given user in the given course
+        was prefetched.
+        """
+        return user_id in get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_id), {})
+
+    @classmethod
+    def clear_prefetched(cls, course_id, users):
+        """
+        Clears the grades prefetched for the given users in the given course.
+        """
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_id), {})
+        for user in users:
+            prefetched_grades.pop(user.id, None)
 
     @classmethod
     def read(cls, user_id, course_id):
@@ -547,17 +711,14 @@ class PersistentCourseGrade(TimeStampedModel):
 
         Raises PersistentCourseGrade.DoesNotExist if applicable
         """
-        try:
-            prefetched_grades = get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(course_id)]
-            try:
-                return prefetched_grades[user_id]
-            except KeyError:
-                # user's grade is not in the prefetched list, so
-                # assume they have no grade
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_id), {})
+        if user_id in prefetched_grades:
+            if prefetched_grades[user_id] is None:
+                # the user's grade was prefetched, and they have no grade
                 raise cls.DoesNotExist
-        except KeyError:
-            # grades were not prefetched for the course, so fetch it
-            return cls.objects.get(user_id=user_id, course_id=course_id)
+            return prefetched_grades[user_id]
+        # the user's grade was not prefetched, so fetch it
+        return cls.objects.get(user_id=user_id, course_id=course_id)
 
     @classmethod
     def update_or_create(cls, user_id, course_id, **kwargs):
@@ -622,15 +783,31 @@ class PersistentSubsectionGradeOverride(models.Model):
 
     @classmethod
     def prefetch(cls, user_id, course_key):
-        get_cache(cls._CACHE_NAMESPACE)[(user_id, str(course_key))] = {
+        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = {
             override.grade.usage_key: override
             for override in
             cls.objects.filter(grade__user_id=user_id, grade__course_id=course_key)
         }
 
+    @classmethod
+    def _initialize_cache_from_grades(cls, user_id, course_key, grades_with_overrides):
+        """
+        Stores the overrides of the given, already retrieved, subsection
+        grades of the given user and course in the cache.
+        """
+        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = {
+            grade.usage_key: grade.override
+            for grade in grades_with_overrides
+            if hasattr(grade, 'override')
+        }
+
+    @classmethod
+    def _cache_key(cls, user_id, course_key):
+        return (user_id, str(course_key))
+
     @classmethod
     def get_override(cls, user_id, usage_key):
-        prefetch_values = get_cache(cls._CACHE_NAMESPACE).get((user_id, str(usage_key.course_key)), None)
+        prefetch_values = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(user_id, usage_key.course_key), None)
         if prefetch_values is not None:
             return prefetch_values.get(usage_key)
         try:
@@ -643,6 +820,96 @@ class PersistentSubsectionGradeOverride(models.Model):
             pass
 
 
+class ComputeGradesChunk(TimeStampedModel):
+    """
+    A django model recording each chunk of learners whose grades were
+    computed in a named run of the compute_grades management command,
+    so that an interrupted run can be resumed from its last completed
+    chunk and its throughput can be reported.
+    """
+    class Meta(object):
+        app_label = "grades"
+        unique_together = [
+            ('run_name', 'course_id', 'offset'),
+        ]
+
+    run_name = models.CharField(max_length=255)
+    course_id = CourseKeyField(blank=False, max_length=255)
+    offset = models.IntegerField()
+    batch_size = models.IntegerField()
+
+    # Number of learners whose grades were computed in this chunk.
+    num_users = models.IntegerField()
+
+    # Time taken to compute the grades of this chunk.
+    duration_seconds = models.FloatField()
+
+    def __unicode__(self):
+        """
+        Returns a string representation of this model.
+        """
+        return u"ComputeGradesChunk: run {}, course {}, offset {}, users {}, seconds {}".format(
+            self.run_name, self.course_id, self.offset, self.num_users, self.duration_seconds,
+        )
+
+    @classmethod
+    def record(cls, run_name, course_id, offset, batch_size, num_users, duration_seconds):
+        """
+        Records the completion of the given chunk of the given run.
+        """
+        chunk, _ = cls.objects.update_or_create(
+            run_name=run_name,
+            course_id=course_id,
+            offset=offset,
+            defaults=dict(batch_size=batch_size, num_users=num_users, duration_seconds=duration_seconds),
+        )
+        return chunk
+
+    @classmethod
+    def completed_chunks(cls, run_name):
+        """
+        Returns the set of (unicode course_id, offset, batch_size) tuples
+        of the completed chunks of the given run.  A chunk only matches a
+        resumed run's chunk of the same batch size, as one of another size
+        covers other learners.
+        """
+        return {
+            (unicode(course_id), offset, batch_size)
+            for course_id, offset, batch_size in cls.objects.filter(
+                run_name=run_name,
+            ).values_list('course_id', 'offset', 'batch_size')
+        }
+
+
 def prefetch(user, course_key):
     PersistentSubsectionGradeOverride.prefetch(user.id, course_key)
     VisibleBlocks.bulk_read(user.id, course_key)
+
+
+def bulk_prefetch(users, course_key):
+    """
+    Prefetches the persisted subsection grades, with their visible blocks
+    and overrides, and the persisted course grades of the given users in
+    the given course, with a single query per model.
+
+    The course grades that were already prefetched, such as by the grade
+    report, are kept.  Returns the users whose course grades were
+    prefetched, to be passed to clear_bulk_prefetch.
+    """
+    PersistentSubsectionGrade.prefetch(course_key, users)
+    course_grade_users = [
+        user for user in users if not PersistentCourseGrade.is_prefetched(course_key, user.id)
+    ]
+    if course_grade_users:
+        PersistentCourseGrade.prefetch(course_key, course_grade_users)
+    return course_grade_users
+
+
+def clear_bulk_prefetch(users, course_key, course_grade_users):
+    """
+    Clears the grades prefetched by bulk_prefetch for the given users in
+    the given course, and the course grades of the course_grade_users it
+    returned.
+    """
+    PersistentSubsectionGrade.clear_prefetched(course_key, users)
+    PersistentCourseGrade.clear_prefetched(course_key, course_grade_users)
@@ -0,0 +1,83 @@
+"""
+Shared store of the subsection grade updates that are pending for a
+user in a course, used to coalesce a burst of score changes into a
+single grade recalculation.
+
+Each score change is appended to the store under an increasing sequence
+number, and only the first change since the last recalculation schedules
+a task.  When the task runs, it claims all the changes appended so far.
+Should any claimed change be missing from the cache, for example after
+an eviction, the task knows to recalculate all of the user's grades,
+once the scores of the changes still available are saved.
+"""
+from django.core.cache import cache
+
+# Long enough to outlive the pending task and its retries.
+PENDING_UPDATES_TIMEOUT_SECONDS = 60 * 60
+
+# After this long, a scheduled task is presumed lost and the next
+# update schedules another one.
+SCHEDULED_TASK_TIMEOUT_SECONDS = 5 * 60
+
+
+class PendingSubsectionUpdates(object):
+    """
+    The pending subsection grade updates of a user in a course.
+    """
+    def __init__(self, user_id, course_id):
+        self._key_prefix = u'grades.pending_updates.{}.{}'.format(user_id, course_id)
+
+    def append(self, update_kwargs):
+        """
+        Appends the given keyword arguments of a recalculate subsection
+        grade task to the pending updates.  Returns whether a task needs
+        to be scheduled to process them, which is True for the first
+        update appended since the last call to claim.
+        """
+        if cache.add(self._sequence_key, 0, PENDING_UPDATES_TIMEOUT_SECONDS):
+            # The sequence is new or was evicted, so anything processed
+            # under an earlier sequence no longer applies.
+            cache.delete(self._claimed_key)
+        sequence_number = cache.incr(self._sequence_key)
+        cache.set(self._update_key(sequence_number), update_kwargs, PENDING_UPDATES_TIMEOUT_SECONDS)
+        return cache.add(self._scheduled_key, True, SCHEDULED_TASK_TIMEOUT_SECONDS)
+
+    def claim(self):
+        """
+        Claims the pending updates, and returns an (updates, complete)
+        tuple, where updates is the list of those still available, in the
+        order they were appended, and complete is whether none is missing.
+
+        The scheduled task marker is cleared before reading the sequence,
+        so any update appended after this call schedules a new task.
+        """
+        cache.delete(self._scheduled_key)
+        last_sequence_number = cache.get(self._sequence_key)
+        if last_sequence_number is None:
+            return [], False
+        first_sequence_number = cache.get(self._claimed_key, 0) + 1
+        cache.set(self._claimed_key, last_sequence_number, PENDING_UPDATES_TIMEOUT_SECONDS)
+
+        update_keys = [
+            self._update_key(sequence_number)
+            for sequence_number in range(first_sequence_number, last_sequence_number + 1)
+        ]
+        updates = cache.get_many(update_keys)
+        cache.delete_many(update_keys)
+        available_updates = [updates[update_key] for update_key in update_keys if update_key in updates]
+        return available_updates, len(available_updates) == len(update_keys)
+
+    @property
+    def _sequence_key(self):
+        return self._key_prefix + u'.sequence'
+
+    @property
+    def _claimed_key(self):
+        return self._key_prefix + u'.claimed'
+
+    @property
+    def _scheduled_key(self):
+        return self._key_prefix + u'.scheduled'
+
+    def _update_key(self, sequence_number):
+        return u'{}.{}'.format(self._key_prefix, sequence_number)
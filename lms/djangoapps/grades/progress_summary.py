@@ -0,0 +1,187 @@
+"""
+Read-through cache of the grade summaries rendered on the progress page.
+
+Building a CourseGrade for the progress page reads all of the user's
+stored subsection grades and their visible blocks.  The values the
+page renders are instead serialized into a ProgressSummary and cached
+per user and course, along with the version of the course structure
+and the modification time of the user's stored course grade.  A cached
+summary is only used while both are unchanged, and is also discarded
+when the grade-changed signals are received for the user.
+
+Grades that are not stored, such as those of courses in which grades
+are not persisted, are never cached.
+"""
+from collections import OrderedDict, namedtuple
+
+from ccx_keys.locator import CCXLocator
+from django.core.cache import cache
+
+from xmodule.graders import ShowCorrectness
+
+from .config import should_persist_grades
+from .course_grade_factory import CourseGradeFactory
+from .models import PersistentCourseGrade
+from .scores import compute_percent
+
+# Bounds how long changes that affect neither the course structure
+# nor the stored grade, such as due date extensions, go unnoticed.
+PROGRESS_SUMMARY_TIMEOUT_SECONDS = 60 * 60
+
+# Incremented whenever the format of the serialized summaries changes.
+_SERIALIZATION_VERSION = 1
+
+Total = namedtuple('Total', ['earned', 'possible'])
+
+
+class SubsectionGradeSummary(object):
+    """
+    The values of a SubsectionGrade that are rendered on the progress page.
+    """
+    def __init__(self, values):
+        self.display_name = values['display_name']
+        self.url_name = values['url_name']
+        self.format = values['format']
+        self.due = values['due']
+        self.graded = values['graded']
+        self.show_correctness = values['show_correctness']
+        self.all_total = Total(*values['all_total'])
+        self.graded_total = Total(*values['graded_total'])
+        self.problem_scores = OrderedDict(
+            (index, Total(*score)) for index, score in enumerate(values['problem_scores'])
+        )
+        self.override = True if values['overridden'] else None
+
+    @property
+    def percent_graded(self):
+        return compute_percent(self.graded_total.earned, self.graded_total.possible)
+
+    def show_grades(self, has_staff_access):
+        """
+        Returns whether subsection scores are currently available to users with or without staff access.
+        """
+        return ShowCorrectness.correctness_available(self.show_correctness, self.due, has_staff_access)
+
+    @staticmethod
+    def serialize(subsection_grade):
+        """
+        Returns the values of the given SubsectionGrade that are
+        rendered on the progress page, as a dict of plain values.
+        """
+        return {
+            'display_name': subsection_grade.display_name,
+            'url_name': subsection_grade.url_name,
+            'format': subsection_grade.format,
+            'due': subsection_grade.due,
+            'graded': subsection_grade.graded,
+            'show_correctness': subsection_grade.show_correctness,
+            'all_total': (subsection_grade.all_total.earned, subsection_grade.all_total.possible),
+            'graded_total': (subsection_grade.graded_total.earned, subsection_grade.graded_total.possible),
+            'problem_scores': [
+                (score.earned, score.possible) for score in subsection_grade.problem_scores.itervalues()
+            ],
+            'overridden': subsection_grade.override is not None,
+        }
+
+
+class ProgressSummary(object):
+    """
+    The values of a CourseGrade that are rendered on the progress page,
+    with the same attribute names as those of the CourseGrade.
+    """
+    def __init__(self, values):
+        self.percent = values['percent']
+        self.letter_grade = values['letter_grade']
+        self.passed = values['passed']
+        self.summary = values['summary']
+        self.chapter_grades = OrderedDict(
+            (
+                index,
+                {
+                    'display_name': chapter['display_name'],
+                    'url_name': chapter['url_name'],
+                    'sections': [SubsectionGradeSummary(section) for section in chapter['sections']],
+                },
+            )
+            for index, chapter in enumerate(values['chapters'])
+        )
+
+    def __unicode__(self):
+        return u'Progress Summary: percent: {}, letter_grade: {}, passed: {}'.format(
+            unicode(self.percent),
+            self.letter_grade,
+            self.passed,
+        )
+
+    @staticmethod
+    def serialize(course_grade):
+        """
+        Returns the values of the given CourseGrade that are rendered
+        on the progress page, as a dict of plain values.
+        """
+        return {
+            'percent': course_grade.percent,
+            'letter_grade': course_grade.letter_grade,
+            'passed': course_grade.passed,
+            'summary': course_grade.summary,
+            'chapters': [
+                {
+                    'display_name': chapter['display_name'],
+                    'url_name': chapter['url_name'],
+                    'sections': [SubsectionGradeSummary.serialize(section) for section in chapter['sections']],
+                }
+                for chapter in course_grade.chapter_grades.itervalues()
+            ],
+        }
+
+
+def read_progress_summary(user, course):
+    """
+    Returns the ProgressSummary of the given user in the given course,
+    from the cache if it is still current, or else from the user's
+    CourseGrade, as read by the CourseGradeFactory.
+    """
+    cache_key = _cache_key(user.id, course.id)
+    version = _cache_version(user, course)
+    if version is not None:
+        cached = cache.get(cache_key)
+        if cached is not None and cached['version'] == version:
+            return ProgressSummary(cached['values'])
+
+    values = ProgressSummary.serialize(CourseGradeFactory().read(user, course))
+    if version is not None:
+        cache.set(cache_key, {'version': version, 'values': values}, PROGRESS_SUMMARY_TIMEOUT_SECONDS)
+    return ProgressSummary(values)
+
+
+def invalidate_progress_summary(user_id, course_key):
+    """
+    Discards the cached ProgressSummary of the given user in the given course.
+    """
+    cache.delete(_cache_key(user_id, course_key))
+
+
+def _cache_version(user, course):
+    """
+    Returns the values with which a cached summary must have been
+    computed to still be current, or None if the summary of the given
+    user in the given course is not to be cached.
+    """
+    if isinstance(course.id, CCXLocator) or not should_persist_grades(course.id):
+        return None
+
+    # The course version is not set in Old Mongo, where the subtree
+    # edit time is instead readily available.
+    structure_version = course.course_version or course.subtree_edited_on
+    if structure_version is None:
+        return None
+
+    try:
+        grade_modified = PersistentCourseGrade.read(user.id, course.id).modified
+    except PersistentCourseGrade.DoesNotExist:
+        return None
+    return _SERIALIZATION_VERSION, unicode(structure_version), grade_modified
+
+
+def _cache_key(user_id, course_key):
+    return u'grades.progress_summary.{}.{}'.format(user_id, course_key)
@@ -7,7 +7,7 @@ from xblock.core import XBlock
 
 from openedx.core.lib.cache_utils import memoized
 from xmodule.graders import ProblemScore
-from numpy import around
+from numpy import around, where
 
 from .transformer import GradesTransformer
 
@@ -155,6 +155,15 @@ def compute_percent(earned, possible):
         return 0.0
 
 
+def compute_percents(earned, possible):
+    """
+    Vectorized counterpart of compute_percent, for arrays of earned
+    and possible values.
+    """
+    is_possible = possible > 0
+    return where(is_possible, around(earned / where(is_possible, possible, 1), decimals=2), 0.0)
+
+
 def _get_score_from_submissions(submissions_scores, block):
     """
     Returns the score values from the submissions API if found.
@@ -11,6 +11,7 @@ from submissions.models import score_reset, score_set
 from xblock.scorable import ScorableXBlockMixin, Score
 
 from openedx.core.djangoapps.course_groups.signals.signals import COHORT_MEMBERSHIP_UPDATED
+from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import user_by_anonymous_id
 from student.signals import ENROLLMENT_TRACK_UPDATED
@@ -24,11 +25,14 @@ from .signals import (
     SUBSECTION_OVERRIDE_CHANGED,
 )
 from .. import events
+from ..config.waffle import CACHE_PROGRESS_SUMMARIES, COALESCE_SUBSECTION_GRADE_UPDATES, waffle
 from ..constants import ScoreDatabaseTableEnum
 from ..course_grade_factory import CourseGradeFactory
+from ..progress_summary import invalidate_progress_summary
 from ..scores import weighted_score
 from ..tasks import (
     RECALCULATE_GRADE_DELAY_SECONDS,
+    enqueue_coalesced_subsection_grade_update,
     recalculate_subsection_grade_v3,
     recalculate_course_and_subsection_grades_for_user
 )
@@ -213,21 +217,44 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
     enqueueing a subsection update operation to occur asynchronously.
     """
     events.grade_updated(**kwargs)
-    recalculate_subsection_grade_v3.apply_async(
-        kwargs=dict(
-            user_id=kwargs['user_id'],
-            anonymous_user_id=kwargs.get('anonymous_user_id'),
-            course_id=kwargs['course_id'],
-            usage_id=kwargs['usage_id'],
-            only_if_higher=kwargs.get('only_if_higher'),
-            expected_modified_time=to_timestamp(kwargs['modified']),
-            score_deleted=kwargs.get('score_deleted', False),
-            event_transaction_id=unicode(get_event_transaction_id()),
-            event_transaction_type=unicode(get_event_transaction_type()),
-            score_db_table=kwargs['score_db_table'],
-        ),
-        countdown=RECALCULATE_GRADE_DELAY_SECONDS,
+    task_kwargs = dict(
+        user_id=kwargs['user_id'],
+        anonymous_user_id=kwargs.get('anonymous_user_id'),
+        course_id=kwargs['course_id'],
+        usage_id=kwargs['usage_id'],
+        only_if_higher=kwargs.get('only_if_higher'),
+        expected_modified_time=to_timestamp(kwargs['modified']),
+        score_deleted=kwargs.get('score_deleted', False),
+        event_transaction_id=unicode(get_event_transaction_id()),
+        event_transaction_type=unicode(get_event_transaction_type()),
+        score_db_table=kwargs['score_db_table'],
     )
+    if waffle().is_enabled(COALESCE_SUBSECTION_GRADE_UPDATES):
+        enqueue_coalesced_subsection_grade_update(**task_kwargs)
+    else:
+        recalculate_subsection_grade_v3.apply_async(
+            kwargs=task_kwargs,
+            countdown=RECALCULATE_GRADE_DELAY_SECONDS,
+        )
+
+
+@receiver(PROBLEM_WEIGHTED_SCORE_CHANGED)
+@receiver(SUBSECTION_OVERRIDE_CHANGED)
+def invalidate_progress_summary_for_score(sender, user_id, course_id, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the cached progress summary of the user whose score changed.
+    """
+    if waffle().is_enabled(CACHE_PROGRESS_SUMMARIES):
+        invalidate_progress_summary(user_id, course_id)
+
+
+@receiver(COURSE_GRADE_CHANGED)
+def invalidate_progress_summary_for_grade(sender, user, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discards the cached progress summary of the user whose course grade changed.
+    """
+    if waffle().is_enabled(CACHE_PROGRESS_SUMMARIES):
+        invalidate_progress_summary(user.id, course_key)
 
 
 @receiver(SUBSECTION_SCORE_CHANGED)
@@ -234,7 +234,7 @@ class CreateSubsectionGrade(NonZeroSubsectionGrade):
             return PersistentSubsectionGrade.update_or_create_grade(**self._persisted_model_params(student))
 
     @classmethod
-    def bulk_create_models(cls, student, subsection_grades, course_key):
+    def bulk_create_models(cls, student, subsection_grades, course_key, force_update_subsections=False):
         """
         Saves the subsection grade in a persisted model.
         """
@@ -242,7 +242,8 @@ class CreateSubsectionGrade(NonZeroSubsectionGrade):
             subsection_grade._persisted_model_params(student)  # pylint: disable=protected-access
             for subsection_grade in subsection_grades
             if subsection_grade
-            if subsection_grade._should_persist_per_attempted()  # pylint: disable=protected-access
+            # pylint: disable=protected-access
+            if subsection_grade._should_persist_per_attempted(force_update_subsections=force_update_subsections)
         ]
         return PersistentSubsectionGrade.bulk_create_grades(params, student.id, course_key)
 
@@ -293,3 +294,15 @@ class CreateSubsectionGrade(NonZeroSubsectionGrade):
             for location, score in
             self.problem_scores.iteritems()
         ]
+
+
+class ComputedSubsectionGrade(CreateSubsectionGrade):
+    """
+    Class for Subsection grades that are newly created or updated, and
+    whose totals were computed with those of other users by a
+    CourseGradeMatrix.
+    """
+    def __init__(self, subsection, problem_scores, all_total, graded_total):  # pylint: disable=super-init-not-called
+        self.problem_scores = problem_scores
+        # The totals are given, so they are not aggregated by CreateSubsectionGrade.
+        super(CreateSubsectionGrade, self).__init__(subsection, all_total, graded_total)
@@ -6,11 +6,12 @@ from lazy import lazy
 from courseware.model_data import ScoresClient
 from lms.djangoapps.grades.config import assume_zero_if_absent, should_persist_grades
 from lms.djangoapps.grades.models import PersistentSubsectionGrade
-from lms.djangoapps.grades.scores import possibly_scored
+from lms.djangoapps.grades.scores import get_score, possibly_scored
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
 from student.models import anonymous_id_for_user
 from submissions import api as submissions_api
 
+from . import bulk_scores
 from .course_data import CourseData
 from .subsection_grade import CreateSubsectionGrade, ReadSubsectionGrade, ZeroSubsectionGrade
 
@@ -98,12 +99,51 @@ class SubsectionGradeFactory(object):
 
         return calculated_grade
 
+    def problem_scores(self, problem_locations):
+        """
+        Returns the student's scores of the given problems, keyed by
+        location, as computed for a CreateSubsectionGrade.
+        """
+        problem_scores = OrderedDict()
+        for location in problem_locations:
+            problem_score = get_score(
+                self._submissions_scores, self._csm_scores, None, self.course_data.structure[location],
+            )
+            if problem_score:
+                problem_scores[location] = problem_score
+        return problem_scores
+
+    def save_computed(self, subsection_grades):
+        """
+        Saves the given ComputedSubsectionGrades, as update does with
+        force_update_subsections, but creating in bulk those that were
+        not persisted yet.
+        """
+        if not should_persist_grades(self.course_data.course_key):
+            return
+
+        saved_subsection_grades = self._get_bulk_cached_subsection_grades()
+        new_subsection_grades = []
+        for subsection_grade in subsection_grades:
+            if subsection_grade.location in saved_subsection_grades:
+                grade_model = subsection_grade.update_or_create_model(self.student, force_update_subsections=True)
+                self._update_saved_subsection_grade(subsection_grade.location, grade_model)
+            else:
+                new_subsection_grades.append(subsection_grade)
+        CreateSubsectionGrade.bulk_create_models(
+            self.student, new_subsection_grades, self.course_data.course_key, force_update_subsections=True,
+        )
+
     @lazy
     def _csm_scores(self):
         """
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        prefetched_scores = bulk_scores.get_prefetched_csm_scores(self.student.id, self.course_data.course_key)
+        if prefetched_scores is not None:
+            return prefetched_scores
+
         scorable_locations = [block_key for block_key in self.course_data.structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course_data.course_key, self.student.id, scorable_locations)
 
@@ -113,6 +153,12 @@ class SubsectionGradeFactory(object):
         Lazily queries and returns the scores stored by the
         Submissions API for the course, while caching the result.
         """
+        prefetched_scores = bulk_scores.get_prefetched_submissions_scores(
+            self.student.id, self.course_data.course_key,
+        )
+        if prefetched_scores is not None:
+            return prefetched_scores
+
         anonymous_user_id = anonymous_id_for_user(self.student, self.course_data.course_key)
         return submissions_api.get_scores(str(self.course_data.course_key), anonymous_user_id)
 
@@ -2,7 +2,9 @@
 This module contains tasks for asynchronous execution of grade updates.
 """
 
+from collections import OrderedDict
 from logging import getLogger
+from time import time
 
 import six
 from celery import task
@@ -27,6 +29,8 @@ from .config.waffle import DISABLE_REGRADE_ON_POLICY_CHANGE, waffle
 from .constants import ScoreDatabaseTableEnum
 from .course_grade_factory import CourseGradeFactory
 from .exceptions import DatabaseNotReadyError
+from .models import ComputeGradesChunk
+from .pending_updates import PendingSubsectionUpdates
 from .services import GradesService
 from .signals.signals import SUBSECTION_SCORE_CHANGED
 from .subsection_grade_factory import SubsectionGradeFactory
@@ -41,6 +45,7 @@ KNOWN_RETRY_ERRORS = (  # Errors we expect occasionally, should be resolved on r
     DatabaseNotReadyError,
 )
 RECALCULATE_GRADE_DELAY_SECONDS = 2  # to prevent excessive _has_db_updated failures. See TNL-6424.
+COALESCED_RECALCULATE_GRADE_DELAY_SECONDS = 10  # window in which score changes share a recalculation
 RETRY_DELAY_SECONDS = 40
 SUBSECTION_GRADE_TIMEOUT_SECONDS = 300
 
@@ -93,26 +98,40 @@ def compute_grades_for_course_v2(self, **kwargs):
         set_event_transaction_type(kwargs['event_transaction_type'])
 
     try:
-        return compute_grades_for_course(kwargs['course_key'], kwargs['offset'], kwargs['batch_size'])
+        return compute_grades_for_course(
+            kwargs['course_key'], kwargs['offset'], kwargs['batch_size'], run_name=kwargs.get('run_name'),
+        )
     except Exception as exc:
         raise self.retry(kwargs=kwargs, exc=exc)
 
 
 @task(base=LoggedPersistOnFailureTask)
-def compute_grades_for_course(course_key, offset, batch_size, **kwargs):  # pylint: disable=unused-argument
+def compute_grades_for_course(course_key, offset, batch_size, **kwargs):
     """
     Compute and save grades for a set of students in the specified course.
 
     The set of students will be determined by the order of enrollment date, and
     limited to at most <batch_size> students, starting from the specified
     offset.
+
+    If a run_name keyword argument is given, the completion of this chunk
+    of students is recorded as part of that run.
+
+    Returns the number of students whose grades were computed.
     """
+    start_time = time()
     course_key = CourseKey.from_string(course_key)
     enrollments = CourseEnrollment.objects.filter(course_id=course_key).order_by('created')
     student_iter = (enrollment.user for enrollment in enrollments[offset:offset + batch_size])
+    num_users = 0
     for result in CourseGradeFactory().iter(users=student_iter, course_key=course_key, force_update=True):
         if result.error is not None:
             raise result.error
+        num_users += 1
+
+    if kwargs.get('run_name'):
+        ComputeGradesChunk.record(kwargs['run_name'], course_key, offset, batch_size, num_users, time() - start_time)
+    return num_users
 
 
 @task(
@@ -227,6 +246,121 @@ def _recalculate_subsection_grade(self, **kwargs):
         raise self.retry(kwargs=kwargs, exc=exc)
 
 
+def enqueue_coalesced_subsection_grade_update(**kwargs):
+    """
+    Appends the given recalculate_subsection_grade_v3 keyword arguments
+    to the pending subsection grade updates of the user in the course,
+    and schedules a recalculate_coalesced_subsection_grades task to
+    process them, unless one is already scheduled.
+    """
+    try:
+        needs_task = PendingSubsectionUpdates(kwargs['user_id'], kwargs['course_id']).append(kwargs)
+    except ValueError:
+        # The configured cache does not keep counters, so updates cannot be coalesced.
+        recalculate_subsection_grade_v3.apply_async(kwargs=kwargs, countdown=RECALCULATE_GRADE_DELAY_SECONDS)
+        return
+
+    if needs_task:
+        recalculate_coalesced_subsection_grades.apply_async(
+            kwargs=dict(user_id=kwargs['user_id'], course_id=kwargs['course_id']),
+            countdown=COALESCED_RECALCULATE_GRADE_DELAY_SECONDS,
+        )
+
+
+@task(
+    bind=True,
+    base=LoggedPersistOnFailureTask,
+    time_limit=SUBSECTION_GRADE_TIMEOUT_SECONDS,
+    max_retries=2,
+    default_retry_delay=RETRY_DELAY_SECONDS,
+    routing_key=settings.RECALCULATE_GRADES_ROUTING_KEY
+)
+def recalculate_coalesced_subsection_grades(self, **kwargs):
+    """
+    Updates the subsection grades of a user in a course for all the
+    score changes that were appended to the user's pending updates by
+    enqueue_coalesced_subsection_grade_update since the last run.
+
+    Keyword Arguments:
+        user_id (int): id of applicable User object
+        course_id (string): identifying the course
+        pending_updates (list, OPTIONAL): the claimed pending updates,
+            given when the task is retried.
+        updates_complete (bool, OPTIONAL): whether none of the claimed
+            pending updates was missing, given when the task is retried.
+    """
+    try:
+        if 'pending_updates' not in kwargs:
+            user_updates = PendingSubsectionUpdates(kwargs['user_id'], kwargs['course_id'])
+            kwargs['pending_updates'], kwargs['updates_complete'] = user_updates.claim()
+        pending_updates = kwargs['pending_updates']
+        course_key = CourseLocator.from_string(kwargs['course_id'])
+
+        set_custom_metrics_for_course_key(course_key)
+        if pending_updates:
+            set_event_transaction_id(pending_updates[-1].get('event_transaction_id'))
+            set_event_transaction_type(pending_updates[-1].get('event_transaction_type'))
+
+        # Raises DatabaseNotReadyError, to retry, until the new scores are saved.
+        block_updates = _coalesced_block_updates(self, course_key, pending_updates)
+
+        if not kwargs['updates_complete']:
+            # Some of the pending updates are no longer available, so
+            # there is no telling which subsections need updating.
+            set_custom_metric('coalesced_updates', 'unknown')
+            CourseGradeFactory().update(
+                User.objects.get(id=kwargs['user_id']),
+                course_key=course_key,
+                force_update_subsections=True,
+            )
+            return
+
+        set_custom_metric('coalesced_updates', len(pending_updates))
+        if block_updates:
+            _update_subsection_grades_for_blocks(course_key, block_updates, kwargs['user_id'])
+    except Exception as exc:
+        if not isinstance(exc, KNOWN_RETRY_ERRORS):
+            log.info("Grades: recalculate_coalesced_subsection_grades unexpected failure: {}. task id: {}. "
+                     "kwargs={}".format(repr(exc), self.request.id, kwargs))
+        raise self.retry(kwargs=kwargs, exc=exc)
+
+
+def _coalesced_block_updates(self, course_key, pending_updates):
+    """
+    Returns a dict of (only_if_higher, score_deleted) tuples, keyed by
+    the scored block usage keys of the given pending updates.
+
+    Raises DatabaseNotReadyError if the database has not been updated
+    with the latest new score of any of the blocks.
+    """
+    block_updates = {}
+    for latest_update, only_if_higher, score_deleted in _coalesce_pending_updates(pending_updates):
+        scored_block_usage_key = UsageKey.from_string(latest_update['usage_id']).replace(course_key=course_key)
+        if not _has_db_updated_with_new_score(self, scored_block_usage_key, **latest_update):
+            raise DatabaseNotReadyError
+        block_updates[scored_block_usage_key] = (only_if_higher, score_deleted)
+    return block_updates
+
+
+def _coalesce_pending_updates(pending_updates):
+    """
+    Returns a list of (latest_update, only_if_higher, score_deleted)
+    tuples, one for each usage_id in the given pending updates, where
+    latest_update is the last update of the usage_id, only_if_higher is
+    set only if it was set for all of its updates, and score_deleted is
+    set if it was set for any of them.
+    """
+    coalesced_updates = OrderedDict()
+    for update_kwargs in pending_updates:
+        only_if_higher, score_deleted = update_kwargs['only_if_higher'], update_kwargs['score_deleted']
+        if update_kwargs['usage_id'] in coalesced_updates:
+            _, previous_only_if_higher, previous_score_deleted = coalesced_updates[update_kwargs['usage_id']]
+            only_if_higher = previous_only_if_higher and only_if_higher
+            score_deleted = previous_score_deleted or score_deleted
+        coalesced_updates[update_kwargs['usage_id']] = (update_kwargs, only_if_higher, score_deleted)
+    return coalesced_updates.values()
+
+
 def _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs):
     """
     Returns whether the database has been updated with the
@@ -281,21 +415,42 @@ def _update_subsection_grades(course_key, scored_block_usage_key, only_if_higher
     for each subsection containing the given block, and to signal
     that those subsection grades were updated.
     """
+    _update_subsection_grades_for_blocks(course_key, {scored_block_usage_key: (only_if_higher, score_deleted)}, user_id)
+
+
+def _update_subsection_grades_for_blocks(course_key, block_updates, user_id):
+    """
+    A helper function to update subsection grades in the database
+    for each subsection containing any of the given blocks, and to
+    signal that those subsection grades were updated.  Each subsection
+    is updated once, however many of its blocks changed.
+
+    block_updates maps the usage key of each changed block to a tuple
+    of its (only_if_higher, score_deleted) values.
+    """
     student = User.objects.get(id=user_id)
     store = modulestore()
     with store.bulk_operations(course_key):
         course_structure = get_course_blocks(student, store.make_course_usage_key(course_key))
-        subsections_to_update = course_structure.get_transformer_block_field(
-            scored_block_usage_key,
-            GradesTransformer,
-            'subsections',
-            set(),
-        )
+        subsections_to_update = OrderedDict()
+        for scored_block_usage_key, (only_if_higher, score_deleted) in block_updates.iteritems():
+            for subsection_usage_key in course_structure.get_transformer_block_field(
+                    scored_block_usage_key,
+                    GradesTransformer,
+                    'subsections',
+                    set(),
+            ):
+                merged_only_if_higher, merged_score_deleted = only_if_higher, score_deleted
+                if subsection_usage_key in subsections_to_update:
+                    previous_only_if_higher, previous_score_deleted = subsections_to_update[subsection_usage_key]
+                    merged_only_if_higher = previous_only_if_higher and only_if_higher
+                    merged_score_deleted = previous_score_deleted or score_deleted
+                subsections_to_update[subsection_usage_key] = (merged_only_if_higher, merged_score_deleted)
 
         course = store.get_course(course_key, depth=0)
         subsection_grade_factory = SubsectionGradeFactory(student, course, course_structure)
 
-        for subsection_usage_key in subsections_to_update:
+        for subsection_usage_key, (only_if_higher, score_deleted) in subsections_to_update.iteritems():
             if subsection_usage_key in course_structure:
                 subsection_grade = subsection_grade_factory.update(
                     course_structure[subsection_usage_key],
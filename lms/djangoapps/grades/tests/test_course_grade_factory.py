@@ -4,19 +4,22 @@ from nose.plugins.attrib import attr
 import ddt
 import django
 from courseware.access import has_access
+from courseware.tests.factories import StudentModuleFactory
 from django.conf import settings
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from mock import patch
 from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
 from six import text_type
 
+from student.models import CourseEnrollment
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
-from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
+from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, BULK_GRADE_ITERATION, waffle
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentCourseGrade
 from ..subsection_grade import ReadSubsectionGrade, ZeroSubsectionGrade
 from .base import GradeTestBase
 from .utils import mock_get_score
@@ -184,6 +187,41 @@ class TestCourseGradeFactory(GradeTestBase):
             ))
         self.assertEqual(mock_update.called, force_update)
 
+    @ddt.data(True, False)
+    def test_iter_bulk_matches_per_user(self, force_update):
+        other_user = UserFactory.create()
+        CourseEnrollment.enroll(other_user, self.course.id)
+        for user, grade in ((self.request.user, 1), (other_user, 2)):
+            StudentModuleFactory.create(
+                student=user,
+                course_id=self.course.id,
+                module_state_key=self.problem.location,
+                grade=grade,
+                max_grade=2,
+            )
+        users = [self.request.user, other_user]
+
+        def iter_percents(bulk_enabled):
+            with waffle().override(BULK_GRADE_ITERATION, active=bulk_enabled):
+                return [
+                    (result.student.id, result.course_grade.percent, result.error)
+                    for result in CourseGradeFactory().iter(users, self.course, force_update=force_update)
+                ]
+
+        per_user_percents = iter_percents(bulk_enabled=False)
+        self.assertEqual(iter_percents(bulk_enabled=True), per_user_percents)
+        self.assertNotEqual(per_user_percents[0][1], per_user_percents[1][1])
+
+    def test_iter_bulk_keeps_prefetched_course_grades(self):
+        # As the grade report prefetches the course grades of its users.
+        users = [self.request.user]
+        PersistentCourseGrade.prefetch(self.course.id, users)
+        self.addCleanup(PersistentCourseGrade.clear_prefetched, self.course.id, users)
+
+        with waffle().override(BULK_GRADE_ITERATION, active=True):
+            list(CourseGradeFactory().iter(users, self.course))
+        self.assertTrue(PersistentCourseGrade.is_prefetched(self.course.id, self.request.user.id))
+
     def test_course_grade_summary(self):
         with mock_get_score(1, 2):
             self.subsection_grade_factory.update(self.course_structure[self.sequence.location])
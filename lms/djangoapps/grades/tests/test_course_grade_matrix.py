@@ -0,0 +1,273 @@
+"""
+Tests for the vectorized computation of course grades.
+"""
+import random
+from collections import OrderedDict, defaultdict
+from unittest import TestCase
+
+import ddt
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+
+from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
+from lms.djangoapps.course_blocks.transformers.tests.test_user_partitions import UserPartitionTestMixin
+from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort
+from openedx.core.djangolib.testing.utils import get_mock_request
+from student.models import CourseEnrollment
+from student.tests.factories import UserFactory
+from xmodule.graders import ProblemScore, aggregate_scores, grader_from_conf
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..config.waffle import BULK_GRADE_ITERATION, VECTORIZED_GRADE_COMPUTATION, waffle
+from ..course_data import CourseData
+from ..course_grade import CourseGrade
+from ..course_grade_factory import CourseGradeFactory
+from ..course_grade_matrix import CourseGradeMatrix, ScoredSubsection
+from ..models import PersistentSubsectionGrade
+from ..scores import compute_percent
+from ..subsection_grade_factory import SubsectionGradeFactory
+from .utils import answer_problem
+
+
+class MockSubsectionGrade(object):
+    """
+    Subsection grade with only the values used by the course grader.
+    """
+    def __init__(self, graded_total):
+        self.display_name = u'Subsection'
+        self.graded_total = graded_total
+        self.percent_graded = compute_percent(graded_total.earned, graded_total.possible)
+
+
+@ddt.ddt
+class CourseGradeMatrixPropertyTest(TestCase):
+    """
+    Checks, for randomly generated courses and scores, that the
+    vectorized grades are identical to those of the object path.
+    """
+    FORMATS = [u'Homework', u'Lab', u'Exam']
+
+    def _random_course(self, rnd):
+        """
+        Returns the subsections, grader and grade cutoffs of a random course.
+        """
+        course_key = CourseLocator(u'org', u'course', u'run')
+        problems = [course_key.make_usage_key(u'problem', u'p{}'.format(index)) for index in range(rnd.randint(0, 12))]
+        subsections = [
+            ScoredSubsection(
+                location=course_key.make_usage_key(u'sequential', u's{}'.format(index)),
+                format=rnd.choice(self.FORMATS),
+                graded=rnd.random() < 0.8,
+                problem_locations=rnd.sample(problems, rnd.randint(0, len(problems))),
+            )
+            for index in range(rnd.randint(0, 8))
+        ]
+        grader = grader_from_conf([
+            {
+                u'type': subsection_format,
+                u'min_count': rnd.randint(0, 4),
+                u'drop_count': rnd.randint(0, 3),
+                u'weight': rnd.choice([0.1, 0.15, 0.25, 0.3, 0.5]),
+            }
+            for subsection_format in self.FORMATS
+        ])
+        grade_cutoffs = {u'A': 0.87, u'B': rnd.choice([0.5, 0.6]), u'C': rnd.choice([0.0, 0.33])}
+        return subsections, grader, grade_cutoffs
+
+    def _random_problem_scores(self, rnd, subsections):
+        """
+        Returns a random dict of problem scores for a user.
+        """
+        problem_scores = {}
+        for subsection in subsections:
+            for location in subsection.problem_locations:
+                if location not in problem_scores and rnd.random() < 0.9:
+                    possible = float(rnd.choice([0, 1, 2, 3, 5, 10]))
+                    earned = rnd.choice([0.0, possible, rnd.uniform(0, possible)])
+                    problem_scores[location] = ProblemScore(
+                        raw_earned=earned,
+                        raw_possible=possible,
+                        weighted_earned=earned,
+                        weighted_possible=possible,
+                        weight=None,
+                        graded=rnd.random() < 0.9,
+                        first_attempted=None,
+                    )
+        return problem_scores
+
+    def _object_path_grade(self, subsections, grader, grade_cutoffs, problem_scores):
+        """
+        Returns the percent, letter grade and passed values computed
+        for the given problem scores by the object path.
+        """
+        grade_sheet = defaultdict(OrderedDict)
+        for subsection in subsections:
+            _, graded_total = aggregate_scores([
+                problem_scores[location] for location in subsection.problem_locations if location in problem_scores
+            ])
+            if subsection.graded and graded_total.possible > 0:
+                grade_sheet[subsection.format][subsection.location] = MockSubsectionGrade(graded_total)
+
+        # pylint: disable=protected-access
+        percent = CourseGrade._compute_percent(grader.grade(grade_sheet))
+        return (
+            percent,
+            CourseGrade._compute_letter_grade(grade_cutoffs, percent),
+            CourseGrade._compute_passed(grade_cutoffs, percent),
+        )
+
+    @ddt.data(*range(20))
+    def test_matches_object_path(self, seed):
+        rnd = random.Random(seed)
+        subsections, grader, grade_cutoffs = self._random_course(rnd)
+        users_problem_scores = [self._random_problem_scores(rnd, subsections) for _ in range(rnd.randint(1, 10))]
+
+        grade_arrays = CourseGradeMatrix(subsections, grader, grade_cutoffs).grade(users_problem_scores)
+
+        self.assertEqual(
+            zip(grade_arrays.percents.tolist(), grade_arrays.letter_grades, grade_arrays.passed),
+            [
+                self._object_path_grade(subsections, grader, grade_cutoffs, problem_scores)
+                for problem_scores in users_problem_scores
+            ],
+        )
+
+
+@ddt.ddt
+class CourseGradeMatrixCourseTest(UserPartitionTestMixin, ModuleStoreTestCase):
+    """
+    Checks, for a course with user partitions and unattempted problems,
+    that the vectorized grades are identical to those of the object path.
+    """
+    def setUp(self):
+        super(CourseGradeMatrixCourseTest, self).setUp()
+        self.setup_groups_partitions(num_groups=2)
+        partition_id = self.user_partitions[0].id
+        self.course = CourseFactory.create(user_partitions=self.user_partitions)
+        self.course.set_grading_policy({
+            u'GRADER': [
+                {u'type': u'Homework', u'min_count': 2, u'drop_count': 1, u'short_label': u'HW', u'weight': 0.6},
+                {u'type': u'Exam', u'min_count': 1, u'drop_count': 0, u'short_label': u'Exam', u'weight': 0.4},
+            ],
+            u'GRADE_CUTOFFS': {u'A': 0.8, u'B': 0.5},
+        })
+        self.store.update_item(self.course, self.user.id)
+
+        problem_xml = MultipleChoiceResponseXMLFactory().build_xml(
+            question_text='The correct answer is Choice 3',
+            choices=[False, False, True, False],
+            choice_names=['choice_0', 'choice_1', 'choice_2', 'choice_3']
+        )
+        self.problems = []
+        with self.store.bulk_operations(self.course.id):
+            chapter = ItemFactory.create(parent=self.course, category='chapter')
+            for subsection_format, groups_access in [
+                    (u'Homework', [None, [1]]),
+                    (u'Homework', [[2], None, None]),
+                    (u'Homework', [[1], [2]]),
+                    (u'Exam', [None, None]),
+            ]:
+                subsection = ItemFactory.create(
+                    parent=chapter, category='sequential', graded=True, format=subsection_format,
+                )
+                for group_ids in groups_access:
+                    metadata = {'weight': 2}
+                    if group_ids:
+                        metadata['group_access'] = {partition_id: group_ids}
+                    self.problems.append(ItemFactory.create(
+                        parent=subsection, category='problem', data=problem_xml, metadata=metadata,
+                    ))
+        self.course = self.store.get_course(self.course.id)
+
+        self.setup_cohorts(self.course)
+        self.users = [UserFactory() for _ in range(4)]
+        for user in self.users:
+            CourseEnrollment.enroll(user, self.course.id)
+        # The last two users are in no group, and the last user attempts no problem.
+        add_user_to_cohort(self.partition_cohorts[0][0], self.users[0].username)
+        add_user_to_cohort(self.partition_cohorts[0][1], self.users[1].username)
+
+    @staticmethod
+    def _grade_values(course_grade):
+        """
+        Returns the percent, letter grade and passed values of the given
+        course grade.
+        """
+        return course_grade.percent, course_grade.letter_grade, bool(course_grade.passed)
+
+    def _answer_problems(self, seed):
+        """
+        Randomly answers the problems as all the users but the last.
+        """
+        rnd = random.Random(seed)
+        for user in self.users[:-1]:
+            request = get_mock_request(user)
+            for problem in self.problems:
+                if rnd.random() < 0.7:
+                    answer_problem(self.course, request, problem, score=rnd.randint(0, 2), max_value=2)
+
+    def _iter_vectorized(self):
+        """
+        Returns the results of updating the grades of all the users
+        with CourseGradeMatrix.
+        """
+        with waffle().override(BULK_GRADE_ITERATION, active=True):
+            with waffle().override(VECTORIZED_GRADE_COMPUTATION, active=True):
+                return list(CourseGradeFactory().iter(self.users, self.course, force_update=True))
+
+    @staticmethod
+    def _persisted_subsection_grades():
+        """
+        Returns the values of all the persisted subsection grades.
+        """
+        return list(PersistentSubsectionGrade.objects.order_by('user_id', 'usage_key').values_list(
+            'user_id', 'usage_key', 'earned_all', 'possible_all', 'earned_graded', 'possible_graded',
+            'first_attempted', 'visible_blocks_id',
+        ))
+
+    @ddt.data(*range(5))
+    def test_matches_course_grade_factory(self, seed):
+        self._answer_problems(seed)
+
+        expected = [self._grade_values(CourseGradeFactory().read(user, self.course)) for user in self.users]
+
+        with patch.object(CourseGradeMatrix, 'grade', autospec=True, side_effect=CourseGradeMatrix.grade) as mock_grade:
+            results = self._iter_vectorized()
+
+        # The users in each group, and those in no group, are graded together.
+        self.assertEqual(mock_grade.call_count, 3)
+        self.assertEqual([result.error for result in results], [None] * len(self.users))
+        self.assertEqual([self._grade_values(result.course_grade) for result in results], expected)
+        self.assertEqual(
+            [self._grade_values(CourseGradeFactory().read(user, self.course)) for user in self.users],
+            expected,
+        )
+
+    @ddt.data(*range(3))
+    def test_persisted_subsection_grades_match(self, seed):
+        self._answer_problems(seed)
+        for user in self.users:
+            CourseGradeFactory().update(user, self.course, force_update_subsections=True)
+        expected = self._persisted_subsection_grades()
+        PersistentSubsectionGrade.objects.all().delete()
+
+        # The subsection grades are created in bulk, then updated, from the
+        # grade matrix rather than by SubsectionGradeFactory.update.
+        with patch.object(SubsectionGradeFactory, 'update', side_effect=AssertionError):
+            for _ in range(2):
+                results = self._iter_vectorized()
+                self.assertEqual([result.error for result in results], [None] * len(self.users))
+                self.assertEqual(self._persisted_subsection_grades(), expected)
+
+    def test_unattempted_problems(self):
+        user = self.users[-1]
+        matrix = CourseGradeMatrix.from_course_data(CourseData(user, course=self.course))
+        _, possible, _ = matrix.score_arrays([{}])
+        self.assertEqual(possible.tolist(), [[2.0] * len(matrix.problem_locations)])
+
+        grade_arrays = matrix.grade([{}])
+        self.assertEqual(
+            (grade_arrays.percents.tolist()[0], grade_arrays.letter_grades[0], bool(grade_arrays.passed[0])),
+            self._grade_values(CourseGradeFactory().read(user, self.course)),
+        )
@@ -13,7 +13,7 @@ from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils.timezone import now
 from freezegun import freeze_time
-from mock import patch
+from mock import Mock, patch
 from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
 
 from lms.djangoapps.grades.models import (
@@ -135,6 +135,7 @@ class VisibleBlocksTest(GradesModelTestCase):
     def setUp(self):
         super(VisibleBlocksTest, self).setUp()
         self.user_id = 12345
+        VisibleBlocks._STORED_HASHES.clear()  # pylint: disable=protected-access
 
     def _create_block_record_list(self, blocks, user_id=None):
         """
@@ -186,6 +187,27 @@ class VisibleBlocksTest(GradesModelTestCase):
         self.assertNotEqual(stored_vblocks.pk, new_vblocks.pk)
         self.assertNotEqual(stored_vblocks.hashed, new_vblocks.hashed)
 
+    def test_bulk_ensure(self):
+        """
+        Ensures that bulk_ensure stores the missing visible blocks with a
+        single insert and select, and remembers them once committed.
+        """
+        self._create_block_record_list([self.record_a])
+        block_record_lists = [
+            BlockRecordList.from_list([self.record_a], self.course_key),
+            BlockRecordList.from_list([self.record_b], self.course_key),
+        ]
+        with patch('lms.djangoapps.grades.models.transaction.on_commit', side_effect=lambda func: func()):
+            with self.assertNumQueries(2):
+                VisibleBlocks.bulk_ensure(self.course_key, block_record_lists)
+            with self.assertNumQueries(0):
+                VisibleBlocks.bulk_ensure(self.course_key, block_record_lists)
+
+        self.assertEqual(
+            set(VisibleBlocks.objects.values_list('hashed', flat=True)),
+            {block_record_list.hash_value for block_record_list in block_record_lists},
+        )
+
     def test_blocks_property(self):
         """
         Ensures that, given an array of BlockRecord, creating visible_blocks
@@ -450,6 +472,23 @@ class PersistentCourseGradesTest(GradesModelTestCase):
         with self.assertRaises(PersistentCourseGrade.DoesNotExist):
             PersistentCourseGrade.read(self.params["user_id"], self.params["course_id"])
 
+    def test_prefetch_and_clear_prefetched(self):
+        grade = PersistentCourseGrade.update_or_create(**self.params)
+        user, other_user = Mock(id=self.params["user_id"]), Mock(id=self.params["user_id"] + 1)
+        PersistentCourseGrade.prefetch(self.course_key, [user, other_user])
+        self.addCleanup(PersistentCourseGrade.clear_prefetched, self.course_key, [user, other_user])
+        with self.assertNumQueries(0):
+            self.assertEqual(PersistentCourseGrade.read(user.id, self.course_key), grade)
+            with self.assertRaises(PersistentCourseGrade.DoesNotExist):
+                PersistentCourseGrade.read(other_user.id, self.course_key)
+
+        # Only the grades of the given users are cleared.
+        PersistentCourseGrade.clear_prefetched(self.course_key, [user])
+        self.assertFalse(PersistentCourseGrade.is_prefetched(self.course_key, user.id))
+        self.assertTrue(PersistentCourseGrade.is_prefetched(self.course_key, other_user.id))
+        with self.assertNumQueries(1):
+            self.assertEqual(PersistentCourseGrade.read(user.id, self.course_key), grade)
+
     def test_update_or_create_event(self):
         with patch('lms.djangoapps.grades.events.tracker') as tracker_mock:
             grade = PersistentCourseGrade.update_or_create(**self.params)
@@ -0,0 +1,100 @@
+"""
+Tests for the cached grade summaries of the progress page.
+"""
+from django.core.cache import cache
+from django.test.utils import override_settings
+from mock import patch
+
+from ..config.waffle import CACHE_PROGRESS_SUMMARIES, waffle
+from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentCourseGrade
+from ..progress_summary import read_progress_summary
+from .base import GradeTestBase
+from .utils import mock_get_score
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProgressSummaryTest(GradeTestBase):
+    """
+    Tests the read-through cache of progress summaries.
+    """
+    def setUp(self):
+        super(ProgressSummaryTest, self).setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # The course as loaded by the progress page, with its edit info.
+        self.course = self.store.get_course(self.course.id)
+
+    def _read_progress_summary(self, expected_grade_reads):
+        """
+        Reads the user's progress summary, asserting the number of
+        times the CourseGradeFactory is used to read the course grade.
+        """
+        with patch.object(CourseGradeFactory, 'read', autospec=True, side_effect=CourseGradeFactory.read) as mock_read:
+            summary = read_progress_summary(self.request.user, self.course)
+        self.assertEqual(mock_read.call_count, expected_grade_reads)
+        return summary
+
+    def _assert_summary_matches(self, summary, course_grade):
+        """
+        Asserts that the given summary has the rendered values of the
+        given course grade.
+        """
+        self.assertEqual(
+            (summary.percent, summary.letter_grade, summary.passed, summary.summary),
+            (course_grade.percent, course_grade.letter_grade, course_grade.passed, course_grade.summary),
+        )
+        self.assertEqual(len(summary.chapter_grades), len(course_grade.chapter_grades))
+        for chapter, expected_chapter in zip(summary.chapter_grades.values(), course_grade.chapter_grades.values()):
+            self.assertEqual(chapter['display_name'], expected_chapter['display_name'])
+            for section, expected_section in zip(chapter['sections'], expected_chapter['sections']):
+                self.assertEqual(
+                    (
+                        section.url_name,
+                        section.all_total.earned,
+                        section.all_total.possible,
+                        section.percent_graded,
+                        [(score.earned, score.possible) for score in section.problem_scores.values()],
+                        section.show_grades(False),
+                    ),
+                    (
+                        expected_section.url_name,
+                        expected_section.all_total.earned,
+                        expected_section.all_total.possible,
+                        expected_section.percent_graded,
+                        [(score.earned, score.possible) for score in expected_section.problem_scores.values()],
+                        expected_section.show_grades(False),
+                    ),
+                )
+
+    def test_read_through(self):
+        with mock_get_score(1, 2):
+            course_grade = CourseGradeFactory().update(self.request.user, self.course)
+
+        self._assert_summary_matches(self._read_progress_summary(expected_grade_reads=1), course_grade)
+        self._assert_summary_matches(self._read_progress_summary(expected_grade_reads=0), course_grade)
+
+    def test_grade_update(self):
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course)
+        self._read_progress_summary(expected_grade_reads=1)
+
+        with mock_get_score(2, 2):
+            course_grade = CourseGradeFactory().update(self.request.user, self.course)
+        self._assert_summary_matches(self._read_progress_summary(expected_grade_reads=1), course_grade)
+
+    def test_invalidated_by_signal(self):
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course)
+        self._read_progress_summary(expected_grade_reads=1)
+
+        with waffle().override(CACHE_PROGRESS_SUMMARIES, active=True):
+            with patch.object(PersistentCourseGrade, 'update_or_create'):
+                # The stored grade, and its timestamp, are left unchanged.
+                with mock_get_score(1, 2):
+                    CourseGradeFactory().update(self.request.user, self.course)
+        self._read_progress_summary(expected_grade_reads=1)
+
+    def test_not_cached_without_stored_grade(self):
+        self._read_progress_summary(expected_grade_reads=1)
+        self._read_progress_summary(expected_grade_reads=1)
@@ -11,19 +11,24 @@ import ddt
 import pytz
 import six
 from django.conf import settings
+from django.core.cache import cache
 from django.db.utils import IntegrityError
+from django.test.utils import override_settings
 from mock import MagicMock, patch
 
 from lms.djangoapps.grades import tasks
 from lms.djangoapps.grades.config.models import PersistentGradesEnabledFlag
+from lms.djangoapps.grades.config.waffle import COALESCE_SUBSECTION_GRADE_UPDATES, waffle
 from lms.djangoapps.grades.constants import ScoreDatabaseTableEnum
 from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGrade
 from lms.djangoapps.grades.services import GradesService
 from lms.djangoapps.grades.signals.signals import PROBLEM_WEIGHTED_SCORE_CHANGED
 from lms.djangoapps.grades.tasks import (
+    COALESCED_RECALCULATE_GRADE_DELAY_SECONDS,
     RECALCULATE_GRADE_DELAY_SECONDS,
     _course_task_args,
     compute_grades_for_course_v2,
+    recalculate_coalesced_subsection_grades,
     recalculate_subsection_grade_v3
 )
 from openedx.core.djangoapps.content.block_structure.exceptions import BlockStructureNotFound
@@ -407,6 +412,120 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
         self.assertFalse(mock_retry.called)
 
 
+@patch.dict(settings.FEATURES, {'PERSISTENT_GRADES_ENABLED_FOR_ALL_TESTS': False})
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RecalculateCoalescedSubsectionGradesTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
+    """
+    Ensures that score changes of a user in a course are coalesced
+    into a single subsection grade recalculation.
+    """
+    shard = 4
+    ENABLED_SIGNALS = ['course_published', 'pre_publish']
+
+    def setUp(self):
+        super(RecalculateCoalescedSubsectionGradesTest, self).setUp()
+        self.user = UserFactory()
+        PersistentGradesEnabledFlag.objects.create(enabled_for_all_courses=True, enabled=True)
+        self.set_up_course()
+        cache.clear()
+
+    def test_burst_schedules_single_task(self):
+        with waffle().override(COALESCE_SUBSECTION_GRADE_UPDATES, active=True):
+            with patch(
+                'lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.apply_async'
+            ) as mock_task_apply:
+                for _ in range(3):
+                    PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **self.problem_weighted_score_changed_kwargs)
+        mock_task_apply.assert_called_once_with(
+            kwargs=dict(user_id=self.user.id, course_id=unicode(self.course.id)),
+            countdown=COALESCED_RECALCULATE_GRADE_DELAY_SECONDS,
+        )
+
+    @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
+    def test_burst_updates_subsection_once(self, mock_subsection_signal):
+        with patch('lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.apply_async'):
+            for _ in range(3):
+                tasks.enqueue_coalesced_subsection_grade_update(**self.recalculate_subsection_grade_kwargs)
+
+        with self._mock_score():
+            with patch(
+                'lms.djangoapps.grades.subsection_grade_factory.SubsectionGradeFactory.update',
+            ) as mock_update:
+                recalculate_coalesced_subsection_grades.apply(
+                    kwargs=dict(user_id=self.user.id, course_id=unicode(self.course.id)),
+                )
+        self.assertEqual(mock_update.call_count, 1)
+        self.assertEqual(mock_subsection_signal.call_count, 1)
+
+    def test_lost_updates_recalculate_all(self):
+        with patch('lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.apply_async'):
+            tasks.enqueue_coalesced_subsection_grade_update(**self.recalculate_subsection_grade_kwargs)
+        cache.clear()
+
+        with patch('lms.djangoapps.grades.tasks.CourseGradeFactory') as mock_factory:
+            recalculate_coalesced_subsection_grades.apply(
+                kwargs=dict(user_id=self.user.id, course_id=unicode(self.course.id)),
+            )
+        mock_factory.return_value.update.assert_called_once_with(
+            self.user, course_key=self.course.id, force_update_subsections=True,
+        )
+
+    @patch('lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.retry')
+    def test_lost_updates_wait_for_available_scores(self, mock_retry):
+        with patch('lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.apply_async'):
+            for _ in range(2):
+                tasks.enqueue_coalesced_subsection_grade_update(**self.recalculate_subsection_grade_kwargs)
+        cache.delete(u'grades.pending_updates.{}.{}.1'.format(self.user.id, self.course.id))
+
+        with self._mock_score(timedelta(days=-1)):
+            with patch('lms.djangoapps.grades.tasks.CourseGradeFactory') as mock_factory:
+                recalculate_coalesced_subsection_grades.apply(
+                    kwargs=dict(user_id=self.user.id, course_id=unicode(self.course.id)),
+                )
+        self.assertFalse(mock_factory.return_value.update.called)
+        retry_kwargs = mock_retry.call_args[1]['kwargs']
+        self.assertEqual(len(retry_kwargs['pending_updates']), 1)
+        self.assertFalse(retry_kwargs['updates_complete'])
+
+        with self._mock_score():
+            with patch('lms.djangoapps.grades.tasks.CourseGradeFactory') as mock_factory:
+                recalculate_coalesced_subsection_grades.apply(kwargs=retry_kwargs)
+        mock_factory.return_value.update.assert_called_once_with(
+            self.user, course_key=self.course.id, force_update_subsections=True,
+        )
+
+    @patch('lms.djangoapps.grades.tasks.SUBSECTION_SCORE_CHANGED.send')
+    @patch('lms.djangoapps.grades.tasks.SubsectionGradeFactory')
+    @patch('lms.djangoapps.grades.tasks.get_course_blocks')
+    def test_merged_flags_kept_per_subsection(self, mock_get_course_blocks, mock_factory, _mock_signal):
+        first_block, second_block = 'first_block', 'second_block'
+        block_subsections = {first_block: ['shared_subsection'], second_block: ['shared_subsection', 'own_subsection']}
+        course_structure = MagicMock()
+        course_structure.__contains__.return_value = True
+        course_structure.__getitem__.side_effect = lambda usage_key: usage_key
+        course_structure.get_transformer_block_field.side_effect = (
+            lambda usage_key, transformer, field, default: block_subsections[usage_key]
+        )
+        mock_get_course_blocks.return_value = course_structure
+
+        block_updates = OrderedDict([(first_block, (False, True)), (second_block, (True, False))])
+        tasks._update_subsection_grades_for_blocks(self.course.id, block_updates, self.user.id)
+        updates = {
+            call[0][0]: call[0][1:] for call in mock_factory.return_value.update.call_args_list
+        }
+        self.assertEqual(updates, {'shared_subsection': (False, True), 'own_subsection': (True, False)})
+
+    def _mock_score(self, modified_delta=timedelta(days=1)):
+        """
+        Mocks the score read to verify the database was updated, with a
+        score modified `modified_delta` from now.
+        """
+        return patch(
+            'lms.djangoapps.grades.tasks.get_score',
+            return_value=MagicMock(modified=datetime.utcnow().replace(tzinfo=pytz.UTC) + modified_delta),
+        )
+
+
 @ddt.ddt
 class ComputeGradesForCourseTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
     """
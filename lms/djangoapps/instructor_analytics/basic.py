@@ -436,13 +436,13 @@ def list_problem_responses(course_key, problem_location, limit_responses=None):
         course_id=course_key,
         module_state_key=problem_key
     )
-    smdat = smdat.order_by('student')
+    smdat = smdat.order_by('student').values_list('student__username', 'state')
     if limit_responses is not None:
         smdat = smdat[:limit_responses]
 
     return [
-        {'username': response.student.username, 'state': response.state}
-        for response in smdat
+        {'username': username, 'state': state}
+        for username, state in smdat
     ]
 
 
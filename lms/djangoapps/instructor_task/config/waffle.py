@@ -0,0 +1,18 @@
+"""
+This module contains various configuration settings via
+waffle switches for the instructor_task app.
+"""
+from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
+
+# Namespace
+WAFFLE_NAMESPACE = u'instructor_task'
+
+# Switches
+BULK_RESCORE = u'bulk_rescore'
+
+
+def waffle():
+    """
+    Returns the namespaced, cached, audited Waffle class for instructor_task.
+    """
+    return WaffleSwitchNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'Instructor Task: ')
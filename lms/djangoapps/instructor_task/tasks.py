@@ -27,7 +27,9 @@ from django.conf import settings
 from django.utils.translation import ugettext_noop
 
 from bulk_email.tasks import perform_delegate_email_batches
+from lms.djangoapps.instructor_task.config.waffle import BULK_RESCORE, waffle
 from lms.djangoapps.instructor_task.tasks_base import BaseInstructorTask
+from lms.djangoapps.instructor_task.tasks_helper.bulk_rescore import perform_bulk_rescore
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
     upload_enrollment_report,
@@ -75,9 +77,11 @@ def rescore_problem(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
-    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
-
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    if waffle().is_enabled(BULK_RESCORE):
+        visit_fcn = partial(perform_bulk_rescore, xmodule_instance_args)
+    else:
+        update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+        visit_fcn = partial(perform_module_state_update, update_fcn, None)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -0,0 +1,511 @@
+"""
+Instructor Task for rescoring the learners of a problem in bulk.
+
+Rather than instantiating the module of each learner, as rescore_problem_module_state
+does, the runtime of the problem is built once, from the module of the first learner.
+Each learner's stored state is then swapped into a LoncapaProblem built with that
+runtime, and the rescored states, scores and grade signals of a batch of learners
+are written together.
+"""
+import copy
+import json
+import logging
+from collections import namedtuple
+from functools import partial
+from multiprocessing import Pool
+from time import time
+
+from django.conf import settings
+from django.db import connections
+from eventtracking import tracker
+from opaque_keys.edx.keys import UsageKey
+from six import text_type
+
+import dogstats_wrapper as dog_stats_api
+from capa.capa_problem import LoncapaProblem
+from capa.responsetypes import (
+    CodeResponse,
+    CustomResponse,
+    LoncapaProblemError,
+    ResponseError,
+    StudentInputError
+)
+from courseware.access import has_access
+from courseware.courses import get_course_by_id
+from courseware.field_overrides import OverrideFieldData
+from courseware.models import StudentModule
+from lms.djangoapps.grades.constants import ScoreDatabaseTableEnum
+from lms.djangoapps.grades.events import GRADES_RESCORE_EVENT_TYPE
+from lms.djangoapps.grades.signals.signals import PROBLEM_RAW_SCORE_CHANGED
+from openedx.core.lib.grade_utils import is_score_higher_or_equal
+from student.models import anonymous_id_for_user
+from track import contexts
+from track.event_transaction_utils import create_new_event_transaction_id, set_event_transaction_type
+from util.db import outer_atomic
+from xblock.scorable import Score
+from xmodule.capa_base import CapaMixin
+from xmodule.capa_module import CapaDescriptor
+from xmodule.modulestore.django import clear_existing_modulestores, modulestore
+
+from .module_state import (
+    _get_module_instance_for_task,
+    _get_modules_to_update,
+    _get_track_function_for_task,
+    _iter_module_batches,
+    _record_update_status,
+    perform_module_state_update,
+    rescore_problem_module_state
+)
+from .runner import TaskProgress
+from .utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED, UPDATE_STATUS_SUCCEEDED
+
+TASK_LOG = logging.getLogger('edx.celery.task')
+
+# The rescorer whose learners are rescored by the processes of a pool, which
+# they inherit from the task's process when forked.
+_POOL_RESCORER = None
+
+# The update status of a learner's rescored problem, its rescored state, the
+# score before and after rescoring, and the events tracked while rescoring.
+RescoredState = namedtuple('RescoredState', ['update_status', 'state', 'orig_score', 'new_score', 'events'])
+
+
+def perform_bulk_rescore(xmodule_instance_args, entry_id, course_id, task_input, action_name):
+    """
+    Rescores a problem for all of its learners, or for the one given in `task_input`.
+
+    This has the same results as perform_module_state_update with rescore_problem_module_state,
+    which it falls back to for entrance exams, for problems other than capa problems, and for
+    courses with field overrides, where a problem may differ between learners.
+    """
+    start_time = time()
+    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    problem_url = task_input.get('problem_url')
+    if not problem_url or task_input.get('entrance_exam_url'):
+        return perform_module_state_update(update_fcn, None, entry_id, course_id, task_input, action_name)
+
+    usage_key = UsageKey.from_string(problem_url).map_into_course(course_id)
+    problem_descriptor = modulestore().get_item(usage_key)
+    course = get_course_by_id(course_id)
+    if not isinstance(problem_descriptor, CapaDescriptor) or _has_field_overrides(course):
+        return perform_module_state_update(update_fcn, None, entry_id, course_id, task_input, action_name)
+
+    modules_to_update = _get_modules_to_update(course_id, [usage_key], task_input.get('student'), None)
+    task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
+    task_progress.update_task_state()
+
+    rescorer = _ProblemRescorer(course, problem_descriptor, xmodule_instance_args, task_input)
+    try:
+        with modulestore().bulk_operations(course_id):
+            for student_modules in _iter_module_batches(modules_to_update):
+                task_progress.attempted += len(student_modules)
+                # There is no try here:  if there's an error, we let it throw, and the task will
+                # be marked as FAILED, with a stack trace.
+                with dog_stats_api.timer(
+                        'instructor_tasks.module.time.batch', tags=[u'action:{name}'.format(name=action_name)]
+                ):
+                    for update_status in rescorer.rescore(student_modules):
+                        _record_update_status(task_progress, update_status)
+    finally:
+        rescorer.close()
+
+    return task_progress.update_task_state()
+
+
+def _has_field_overrides(course):
+    """
+    Returns whether field override providers are enabled for the course.
+    """
+    field_data = object()
+    return OverrideFieldData.wrap(None, course, field_data) is not field_data
+
+
+def _initialize_pool_process(rescorer):
+    """
+    Initializes a local pool process with the rescorer of the task's process,
+    so it does not share the cache and modulestore connections of the task's process.
+    Scripts run by the pool process are thus not cached.
+    """
+    global _POOL_RESCORER  # pylint: disable=global-statement
+    clear_existing_modulestores()
+    rescorer.capa_system.cache = None
+    _POOL_RESCORER = rescorer
+
+
+def _rescore_in_pool_process(learner):
+    """
+    Rescores the problem state of a learner in a pool process.
+    """
+    return _POOL_RESCORER.rescore_state(*learner)
+
+
+class _ProblemRescorer(object):
+    """
+    Rescores the learners of a capa problem, with a runtime built from the module
+    of the first learner.
+    """
+    def __init__(self, course, problem_descriptor, xmodule_instance_args, task_input):
+        self.course = course
+        self.problem_descriptor = problem_descriptor
+        self.xmodule_instance_args = xmodule_instance_args
+        self.task_input = task_input
+        self.only_if_higher = task_input['only_if_higher']
+        self.capa_system = None
+        self.problem_text = None
+        self.is_rescored_in_bulk = True
+        self.runs_scripts = False
+        self.pool = None
+
+    def close(self):
+        """
+        Stops the processes of the pool, if one was started.
+        """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def rescore(self, student_modules):
+        """
+        Rescores the problem for the given StudentModules, returning the update status of each.
+        """
+        update_statuses = {}
+        learners = []
+        rescored_one_at_a_time = []
+        for student_module in student_modules:
+            if self.capa_system is None and self.is_rescored_in_bulk:
+                if not self._build_capa_system(student_module):
+                    update_statuses[student_module.id] = self._access_denied(student_module)
+                    continue
+            elif self.is_rescored_in_bulk and not has_access(
+                    student_module.student, 'load', self.problem_descriptor, self.course.id
+            ):
+                update_statuses[student_module.id] = self._access_denied(student_module)
+                continue
+
+            if not self.is_rescored_in_bulk:
+                rescored_one_at_a_time.append(student_module)
+                continue
+
+            state = json.loads(student_module.state) if student_module.state else {}
+            if not state.get('done'):
+                # The problem has no submissions to rescore.
+                update_statuses[student_module.id] = UPDATE_STATUS_SKIPPED
+            elif state.get('seed') is None:
+                rescored_one_at_a_time.append(student_module)
+            else:
+                learners.append((student_module, state))
+
+        rescored_states = self._rescore_states(learners)
+        rescored_one_at_a_time.extend(self._save(learners, rescored_states, update_statuses))
+
+        for student_module in rescored_one_at_a_time:
+            update_statuses[student_module.id] = rescore_problem_module_state(
+                self.xmodule_instance_args, self.problem_descriptor, student_module, self.task_input
+            )
+        return [update_statuses[student_module.id] for student_module in student_modules]
+
+    def rescore_state(self, state, anonymous_student_id, seed):
+        """
+        Rescores the problem state of a learner, returning a RescoredState.
+
+        `anonymous_student_id` and `seed` are those of the learner's runtime.
+        """
+        capa_system = copy.copy(self.capa_system)
+        capa_system.anonymous_student_id = anonymous_student_id
+        capa_system.seed = seed
+        problem = _LearnerProblem(self.problem_descriptor.location, self.problem_text, capa_system, state)
+        try:
+            orig_score, new_score = problem.rescore()
+        except (LoncapaProblemError, StudentInputError, ResponseError):
+            return RescoredState(UPDATE_STATUS_FAILED, None, None, None, problem.runtime.events)
+        return RescoredState(
+            UPDATE_STATUS_SUCCEEDED, problem.lcp.get_state(), orig_score, new_score, problem.runtime.events
+        )
+
+    def _build_capa_system(self, student_module):
+        """
+        Builds the runtime of the problem from the module of the given learner,
+        and finds whether the problem can be rescored in bulk.
+
+        Returns False if the learner doesn't have access to the problem.
+        """
+        instance = _get_module_instance_for_task(
+            self.course.id,
+            student_module.student,
+            self.problem_descriptor,
+            self.xmodule_instance_args,
+            grade_bucket_type='rescore',
+            course=self.course
+        )
+        if instance is None:
+            return False
+
+        responders = instance.lcp.responders.values()
+        # Rescoring code responses submits them to the xqueue again, with a callback for the
+        # learner.  Problems that don't support rescoring are left to fail as they do when
+        # rescored one learner at a time.
+        self.is_rescored_in_bulk = instance.lcp.supports_rescoring() and not any(
+            isinstance(responder, CodeResponse) or 'filesubmission' in responder.allowed_inputfields
+            for responder in responders
+        )
+        self.runs_scripts = any(isinstance(responder, CustomResponse) for responder in responders)
+
+        capa_system = copy.copy(instance.lcp.capa_system)
+        python_lib_zip = capa_system.get_python_lib_zip()
+        capa_system.get_python_lib_zip = lambda: python_lib_zip
+        self.capa_system = capa_system
+        self.problem_text = instance.data
+        return True
+
+    def _access_denied(self, student_module):
+        """
+        Logs that the learner of the given StudentModule has no access to the problem.
+        """
+        # Either permissions just changed, or someone is trying to be clever
+        # and load something they shouldn't have access to.
+        msg = "No module {location} for student {student}--access denied?".format(
+            location=student_module.module_state_key,
+            student=student_module.student
+        )
+        TASK_LOG.warning(msg)
+        return UPDATE_STATUS_FAILED
+
+    def _rescore_states(self, learners):
+        """
+        Rescores the problem states of the given (StudentModule, state) pairs, returning
+        a RescoredState for each.
+
+        Problems with customresponse scripts are rescored across a pool of
+        settings.BULK_RESCORE_PROCESSES processes, if there are at least 2.
+        """
+        states = [
+            (state, anonymous_id_for_user(student_module.student, None), student_module.student.id)
+            for student_module, state in learners
+        ]
+        processes = settings.BULK_RESCORE_PROCESSES
+        if not (self.runs_scripts and processes > 1 and len(states) > 1):
+            return [self.rescore_state(*learner) for learner in states]
+
+        if self.pool is None:
+            # The connections of the task's process are closed so that they are not shared with the forked
+            # processes of the pool.  They are reopened when next used.
+            connections.close_all()
+            self.pool = Pool(processes=processes, initializer=_initialize_pool_process, initargs=(self,))
+        return self.pool.map(_rescore_in_pool_process, states)
+
+    def _save(self, learners, rescored_states, update_statuses):
+        """
+        Saves the rescored states and scores of the given learners in a single transaction,
+        then sends their grade signals and tracks their events.
+
+        Returns the StudentModules changed since they were read, which are to be rescored
+        one learner at a time.
+        """
+        changed_student_modules = []
+        saved = []
+        with outer_atomic():
+            current_student_modules = StudentModule.objects.select_for_update().in_bulk(
+                [student_module.id for student_module, _ in learners]
+            )
+            for (student_module, _), rescored_state in zip(learners, rescored_states):
+                current_student_module = current_student_modules.get(student_module.id)
+                if rescored_state.update_status != UPDATE_STATUS_SUCCEEDED:
+                    update_statuses[student_module.id] = rescored_state.update_status
+                    saved.append((student_module, rescored_state, False))
+                    TASK_LOG.warning(
+                        u"error processing rescore call for course %(course)s, problem %(loc)s "
+                        u"and student %(student)s",
+                        dict(
+                            course=self.course.id,
+                            loc=student_module.module_state_key,
+                            student=student_module.student
+                        )
+                    )
+                elif current_student_module is None:
+                    # The StudentModule was deleted while the problem was rescored.
+                    update_statuses[student_module.id] = UPDATE_STATUS_SKIPPED
+                elif current_student_module.modified != student_module.modified:
+                    changed_student_modules.append(student_module)
+                else:
+                    score_updated = self._save_rescored_state(current_student_module, rescored_state)
+                    update_statuses[student_module.id] = UPDATE_STATUS_SUCCEEDED
+                    # The modified time of the saved StudentModule is that of its score.
+                    student_module.modified = current_student_module.modified
+                    saved.append((student_module, rescored_state, score_updated))
+
+        for student_module, rescored_state, score_updated in saved:
+            self._publish(student_module, rescored_state, score_updated)
+        return changed_student_modules
+
+    def _save_rescored_state(self, student_module, rescored_state):
+        """
+        Saves the rescored state of the given StudentModule, and its score unless
+        only higher scores are kept and it is lower, as score_published_handler does.
+
+        Returns whether the score was updated.
+        """
+        new_score = rescored_state.new_score
+        state = json.loads(student_module.state) if student_module.state else {}
+        state.update(rescored_state.state)
+
+        score_updated = True
+        if self.only_if_higher and not is_score_higher_or_equal(
+                student_module.grade, student_module.max_grade, new_score.raw_earned, new_score.raw_possible
+        ):
+            score_updated = False
+            TASK_LOG.warning(
+                u"Grades: Rescore is not higher than previous: "
+                u"user: {}, block: {}, previous: {}/{}, new: {}/{} ".format(
+                    student_module.student_id, student_module.module_state_key, student_module.grade,
+                    student_module.max_grade, new_score.raw_earned, new_score.raw_possible,
+                )
+            )
+
+        if score_updated:
+            student_module.grade = new_score.raw_earned
+            student_module.max_grade = new_score.raw_possible
+            state['score'] = new_score._asdict()
+        else:
+            state.setdefault('score', rescored_state.orig_score._asdict())
+        student_module.state = json.dumps(state)
+        student_module.save()
+        return score_updated
+
+    def _publish(self, student_module, rescored_state, score_updated):
+        """
+        Sends the grade signal of a learner's rescored problem, if the score was updated,
+        and tracks the events of the learner's problem.
+        """
+        # The tracking info is set before the grade signal, because it makes downstream
+        # calls that create events.
+        create_new_event_transaction_id()
+        set_event_transaction_type(GRADES_RESCORE_EVENT_TYPE)
+
+        usage_key = self.problem_descriptor.location
+        if score_updated:
+            PROBLEM_RAW_SCORE_CHANGED.send(
+                sender=None,
+                raw_earned=rescored_state.new_score.raw_earned,
+                raw_possible=rescored_state.new_score.raw_possible,
+                weight=getattr(self.problem_descriptor, 'weight', None),
+                user_id=student_module.student_id,
+                course_id=unicode(usage_key.course_key),
+                usage_id=unicode(usage_key),
+                only_if_higher=self.only_if_higher,
+                modified=student_module.modified,
+                score_db_table=ScoreDatabaseTableEnum.courseware_student_module,
+                score_deleted=False,
+            )
+
+        track_function = _get_track_function_for_task(student_module.student, self.xmodule_instance_args)
+        context = contexts.course_context_from_course_id(self.course.id)
+        context['user_id'] = student_module.student_id
+        context['asides'] = {}
+        for event_type, event, is_published in rescored_state.events:
+            if is_published:
+                with tracker.get_tracker().context(event_type, context):
+                    track_function(event_type, event)
+            else:
+                track_function(event_type, event)
+
+
+class _EventRecorder(object):
+    """
+    Stands in for the runtime of a learner's CapaModule, recording the events that the
+    learner's problem tracks, and whether they are published, until the rescored state is saved.
+    """
+    def __init__(self):
+        self.events = []
+
+    def track_function(self, event_type, event):
+        """
+        Records an event tracked by a response of the problem.
+        """
+        self.events.append((event_type, event, False))
+
+    def publish(self, _block, event_type, event):
+        """
+        Records an event published by the problem.
+        """
+        self.events.append((event_type, event, True))
+
+
+class _LearnerProblem(object):
+    """
+    Stands in for a learner's CapaModule, with the learner's problem built from their stored state.
+    """
+    track_function_unmask = CapaMixin.track_function_unmask.__func__
+    unmask_event = CapaMixin.unmask_event.__func__
+
+    def __init__(self, location, problem_text, capa_system, state):
+        self.location = location
+        self.runtime = _EventRecorder()
+        self.attempts = state.get('attempts', 0)
+        self.lcp = LoncapaProblem(
+            problem_text=problem_text,
+            id=location.html_id(),
+            state={
+                'done': state.get('done', False),
+                'correct_map': state.get('correct_map', {}),
+                'student_answers': state.get('student_answers', {}),
+                'has_saved_answers': state.get('has_saved_answers', False),
+                'input_state': state.get('input_state', {}),
+                'seed': state['seed'],
+            },
+            seed=state['seed'],
+            capa_system=capa_system,
+            capa_module=self,
+        )
+        if state.get('score') is None:
+            self.score = self.score_from_lcp()
+        else:
+            self.score = Score(**state['score'])
+
+    def score_from_lcp(self):
+        """
+        Returns the score associated with the correctness map
+        currently stored by the LCP.
+        """
+        lcp_score = self.lcp.calculate_score()
+        return Score(raw_earned=lcp_score['score'], raw_possible=lcp_score['total'])
+
+    def rescore(self):
+        """
+        Checks whether the existing answers to the problem are correct, as CapaMixin.rescore does.
+
+        Returns the score before and after rescoring.
+        """
+        event_info = {'state': self.lcp.get_state(), 'problem_id': text_type(self.location)}
+
+        orig_score = self.score
+        event_info['orig_score'] = orig_score.raw_earned
+        event_info['orig_total'] = orig_score.raw_possible
+        try:
+            self.lcp.correct_map.update(self.lcp.get_grade_from_current_answers(None))
+            calculated_score = self.score_from_lcp()
+        except (StudentInputError, ResponseError, LoncapaProblemError):
+            TASK_LOG.warning("Input error in capa_module:problem_rescore", exc_info=True)
+            event_info['failure'] = 'input_error'
+            self.track_function_unmask('problem_rescore_fail', event_info)
+            raise
+
+        except Exception:
+            event_info['failure'] = 'unexpected'
+            self.track_function_unmask('problem_rescore_fail', event_info)
+            raise
+
+        event_info['new_score'] = calculated_score.raw_earned
+        event_info['new_total'] = calculated_score.raw_possible
+
+        # success = correct if ALL questions in this problem are correct
+        success = 'correct'
+        for answer_id in self.lcp.correct_map:
+            if not self.lcp.correct_map.is_correct(answer_id):
+                success = 'incorrect'
+
+        event_info['correct_map'] = self.lcp.correct_map.get_dict()
+        event_info['success'] = success
+        event_info['attempts'] = self.attempts
+        self.track_function_unmask('problem_rescore', event_info)
+        return orig_score, calculated_score
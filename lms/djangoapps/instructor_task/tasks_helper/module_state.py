@@ -5,7 +5,9 @@ import json
 import logging
 from time import time
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models.query import QuerySet
 from django.utils.translation import ugettext_noop
 from opaque_keys.edx.keys import UsageKey
 
@@ -84,30 +86,45 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
         course_id, usage_keys, student_identifier, filter_fcn, override_score_task
     )
 
-    task_progress = TaskProgress(action_name, len(modules_to_update), start_time)
+    if isinstance(modules_to_update, QuerySet):
+        num_modules_to_update = modules_to_update.count()
+    else:
+        num_modules_to_update = len(modules_to_update)
+    task_progress = TaskProgress(action_name, num_modules_to_update, start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update, task_input)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    # The course and its problems are loaded once, for all of the StudentModules.
+    with modulestore().bulk_operations(course_id):
+        for module_to_update in _iter_modules_to_update(modules_to_update):
+            task_progress.attempted += 1
+            module_descriptor = problems[unicode(module_to_update.module_state_key)]
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            with dog_stats_api.timer(
+                    'instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]
+            ):
+                update_status = update_fcn(module_descriptor, module_to_update, task_input)
+                _record_update_status(task_progress, update_status)
 
     return task_progress.update_task_state()
 
 
+def _record_update_status(task_progress, update_status):
+    """
+    Counts the status returned by the update of a StudentModule in `task_progress`.
+    """
+    if update_status == UPDATE_STATUS_SUCCEEDED:
+        # If the update_fcn returns true, then it performed some kind of work.
+        # Logging of failures is left to the update_fcn itself.
+        task_progress.succeeded += 1
+    elif update_status == UPDATE_STATUS_FAILED:
+        task_progress.failed += 1
+    elif update_status == UPDATE_STATUS_SKIPPED:
+        task_progress.skipped += 1
+    else:
+        raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+
+
 @outer_atomic
 def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
     '''
@@ -387,6 +404,43 @@ def _get_task_id_from_xmodule_args(xmodule_instance_args):
         return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID)
 
 
+def _iter_modules_to_update(modules_to_update):
+    """
+    Yields the given StudentModules, with their students.
+
+    A QuerySet of StudentModules is read in batches, see _iter_module_batches.
+    """
+    if not isinstance(modules_to_update, QuerySet):
+        for student_module in modules_to_update:
+            yield student_module
+        return
+
+    for batch in _iter_module_batches(modules_to_update):
+        for student_module in batch:
+            yield student_module
+
+
+def _iter_module_batches(modules_to_update):
+    """
+    Yields lists of the StudentModules of the given QuerySet, with their students.
+
+    The StudentModules are read in batches of settings.USER_STATE_BATCH_SIZE rows
+    of increasing id, joined with their students.  Memory use is thus independent of the
+    number of StudentModules, and the student of each isn't queried separately.
+    """
+    batch_size = settings.USER_STATE_BATCH_SIZE
+    student_modules = modules_to_update.select_related('student').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(student_modules.filter(id__gt=last_id)[:batch_size])
+        if batch:
+            yield batch
+
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
+
 def _get_modules_to_update(course_id, usage_keys, student_identifier, filter_fcn, override_score_task=False):
     """
     Fetches a StudentModule instances for a given `course_id`, `student` object, and `usage_keys`.
@@ -9,14 +9,17 @@ import json
 import logging
 import textwrap
 from collections import namedtuple
+from multiprocessing.pool import ThreadPool
 
 import ddt
 from celery.states import FAILURE, SUCCESS
 from django.contrib.auth.models import User
+from django.test.utils import override_settings
 from django.urls import reverse
 from mock import patch
 from nose.plugins.attrib import attr
 from six import text_type
+from waffle.testutils import override_switch
 
 from capa.responsetypes import StudentInputError
 from capa.tests.response_xml_factory import CodeResponseXMLFactory, CustomResponseXMLFactory
@@ -28,7 +31,9 @@ from lms.djangoapps.instructor_task.api import (
     submit_rescore_problem_for_student,
     submit_reset_problem_attempts_for_all_students
 )
+from lms.djangoapps.instructor_task.config.waffle import BULK_RESCORE, WAFFLE_NAMESPACE
 from lms.djangoapps.instructor_task.models import InstructorTask
+from lms.djangoapps.instructor_task.tasks_helper.module_state import _get_module_instance_for_task
 from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport
 from lms.djangoapps.instructor_task.tests.test_base import (
     OPTION_1,
@@ -43,6 +48,8 @@ from xmodule.modulestore.tests.factories import ItemFactory
 
 log = logging.getLogger(__name__)
 
+BULK_RESCORE_MODULE = 'lms.djangoapps.instructor_task.tasks_helper.bulk_rescore'
+
 
 class TestIntegrationTask(InstructorTaskModuleTestCase):
     """
@@ -430,6 +437,55 @@ class TestRescoringTask(TestIntegrationTask):
             self.check_state(user, descriptor, 0, 1, expected_attempts=2)
 
 
+@attr(shard=3)
+@override_switch(u'{}.{}'.format(WAFFLE_NAMESPACE, BULK_RESCORE), active=True)
+class TestBulkRescoringTask(TestRescoringTask):
+    """
+    Runs the rescoring tests with the learners of a problem rescored in bulk.
+    """
+
+    def test_problem_built_once(self):
+        """
+        Check that only the module of the first learner is built to rescore all of the learners.
+        """
+        problem_url_name = 'H1P1'
+        self.define_option_problem(problem_url_name)
+        location = InstructorTaskModuleTestCase.problem_location(problem_url_name)
+        descriptor = self.module_store.get_item(location)
+        for user in self.users:
+            self.submit_student_answer(user.username, problem_url_name, [OPTION_2, OPTION_2])
+
+        self.redefine_option_problem(problem_url_name, correct_answer=OPTION_2)
+        with patch(
+            BULK_RESCORE_MODULE + '._get_module_instance_for_task', wraps=_get_module_instance_for_task
+        ) as mock_get_module:
+            with patch(BULK_RESCORE_MODULE + '.rescore_problem_module_state') as mock_rescore_one_learner:
+                self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(mock_get_module.call_count, 1)
+        self.assertFalse(mock_rescore_one_learner.called)
+        for user in self.users:
+            self.check_state(user, descriptor, 2, 2)
+
+    @override_settings(BULK_RESCORE_PROCESSES=2)
+    def test_rescoring_randomized_problem_in_pool(self):
+        """
+        Run rescore scenario on custom problem that uses randomize, rescoring the
+        learners in a pool.
+        """
+        def thread_pool(processes, initializer, initargs):  # pylint: disable=unused-argument
+            """
+            A pool of one thread rather than processes, so that the test's database
+            transaction is kept, and the scripts run in the test's process one at a time.
+            """
+            return ThreadPool(1, initializer, initargs)
+
+        with patch(BULK_RESCORE_MODULE + '.Pool', thread_pool), \
+                patch(BULK_RESCORE_MODULE + '.connections'), \
+                patch(BULK_RESCORE_MODULE + '.clear_existing_modulestores'):
+            self.test_rescoring_randomized_problem()
+
+
 class TestResetAttemptsTask(TestIntegrationTask):
     """
     Integration-style tests for resetting problem attempts in a background task.
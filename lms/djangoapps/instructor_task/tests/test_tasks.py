@@ -11,6 +11,7 @@ from uuid import uuid4
 
 import ddt
 from celery.states import FAILURE, SUCCESS
+from django.test.utils import override_settings
 from django.utils.translation import ugettext_noop
 from mock import MagicMock, Mock, patch
 from nose.plugins.attrib import attr
@@ -489,6 +490,37 @@ class TestRescoreInstructorTask(TestInstructorTasks):
             action_name='rescored'
         )
 
+    @override_settings(USER_STATE_BATCH_SIZE=3)
+    def test_rescoring_in_batches(self):
+        """
+        Tests that the StudentModules of all students are rescored when they are read in batches.
+        """
+        mock_instance = MagicMock()
+        mock_instance.has_submitted_answer.return_value = True
+
+        num_students = 10
+        students = self._create_students_with_state(num_students)
+        task_entry = self._create_input_entry()
+        with patch(
+                'lms.djangoapps.instructor_task.tasks_helper.module_state.get_module_for_descriptor_internal'
+        ) as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+
+        self.assertEqual(
+            sorted(call[1]['user'].id for call in mock_get_module.call_args_list),
+            sorted(student.id for student in students),
+        )
+        self.assert_task_output(
+            output=self.get_task_output(task_entry.id),
+            total=num_students,
+            attempted=num_students,
+            succeeded=num_students,
+            skipped=0,
+            failed=0,
+            action_name='rescored'
+        )
+
 
 @attr(shard=3)
 class TestResetAttemptsInstructorTask(TestInstructorTasks):
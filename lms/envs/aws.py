@@ -657,6 +657,9 @@ GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
 # Rate limit for regrading tasks that a grading policy change can kick off
 POLICY_CHANGE_TASK_RATE_LIMIT = ENV_TOKENS.get('POLICY_CHANGE_TASK_RATE_LIMIT', POLICY_CHANGE_TASK_RATE_LIMIT)
 
+# Number of processes for rescoring the learners of customresponse problems
+BULK_RESCORE_PROCESSES = ENV_TOKENS.get('BULK_RESCORE_PROCESSES', BULK_RESCORE_PROCESSES)
+
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
 
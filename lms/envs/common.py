@@ -901,6 +901,15 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandbox processes, which have already imported the modules
+    # available to problem code, kept ready by each server process.
+    'pool': {
+        # How many processes to keep ready?  0 means don't bother.
+        'size': 0,
+        # After how many seconds of waiting are processes replaced?
+        'max_idle_seconds': 600,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1287,6 +1296,7 @@ MIDDLEWARE_CLASSES = [
 
     'django_comment_client.utils.ViewNameMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
+    'util.sandboxing.ConfigureSandboxPoolMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
     'ratelimitbackend.middleware.RateLimitMiddleware',
@@ -2652,6 +2662,12 @@ FINANCIAL_REPORTS = {
 # Rate limit for regrading tasks that a grading policy change can kick off
 POLICY_CHANGE_TASK_RATE_LIMIT = '300/h'
 
+#### Problem rescoring-related settings #####
+# Number of processes across which the instructor_task.bulk_rescore switch
+# rescores the learners of a problem with customresponse scripts.  The
+# learners are rescored in the task's own process when this is below 2.
+BULK_RESCORE_PROCESSES = 0
+
 #### PASSWORD POLICY SETTINGS #####
 PASSWORD_MIN_LENGTH = 8
 PASSWORD_MAX_LENGTH = None
@@ -8,6 +8,7 @@ The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
 """
+from contextlib import contextmanager
 from copy import deepcopy
 from functools import partial
 from logging import getLogger
@@ -414,6 +415,11 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
+        # Ordered list of the blocks removed from the structure while
+        # removals are being recorded, or None when not recording.
+        # list [(UsageKey, bool)]
+        self._removed_blocks = None
+
     def copy(self):
         """
         Returns a new instance of BlockStructureBlockData with a
@@ -639,6 +645,37 @@ class BlockStructureBlockData(BlockStructure):
                 for parent in parents:
                     self._add_relation(parent, child)
 
+        if self._removed_blocks is not None:
+            self._removed_blocks.append((usage_key, keep_descendants))
+
+    def replay_removals(self, removed_blocks):
+        """
+        Removes the given blocks, in order, from the block structure.
+        Replaying the removals recorded by record_removals on an
+        identical block structure yields an identical result.
+
+        Arguments:
+            removed_blocks ([(UsageKey, bool)]) - Ordered list of
+                usage keys of the blocks to remove along with their
+                keep_descendants value.
+        """
+        for usage_key, keep_descendants in removed_blocks:
+            if usage_key in self:
+                self.remove_block(usage_key, keep_descendants)
+
+    @contextmanager
+    def record_removals(self):
+        """
+        A context manager that yields an ordered list of the blocks
+        that are removed from the block structure within its context,
+        along with their keep_descendants value.
+        """
+        self._removed_blocks = []
+        try:
+            yield self._removed_blocks
+        finally:
+            self._removed_blocks = None
+
     def create_universal_filter(self):
         """
         Returns a filter function that always returns True for all blocks.
@@ -0,0 +1,115 @@
+"""
+Module for caching the outcome of the filtering phase of transforms.
+"""
+from hashlib import sha1
+from logging import getLogger
+
+from . import config
+from .block_structure import BlockStructureBlockData
+from .transformer_registry import TransformerRegistry
+
+
+logger = getLogger(__name__)  # pylint: disable=C0103
+
+
+class BlockStructureFilterCache(object):
+    """
+    Cache of the blocks removed by filtering transformers from a
+    collected block structure.
+
+    Since most users of a course share the same partition groups and
+    date-based visibility, the blocks removed for one user are usually
+    the same as those removed for many others.  Each cache entry is
+    keyed by the version of the collected block structure, the starting
+    block, the ordered list of filtering transformers, and each
+    transformer's transform_signature for the user, so the entry can be
+    replayed for any user with equal signatures.
+    """
+    def __init__(self, cache, root_block_usage_key, structure_version):
+        """
+        Arguments:
+            cache (django.core.cache.backends.base.BaseCache) - The
+                cache in which removed blocks are stored.
+
+            root_block_usage_key (UsageKey) - The usage_key for the
+                root of the collected block structure.
+
+            structure_version (tuple) - Values that identify the
+                version of the collected block structure's content.
+        """
+        self._cache = cache
+        self.root_block_usage_key = root_block_usage_key
+        self.structure_version = structure_version
+
+    @classmethod
+    def for_block_structure(cls, cache, block_structure):
+        """
+        Returns a BlockStructureFilterCache for the given collected
+        block_structure, or None if caching is disabled or the content
+        version of the block structure is unknown.
+        """
+        if not config.waffle().is_enabled(config.CACHE_FILTERED_BLOCKS):
+            return None
+
+        root_block_data = block_structure[block_structure.root_block_usage_key]
+        data_version = getattr(root_block_data, 'course_version', None)
+        if data_version is None:
+            return None
+
+        return cls(
+            cache,
+            block_structure.root_block_usage_key,
+            (data_version, getattr(root_block_data, 'subtree_edited_on', None)),
+        )
+
+    def get(self, starting_block_usage_key, transformer_signatures):
+        """
+        Returns the ordered list of removed blocks for the given
+        starting block and transformer signatures, or None if not found.
+
+        Arguments:
+            starting_block_usage_key (UsageKey) - The usage_key of the
+                block at which the transform starts.
+
+            transformer_signatures ([(string, any)]) - Ordered list of
+                each filtering transformer's name and transform_signature.
+        """
+        cache_key = self._encode_cache_key(starting_block_usage_key, transformer_signatures)
+        removed_blocks = self._cache.get(cache_key)
+        logger.debug(
+            "BlockStructure: Filtered blocks %s in cache; %s.",
+            "found" if removed_blocks is not None else "not found",
+            cache_key,
+        )
+        return removed_blocks
+
+    def set(self, starting_block_usage_key, transformer_signatures, removed_blocks):
+        """
+        Caches the ordered list of removed blocks for the given
+        starting block and transformer signatures.
+
+        Arguments:
+            See the description in get.
+
+            removed_blocks ([(UsageKey, bool)]) - Ordered list of the
+                removed blocks along with their keep_descendants value.
+        """
+        cache_key = self._encode_cache_key(starting_block_usage_key, transformer_signatures)
+        self._cache.set(cache_key, removed_blocks, timeout=config.cache_timeout_in_seconds())
+
+    def _encode_cache_key(self, starting_block_usage_key, transformer_signatures):
+        """
+        Returns the cache key for the given starting block and
+        transformer signatures.
+        """
+        hash_obj = sha1()
+        for value in (
+                BlockStructureBlockData.VERSION,
+                TransformerRegistry.get_write_version_hash(),
+                self.root_block_usage_key,
+                self.structure_version,
+                starting_block_usage_key,
+                transformer_signatures,
+        ):
+            hash_obj.update(unicode(value).encode('utf-8'))
+        return u"block_structure.filtered.{}".format(hash_obj.hexdigest())
@@ -7,6 +7,7 @@ from contextlib import contextmanager
 from . import config
 from .exceptions import UsageKeyNotInBlockStructure, TransformerDataIncompatible, BlockStructureNotFound
 from .factory import BlockStructureFactory
+from .filter_cache import BlockStructureFilterCache
 from .store import BlockStructureStore
 from .transformers import BlockStructureTransformers
 
@@ -33,6 +34,7 @@ class BlockStructureManager(object):
         self.root_block_usage_key = root_block_usage_key
         self.modulestore = modulestore
         self.store = BlockStructureStore(cache)
+        self._cache = cache
 
     def get_transformed(self, transformers, starting_block_usage_key=None, collected_block_structure=None):
         """
@@ -61,6 +63,7 @@ class BlockStructureManager(object):
                 starting at starting_block_usage_key.
         """
         block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        filter_cache = BlockStructureFilterCache.for_block_structure(self._cache, block_structure)
 
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
@@ -73,7 +76,7 @@ class BlockStructureManager(object):
                     unicode(self.root_block_usage_key),
                 )
             block_structure.set_root_block(starting_block_usage_key)
-        transformers.transform(block_structure)
+        transformers.transform(block_structure, filter_cache)
         return block_structure
 
     def get_collected(self):
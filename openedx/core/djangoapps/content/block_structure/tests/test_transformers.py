@@ -7,9 +7,10 @@ from unittest import TestCase
 
 from ..block_structure import BlockStructureModulestoreData
 from ..exceptions import TransformerException, TransformerDataIncompatible
+from ..filter_cache import BlockStructureFilterCache
 from ..transformers import BlockStructureTransformers
 from .helpers import (
-    ChildrenMapTestMixin, MockTransformer, MockFilteringTransformer, mock_registered_transformers
+    ChildrenMapTestMixin, MockCache, MockTransformer, MockFilteringTransformer, mock_registered_transformers
 )
 
 
@@ -24,6 +25,23 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
         """
         pass
 
+    class SignedFilteringTransformer(MockFilteringTransformer):
+        """
+        Mock filtering transformer that removes block 1, keeping its
+        descendants, and shares its outcome across all usages.
+        """
+        filter_call_count = 0
+        signature = 'signed'
+
+        def transform_block_filters(self, usage_info, block_structure):
+            self.filter_call_count += 1
+            return [
+                block_structure.create_removal_filter(lambda block_key: block_key == 1, keep_descendants=True)
+            ]
+
+        def transform_signature(self, usage_info, block_structure):
+            return self.signature
+
     def setUp(self):
         super(TestBlockStructureTransformers, self).setUp()
         self.transformers = BlockStructureTransformers(usage_info=MagicMock())
@@ -82,3 +100,38 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
                 self.transformers.verify_versions(block_structure)
             self.transformers.collect(block_structure)
             self.assertTrue(self.transformers.verify_versions(block_structure))
+
+    def _transform_with_filter_cache(self, transformer, filter_cache):
+        """
+        Transforms a new block structure with the given transformer and
+        filter cache, and returns the block structure.
+        """
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        with mock_registered_transformers([transformer]):
+            transformers = BlockStructureTransformers([transformer], usage_info=MagicMock())
+            transformers.transform(block_structure, filter_cache)
+        return block_structure
+
+    def test_transform_with_filter_cache(self):
+        transformer = self.SignedFilteringTransformer()
+        filter_cache = BlockStructureFilterCache(MockCache(), 0, ('version', None))
+
+        for expected_filter_call_count in (1, 1):
+            block_structure = self._transform_with_filter_cache(transformer, filter_cache)
+            self.assert_block_structure(block_structure, [[3, 4, 2], [], [], [], []], missing_blocks=[1])
+            self.assertEquals(transformer.filter_call_count, expected_filter_call_count)
+
+        # A different signature doesn't share the cached outcome.
+        transformer.signature = 'other'
+        self._transform_with_filter_cache(transformer, filter_cache)
+        self.assertEquals(transformer.filter_call_count, 2)
+
+    def test_transform_with_filter_cache_unsigned(self):
+        transformer = self.SignedFilteringTransformer()
+        transformer.signature = None
+        filter_cache = BlockStructureFilterCache(MockCache(), 0, ('version', None))
+
+        for expected_filter_call_count in (1, 2):
+            block_structure = self._transform_with_filter_cache(transformer, filter_cache)
+            self.assert_block_structure(block_structure, [[3, 4, 2], [], [], [], []], missing_blocks=[1])
+            self.assertEquals(transformer.filter_call_count, expected_filter_call_count)
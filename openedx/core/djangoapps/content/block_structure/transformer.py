@@ -207,3 +207,24 @@ class FilteringTransformerMixin(BlockStructureTransformer):
                 transformer, that is to be transformed in place.
         """
         raise NotImplementedError
+
+    def transform_signature(self, usage_info, block_structure):  # pylint: disable=unused-argument
+        """
+        Optionally returns a signature of the given usage_info that
+        fully determines which blocks are removed by this transformer's
+        filters from the given block_structure.  Usages with equal
+        signatures must have identical blocks removed, so that the
+        outcome of filtering can be shared between them (for example,
+        between all learners in the same partition groups).
+
+        Returns None, the default, if the outcome cannot be shared, for
+        example, when the filters have side effects or depend on
+        user-specific state.
+
+        Arguments:
+            See the description in transform_block_filters.
+
+        Returns:
+            A value with a deterministic unicode representation, or None.
+        """
+        return None
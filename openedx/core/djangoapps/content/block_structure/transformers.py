@@ -105,20 +105,29 @@ class BlockStructureTransformers(object):
             )
         return True
 
-    def transform(self, block_structure):
+    def transform(self, block_structure, filter_cache=None):
         """
         The given block structure is transformed by each transformer in the
         collection. Tranformers with filters are combined and run first in a
         single course tree traversal, then remaining transformers are run in
         the order that they were added.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure to transform in place.
+
+            filter_cache (BlockStructureFilterCache) - Optional cache
+                from which the outcome of the filtering transformers is
+                read, and into which it is stored, when all of the
+                filtering transformers provide a transform signature.
         """
-        self._transform_with_filters(block_structure)
+        self._transform_with_filters(block_structure, filter_cache)
         self._transform_without_filters(block_structure)
 
         # Prune the block structure to remove any unreachable blocks.
         block_structure._prune_unreachable()  # pylint: disable=protected-access
 
-    def _transform_with_filters(self, block_structure):
+    def _transform_with_filters(self, block_structure, filter_cache=None):
         """
         Transforms the given block_structure using the transform_block_filters
         method from the given transformers.
@@ -126,6 +135,40 @@ class BlockStructureTransformers(object):
         if not self._transformers['supports_filter']:
             return
 
+        transformer_signatures = self._transform_signatures(block_structure) if filter_cache else None
+        if transformer_signatures is None:
+            self._apply_filters(block_structure)
+            return
+
+        starting_block_usage_key = block_structure.root_block_usage_key
+        removed_blocks = filter_cache.get(starting_block_usage_key, transformer_signatures)
+        if removed_blocks is not None:
+            block_structure.replay_removals(removed_blocks)
+            return
+
+        with block_structure.record_removals() as removed_blocks:
+            self._apply_filters(block_structure)
+        filter_cache.set(starting_block_usage_key, transformer_signatures, removed_blocks)
+
+    def _transform_signatures(self, block_structure):
+        """
+        Returns an ordered list of the name and transform_signature of
+        each filtering transformer, or None if any of the transformers
+        does not provide a signature.
+        """
+        transformer_signatures = []
+        for transformer in self._transformers['supports_filter']:
+            signature = transformer.transform_signature(self.usage_info, block_structure)
+            if signature is None:
+                return None
+            transformer_signatures.append((transformer.name(), signature))
+        return transformer_signatures
+
+    def _apply_filters(self, block_structure):
+        """
+        Combines the filters of all filtering transformers and applies
+        them in a single traversal of the given block_structure.
+        """
         filters = []
         for transformer in self._transformers['supports_filter']:
             filters.extend(transformer.transform_block_filters(self.usage_info, block_structure))
@@ -4,6 +4,7 @@ Utilities related to caching.
 import collections
 import cPickle as pickle
 import functools
+import threading
 import zlib
 
 from xblock.core import XBlock
@@ -84,6 +85,56 @@ class memoized(object):  # pylint: disable=invalid-name
         return functools.partial(self.__call__, obj)
 
 
+class LRUCache(object):
+    """
+    A thread-safe dictionary-like cache of at most max_size entries,
+    evicting the least recently used entry when full.
+
+    Unlike memoized, this is suitable for caching data throughout the
+    lifetime of a process when the number of distinct keys is unbounded.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for key, or default if there is none.
+        """
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                return default
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Caches the given value for key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
 def hashvalue(arg):
     """
     If arg is an xblock, use its location. otherwise just turn it into a string
@@ -6,7 +6,7 @@ from unittest import TestCase
 import ddt
 from mock import MagicMock
 
-from openedx.core.lib.cache_utils import memoize_in_request_cache
+from openedx.core.lib.cache_utils import LRUCache, memoize_in_request_cache
 
 
 @ddt.ddt
@@ -63,3 +63,27 @@ class TestMemoizeInRequestCache(TestCase):
                 func_to_memoize(*arg_list2)
 
             self.assertEquals(self.func_to_count.call_count, 2)
+
+
+class TestLRUCache(TestCase):
+    """
+    Test the LRUCache class.
+    """
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('b', 'missing'), 'missing')
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.clear()
+        self.assertNotIn('a', cache)